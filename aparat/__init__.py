@@ -1,3 +1,41 @@
 from .aparat import Aparat, ReportReason, VideoCategory
+from .bulk import ActionResult, BulkExecutor
+from .circuit import CircuitBreaker, CircuitBreakers, CircuitOpenError
+from .concurrency import AdaptiveLimiter
+from .deadlines import DeadlineExceededError, deadline
+from .download import DownloadProgress, DownloadResult, IntegrityError
+from .export import export_csv, export_jsonl, export_parquet
+from .farm import FarmWorker, JobFarm
+from .hls import ClipResult
+from .images import ImageCache
+from .metrics import Histogram, Instrumentation, MetricsRegistry, RequestEvent
+from .moderation import ModerationAction, ModerationPipeline
+from .notifications import NotificationWatcher
+from .pool import Account, AccountPool
+from .proxy import Proxy, ProxyPool
+from .scheduler import DownloadCancelledError, DownloadJob, DownloadScheduler
+from .store import DownloadStore
+from .stream import VideoStream
+from .throttle import BandwidthLimiter, RateLimiter
 
-__all__ = ['Aparat', 'ReportReason', 'VideoCategory']
+__all__ = [
+    'Aparat', 'ReportReason', 'VideoCategory',
+    'ActionResult', 'BulkExecutor',
+    'CircuitBreaker', 'CircuitBreakers', 'CircuitOpenError',
+    'AdaptiveLimiter',
+    'DeadlineExceededError', 'deadline',
+    'DownloadProgress', 'DownloadResult', 'IntegrityError',
+    'export_csv', 'export_jsonl', 'export_parquet',
+    'FarmWorker', 'JobFarm',
+    'ClipResult',
+    'ImageCache',
+    'Histogram', 'Instrumentation', 'MetricsRegistry', 'RequestEvent',
+    'ModerationAction', 'ModerationPipeline',
+    'NotificationWatcher',
+    'Account', 'AccountPool',
+    'Proxy', 'ProxyPool',
+    'DownloadCancelledError', 'DownloadJob', 'DownloadScheduler',
+    'DownloadStore',
+    'VideoStream',
+    'BandwidthLimiter', 'RateLimiter',
+]
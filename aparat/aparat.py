@@ -1,13 +1,31 @@
 import requests
 import base64
 import pickle
+import json
+import time
+import threading
+import functools
 import magic
 import uuid
 import re
 import os
-from typing import Dict, Union
-from tqdm import tqdm
+from typing import Callable, Dict, Iterator, Union
 from enum import Enum
+from contextlib import nullcontext
+from .circuit import CircuitBreakers, CircuitOpenError
+from .concurrency import AdaptiveLimiter
+from .deadlines import DeadlineExceededError, with_deadline
+from .download import DownloadProgress, DownloadResult, IntegrityError, TqdmProgress, download_file
+from .hls import ClipResult, download_clip, parse_time
+from .images import ImageCache, fetch_images
+from .metrics import Instrumentation
+from .proxy import ProxyPool
+from .quality import nearest_profile, remote_size, select_profile
+from .scheduler import DownloadScheduler
+from .session import AparatSession, ThreadLocalSession, _thread_safe
+from .store import DownloadStore
+from .stream import VideoStream
+from .throttle import BandwidthLimiter
 
 base_url = 'https://www.aparat.com'
 upload_base_url = 'https://uc3.aparat.com'
@@ -49,6 +67,18 @@ class ResolutionError(Exception):
         self.message = message
         super().__init__(self.message)
 
+class NoAccountAvailableError(Exception):
+    """Exception raised when no healthy account can be acquired from an account pool."""
+    def __init__(self, message="No healthy account is available."):
+        self.message = message
+        super().__init__(self.message)
+
+class UnexpectedResponseError(Exception):
+    """Exception raised when an API response does not have the expected shape."""
+    def __init__(self, message="The API response does not have the expected shape."):
+        self.message = message
+        super().__init__(self.message)
+
 class ReportReason(Enum):
     FAKE_NEWS = 45
     NATIONAL_SECURITY = 24
@@ -102,7 +132,102 @@ class VideoCategory(Enum):
     BASIC_SCIENCES = 30
     AGRICULTURE_HORTICULTURE = 31
 
-class Comment(object):
+def _file_path(url: str, path: str = None) -> str:
+    """Return the file a download of `url` is saved to, given the `path` argument of `Video.download`."""
+    name = url.split('/')[-1].split('?')[0]
+    path = path if path else name
+
+    if path.endswith(os.sep) or os.path.isdir(path):
+        return os.path.join(path, name)
+    elif os.path.isfile(path) or '.' in os.path.basename(path):
+        return path
+    return name
+
+def _pin_proxy(session, proxy=None):
+    """Return a context manager pinning the requests of the calling thread to one proxy, if `session` supports it.
+
+    It yields the pinned proxy, or None without a proxy pool.
+    """
+    pin = getattr(session, 'pin_proxy', None)
+    return pin(proxy) if pin else nullcontext()
+
+def _fetch_video(session, uid: str, is_logged_in: bool, timeout: int = 10):
+    """Fetch one video; return a Video object, or None if it does not exist."""
+    response = session.get(f'{base_url}/api/fa/v1/video/video/show/videohash/{uid}?pr=1&mf=1', timeout=timeout)
+    data = response.json()
+
+    if 'meta' in data and 'status' not in data['meta']:
+        return Video(data, is_logged_in, session)
+    return None
+
+def _iter_comment_pages(session, uid: str, is_logged_in: bool, perpage: int = 100, timeout: int = 10):
+    """Yield the comments of a video as one list per page, fetching a page only when the previous one is consumed."""
+    url = f'{base_url}/api/fa/v1/video/comment/list/videohash/{uid}?perpage={perpage}'
+    while url:
+        response = session.get(url, timeout=timeout)
+        if response.status_code != 200:
+            return
+        data = response.json()
+        yield [Comment(comment['attributes'], uid, is_logged_in, session) for comment in data.get('data') or []]
+        more = (data.get('links') or {}).get('more')
+        url = f'{more}&perpage={perpage}' if more else None
+
+def _iter_comments(session, uid: str, is_logged_in: bool, perpage: int = 100, timeout: int = 10):
+    """Yield the comments of a video, fetching one page at a time."""
+    for page in _iter_comment_pages(session, uid, is_logged_in, perpage, timeout):
+        yield from page
+
+class _Field(object):
+    """Descriptor exposing one key of a model's raw API attributes.
+
+    Values are read from the raw response on access instead of being copied
+    into every instance, and assignments are written back to it.
+    """
+
+    __slots__ = ('name', 'key')
+
+    def __init__(self, key: str = None):
+        self.name = None
+        self.key = key
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        if self.key is None:
+            self.key = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance._attributes.get(self.key)
+
+    def __set__(self, instance, value):
+        instance._attributes[self.key] = value
+
+class _Model(object):
+    """Base class for Aparat models.
+
+    Model attributes are declared as `_Field` descriptors and collected, in
+    declaration order, into ``FIELDS``.
+    """
+
+    __slots__ = ('data', 'session', 'is_logged_in', '_attributes')
+
+    FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELDS = tuple(name for name, value in vars(cls).items() if isinstance(value, _Field))
+
+    def to_dict(self, fields: Union[list, tuple, None] = None) -> Dict[str, Union[str, int]]:
+        """
+        Return the model attributes as a plain dictionary.
+
+        :param fields: Attribute names to include (default is all of ``FIELDS``).
+        :return: A dictionary mapping attribute names to their values.
+        """
+        return {field: getattr(self, field, None) for field in (fields or self.FIELDS)}
+
+class Comment(_Model):
     """Aparat Comment Model.
 
     This class represents a comment on an Aparat video and provides methods
@@ -135,6 +260,32 @@ class Comment(object):
         is_pinned (bool): Indicates if the comment is pinned.
     """
 
+    __slots__ = ('uid',)
+
+    id = _Field()
+    body = _Field()
+    reply = _Field()
+    sdate = _Field()
+    sdate_timediff = _Field()
+    sdate_gregorian = _Field()
+    replyAction = _Field()
+    replyDelete = _Field()
+    text = _Field()
+    type = _Field()
+    approve_link_text = _Field()
+    approve_link_href = _Field()
+    approved = _Field()
+    approve_raw = _Field()
+    isYours = _Field()
+    deleted = _Field()
+    like_cnt = _Field()
+    reply_cnt = _Field()
+    mentioned_user_id = _Field()
+    mentioned_name = _Field()
+    need_approve = _Field()
+    spam = _Field()
+    is_pinned = _Field()
+
     def __init__(self, data: Dict[str, Union[str, int]], uid: int, is_logged_in: bool, session):
         """
         Initialize a Comment object.
@@ -148,64 +299,49 @@ class Comment(object):
         self.data = data
         self.session = session
         self.is_logged_in = is_logged_in
-
-        self.id = data.get('id')
-        self.body = data.get('body')
-        self.reply = data.get('reply')
-        self.sdate = data.get('sdate')
-        self.sdate_timediff = data.get('sdate_timediff')
-        self.sdate_gregorian = data.get('sdate_gregorian')
-        self.replyAction = data.get('replyAction')
-        self.replyDelete = data.get('replyDelete')
-        self.text = data.get('text')
-        self.type = data.get('type')
-        self.approve_link_text = data.get('approve_link_text')
-        self.approve_link_href = data.get('approve_link_href')
-        self.approved = data.get('approved')
-        self.approve_raw = data.get('approve_raw')
-        self.isYours = data.get('isYours')
-        self.deleted = data.get('deleted')
-        self.like_cnt = data.get('like_cnt')
-        self.reply_cnt = data.get('reply_cnt')
-        self.mentioned_user_id = data.get('mentioned_user_id')
-        self.mentioned_name = data.get('mentioned_name')
-        self.need_approve = data.get('need_approve')
-        self.spam = data.get('spam')
-        self.is_pinned = data.get('is_pinned')
+        self._attributes = data
     
-    def like(self, timeout: int = 10) -> bool:
+    @with_deadline
+    def like(self, timeout: int = 10, deadline: float = None) -> bool:
         """
         Like the comment.
 
         :param timeout: Timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: True if the comment is successfully liked, False otherwise.
         """
 
         if self.data['like']['status'] == 'unlike':
             response = self.session.get(self.data['like']['link'], timeout=timeout)
             if response.status_code == 200:
+                self.data['like']['status'] = 'like'
                 return True
         return False
 
-    def unlike(self, timeout: int = 10) -> bool:
+    @with_deadline
+    def unlike(self, timeout: int = 10, deadline: float = None) -> bool:
         """
         Unlike the comment.
 
         :param timeout: Timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: True if the comment is successfully unliked, False otherwise.
         """
 
         if self.data['like']['status'] == 'like':
             response = self.session.get(self.data['like']['link'], timeout=timeout)
             if response.status_code == 200:
+                self.data['like']['status'] = 'unlike'
                 return True
         return False
 
-    def delete(self, timeout: int = 10) -> bool:
+    @with_deadline
+    def delete(self, timeout: int = 10, deadline: float = None) -> bool:
         """
         Delete the comment.
 
         :param timeout: Timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: True if the comment is successfully deleted, False otherwise.
         
         Raises:
@@ -226,11 +362,40 @@ class Comment(object):
         else:
             return False
 
-    def report(self, timeout: int = 10) -> bool:
+    @with_deadline
+    def approve(self, timeout: int = 10, deadline: float = None) -> bool:
+        """
+        Approve the comment.
+
+        :param timeout: Timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
+        :return: True if the comment is successfully approved, False otherwise.
+        
+        Raises:
+            LoginRequiredError: If the user is not logged in.
+            ValueError: If the comment does not have an approve link.
+        """
+
+        if not self.is_logged_in:
+            raise LoginRequiredError()
+
+        if not self.approve_link_href:
+            raise ValueError("This comment does not have an approve link.")
+
+        url = self.approve_link_href if self.approve_link_href.startswith('http') else base_url + self.approve_link_href
+        response = self.session.get(url, timeout=timeout)
+        if response.status_code == 200:
+            self.need_approve = False
+            return True
+        return False
+
+    @with_deadline
+    def report(self, timeout: int = 10, deadline: float = None) -> bool:
         """
         Report the comment.
 
         :param timeout: Timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: True if the comment is successfully reported, False otherwise.
         
         Raises:
@@ -247,12 +412,14 @@ class Comment(object):
         else:
             return False
 
-    def reply_to_comment(self, body: str, timeout: int = 10) -> bool:
+    @with_deadline
+    def reply_to_comment(self, body: str, timeout: int = 10, deadline: float = None) -> bool:
         """
         Reply to the comment.
 
         :param body: The content of the reply.
         :param timeout: Timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: True if the reply is successfully posted, False otherwise.
         """
 
@@ -271,11 +438,13 @@ class Comment(object):
         else:
             return False
 
-    def get_replies(self, timeout: int = 10) -> Union[Dict[str, Union[str, int]], bool]:
+    @with_deadline
+    def get_replies(self, timeout: int = 10, deadline: float = None) -> Union[Dict[str, Union[str, int]], bool]:
         """
         Get replies to the comment.
 
         :param timeout: Timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: A dictionary containing reply data if replies exist, an empty list if there are no replies,
                  or False if an error occurs.
         """
@@ -290,7 +459,7 @@ class Comment(object):
         else:
             return False
 
-class MyVideo(object):
+class MyVideo(_Model):
     """ Aparat MyVideo Model
         
     Attributes:
@@ -320,37 +489,41 @@ class MyVideo(object):
         has_event (str): The event status of the user.
     """
 
+    __slots__ = ()
+
+    id = _Field()
+    uid = _Field()
+    hash_user_id = _Field()
+    afcn = _Field()
+    username = _Field()
+    name = _Field()
+    pic_s = _Field()
+    pic_m = _Field()
+    pic_b = _Field()
+    follower_cnt = _Field()
+    follow_cnt = _Field()
+    official = _Field()
+    url = _Field()
+    video_cnt = _Field()
+    cover_src = _Field()
+    video_visit = _Field()
+    priority = _Field()
+    brand_priority = _Field()
+    description = _Field()
+    start_date = _Field()
+    start_date_jalali = _Field()
+    show_kids_friendly = _Field()
+    banned = _Field()
+    has_event = _Field()
+
     def __init__(self, data: Dict[str, Union[str, int]], is_logged_in, session):
         self.data = data
         self.session = session
         self.is_logged_in = is_logged_in
+        self._attributes = data['attributes']
         
-        self.id = data['attributes'].get('id')
-        self.uid = data['attributes'].get('uid')
-        self.hash_user_id = data['attributes'].get('hash_user_id')
-        self.afcn = data['attributes'].get('afcn')
-        self.username = data['attributes'].get('username')
-        self.name = data['attributes'].get('name')
-        self.pic_s = data['attributes'].get('pic_s')
-        self.pic_m = data['attributes'].get('pic_m')
-        self.pic_b = data['attributes'].get('pic_b')
-        self.follower_cnt = data['attributes'].get('follower_cnt')
-        self.follow_cnt = data['attributes'].get('follow_cnt')
-        self.official = data['attributes'].get('official')
-        self.url = data['attributes'].get('url')
-        self.video_cnt = data['attributes'].get('video_cnt')
-        self.cover_src = data['attributes'].get('cover_src')
-        self.video_visit = data['attributes'].get('video_visit')
-        self.priority = data['attributes'].get('priority')
-        self.brand_priority = data['attributes'].get('brand_priority')
-        self.description = data['attributes'].get('description')
-        self.start_date = data['attributes'].get('start_date')
-        self.start_date_jalali = data['attributes'].get('start_date_jalali')
-        self.show_kids_friendly = data['attributes'].get('show_kids_friendly')
-        self.banned = data['attributes'].get('banned')
-        self.has_event = data['attributes'].get('has_event')
-        
-    def delete(self, timeout: int = 10) -> bool:
+    @with_deadline
+    def delete(self, timeout: int = 10, deadline: float = None) -> bool:
         """
         Deletes the video.
 
@@ -359,6 +532,7 @@ class MyVideo(object):
 
         Args:
             timeout (int, optional): The timeout for the HTTP request in seconds. Defaults to 10.
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
 
         Returns:
             bool: True if the video is successfully deleted, False otherwise.
@@ -381,7 +555,7 @@ class MyVideo(object):
             return True
         return False
 
-class Video(object):
+class Video(_Model):
     """ Aparat Video Model
         
     Attributes:
@@ -426,57 +600,62 @@ class Video(object):
         max_height (str): The maximum height of the video.
     """
 
+    __slots__ = ()
+
+    id = _Field()
+    title = _Field()
+    description = _Field()
+    uid = _Field()
+    visit_cnt = _Field()
+    visit_cnt_non_formatted = _Field()
+    like_cnt_non_formatted = _Field()
+    big_poster = _Field()
+    medium_poster = _Field()
+    small_poster = _Field()
+    duration = _Field()
+    meta_duration = _Field()
+    date_exact = _Field()
+    sdate = _Field()
+    sdate_timediff = _Field()
+    sdate_real = _Field()
+    deleted = _Field()
+    mdate = _Field()
+    file_link_all = _Field()
+    file_link = _Field()
+    hls_link = _Field()
+    can_download = _Field()
+    tags = _Field()
+    tags_str = _Field()
+    tags_fa = _Field()
+    frame_src = _Field()
+    category = _Field()
+    _360d = _Field('360d')
+    comment_enable = _Field()
+    official = _Field()
+    extra_data = _Field()
+    content_type = _Field()
+    file_hash = _Field()
+    isCompany = _Field()
+    isAbroad = _Field()
+    kids_friendly = _Field()
+    owner_username = _Field()
+    max_width = _Field()
+    max_height = _Field()
+
     def __init__(self, data: Dict[str, Union[str, int]], is_logged_in, session):
         self.data = data
         self.is_logged_in = is_logged_in
         self.session = session
-        
-        self.id = data['data']['attributes'].get('id')
-        self.title = data['data']['attributes'].get('title')
-        self.description = data['data']['attributes'].get('description')
-        self.uid = data['data']['attributes'].get('uid')
-        self.visit_cnt = data['data']['attributes'].get('visit_cnt')
-        self.visit_cnt_non_formatted = data['data']['attributes'].get('visit_cnt_non_formatted')
-        self.like_cnt_non_formatted = data['data']['attributes'].get('like_cnt_non_formatted')
-        self.big_poster = data['data']['attributes'].get('big_poster')
-        self.medium_poster = data['data']['attributes'].get('medium_poster')
-        self.small_poster = data['data']['attributes'].get('small_poster')
-        self.duration = data['data']['attributes'].get('duration')
-        self.meta_duration = data['data']['attributes'].get('meta_duration')
-        self.date_exact = data['data']['attributes'].get('date_exact')
-        self.sdate = data['data']['attributes'].get('sdate')
-        self.sdate_timediff = data['data']['attributes'].get('sdate_timediff')
-        self.sdate_real = data['data']['attributes'].get('sdate_real')
-        self.deleted = data['data']['attributes'].get('deleted')
-        self.mdate = data['data']['attributes'].get('mdate')
-        self.file_link_all = data['data']['attributes'].get('file_link_all')
-        self.file_link = data['data']['attributes'].get('file_link')
-        self.hls_link = data['data']['attributes'].get('hls_link')
-        self.can_download = data['data']['attributes'].get('can_download')
-        self.tags = data['data']['attributes'].get('tags')
-        self.tags_str = data['data']['attributes'].get('tags_str')
-        self.tags_fa = data['data']['attributes'].get('tags_fa')
-        self.frame_src = data['data']['attributes'].get('frame_src')
-        self.category = data['data']['attributes'].get('category')
-        self._360d = data['data']['attributes'].get('360d')
-        self.comment_enable = data['data']['attributes'].get('comment_enable')
-        self.official = data['data']['attributes'].get('official')
-        self.extra_data = data['data']['attributes'].get('extra_data')
-        self.content_type = data['data']['attributes'].get('content_type')
-        self.file_hash = data['data']['attributes'].get('file_hash')
-        self.isCompany = data['data']['attributes'].get('isCompany')
-        self.isAbroad = data['data']['attributes'].get('isAbroad')
-        self.kids_friendly = data['data']['attributes'].get('kids_friendly')
-        self.owner_username = data['data']['attributes'].get('owner_username')
-        self.max_width = data['data']['attributes'].get('max_width')
-        self.max_height = data['data']['attributes'].get('max_height')
+        self._attributes = data['data']['attributes']
     
-    def send_comment(self, comment: str, timeout: int = 10) -> Comment:
+    @with_deadline
+    def send_comment(self, comment: str, timeout: int = 10, deadline: float = None) -> Comment:
         """Send a comment for this video.
 
         Args:
             comment (str): The comment to be sent.
             timeout (int, optional): The timeout for the HTTP request (default is 10 seconds).
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
 
         Returns:
             Comment: A Comment object representing the sent comment.
@@ -518,11 +697,28 @@ class Video(object):
         else:
             raise ValueError(data)
 
-    def like(self, timeout: int = 10) -> bool:
+    def iter_comments(self, perpage: int = 100, timeout: int = 10) -> Iterator[Comment]:
+        """Iterate over the comments of this video, one page at a time.
+
+        Pages are fetched lazily, so only the current page is held in memory.
+
+        Args:
+            perpage (int, optional): The number of comments requested per page (default is 100).
+            timeout (int, optional): The timeout for each HTTP request (default is 10 seconds).
+
+        Yields:
+            Comment: The comments of the video.
+        """
+
+        return _iter_comments(self.session, self.uid, self.is_logged_in, perpage, timeout)
+
+    @with_deadline
+    def like(self, timeout: int = 10, deadline: float = None) -> bool:
         """
         Like a video.
 
         :param timeout: The timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: True if the video is successfully liked, False otherwise.
         """
 
@@ -531,14 +727,17 @@ class Video(object):
                 if item['attributes']['status'] == 'unlike':
                     response = self.session.get(item['attributes']['link'], timeout=timeout)
                     if response.status_code == 200:
+                        item['attributes']['status'] = 'like'
                         return True
         return False
 
-    def unlike(self, timeout: int = 10) -> bool:
+    @with_deadline
+    def unlike(self, timeout: int = 10, deadline: float = None) -> bool:
         """
         Unlike a video.
 
         :param timeout: The timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: True if the video is successfully liked, False otherwise.
         """
 
@@ -547,69 +746,234 @@ class Video(object):
                 if item['attributes']['status'] == 'like':
                     response = self.session.get(item['attributes']['link'], timeout=timeout)
                     if response.status_code == 200:
+                        item['attributes']['status'] = 'unlike'
                         return True
         return False
 
-    def download(self, resolution: str = None, download_highest_resolution: bool = None, path: str = None, show_progress_bar: bool = True) -> str:
-        """
-        Download the video with the specified resolution.
+    def _select_link(self, resolution: str = None, download_highest_resolution: bool = None, fallback: bool = False, max_size: int = None) -> Dict[str, Union[str, list]]:
+        """Return the `file_link_all` entry of the requested resolution.
 
-        Args:
-            resolution (str, optional): The desired video resolution (e.g., '144p', '720p').
-            download_highest_resolution (bool, optional): If True, download the highest available resolution.
-            path (str, optional): The path where the video will be saved. Defaults to the video's name.
-            show_progress_bar (bool, optional): If True, show the download progress bar. Defaults to True.
+        With resolution 'auto' the profile is chosen by `select_profile()` from the
+        measured throughput, the current deadline and `max_size`. With `fallback`, a
+        missing resolution is replaced by the nearest available one.
 
         Raises:
             ValueError: If neither `resolution` nor `download_highest_resolution` is specified.
             ResolutionError: If the specified video resolution is not found.
-
-        Returns:
-            str: The path where the downloaded video is saved.
         """
-        url = None
+        selected = None
         if not resolution and not download_highest_resolution:
             raise ValueError("Either 'resolution' or 'download_highest_resolution' must be specified.")
 
         elif download_highest_resolution:
-            url = self.data['data']['attributes']['file_link_all'][-1]['urls'][0]
+            selected = self.data['data']['attributes']['file_link_all'][-1]
+
+        elif resolution == 'auto':
+            selected = select_profile(self.session, self.file_link_all, max_size, self.duration, getattr(self.session, 'throughput', None))
 
         else:
             for link in self.data['data']['attributes']['file_link_all']:
                 if link['profile'] == resolution:
-                    url = link['urls'][0]
+                    selected = link
                     break
-        
-        if not url:
+            if fallback and (not selected or not selected['urls']):
+                selected = nearest_profile(self.file_link_all, resolution)
+
+        if not selected or not selected['urls']:
             raise ResolutionError()
-        
-        path = path if path else url.split('/')[-1].split('?')[0]
+        return selected
 
-        if path.endswith(os.sep) or os.path.isdir(path):
-            file_path = os.path.join(path, url.split('/')[-1].split('?')[0])
-        elif os.path.isfile(path) or '.' in os.path.basename(path):
-            file_path = path
-        else:
-            file_path = url.split('/')[-1].split('?')[0]
-
-        with self.session.get(url, stream=True) as r:
-            r.raise_for_status()
-            total_size = int(r.headers.get('Content-Length', 0))
-            chunk_size = 1024 * 1024  # 1 MB
-            with open(file_path, 'wb') as f:
-                if show_progress_bar:
-                    pbar = tqdm(total=total_size, unit='B', unit_scale=True, desc=os.path.basename(file_path))
-                for chunk in r.iter_content(chunk_size=chunk_size):
-                    if chunk:  # filter out keep-alive new chunks
-                        f.write(chunk)
-                        if show_progress_bar:
-                            pbar.update(len(chunk))
-                if show_progress_bar:
-                    pbar.close()
-        
-        return file_path
+    def stream(self, resolution: str = None, download_highest_resolution: bool = None, start: int = 0, end: int = None, retries: int = 3, chunk_size: int = 1024 * 1024) -> VideoStream:
+        """
+        Stream the video with the specified resolution without writing it to disk.
+
+        The returned object is a read-only, seekable file-like object (`read`,
+        `readinto`, `seek`, `tell`) whose data is fetched on demand with Range
+        requests, and iterating over it yields chunks of `chunk_size` bytes. It uses
+        the same mirror fallback and retries as `download`.
 
-    def report(self, reason: ReportReason, main_time: str = '', main_time1: str = '', main_time2: str = '', body: str = None, timeout: int = 10) -> Union[str, bool]:
+        Args:
+            resolution (str, optional): The desired video resolution (e.g., '144p', '720p').
+            download_highest_resolution (bool, optional): If True, stream the highest available resolution.
+            start (int, optional): The first byte to stream. Defaults to 0.
+            end (int, optional): The byte to stop before. Defaults to the end of the file.
+            retries (int, optional): The number of failed requests tolerated before giving up. Defaults to 3.
+            chunk_size (int, optional): The size of the chunks yielded when iterating. Defaults to 1 MB.
+
+        Raises:
+            ValueError: If neither `resolution` nor `download_highest_resolution` is specified.
+            ResolutionError: If the specified video resolution is not found.
+
+        Returns:
+            VideoStream: The stream. Close it, or use it as a context manager, when done.
+        """
+        selected = self._select_link(resolution, download_highest_resolution)
+        return VideoStream(self.session, selected['urls'], start, end, retries, chunk_size=chunk_size, bandwidth=getattr(self.session, 'bandwidth', None))
+
+    def download_path(self, resolution: str = None, download_highest_resolution: bool = None, path: str = None, fallback: bool = False) -> str:
+        """
+        Return the path `download` would save the video to, without downloading it.
+
+        Args:
+            resolution (str, optional): The desired video resolution (e.g., '144p', '720p').
+            download_highest_resolution (bool, optional): If True, use the highest available resolution.
+            path (str, optional): The path or directory passed to `download`.
+            fallback (bool, optional): If True, use the nearest available resolution when the requested one is missing.
+
+        Raises:
+            ValueError: If neither `resolution` nor `download_highest_resolution` is specified.
+            ResolutionError: If the specified video resolution is not found.
+
+        Returns:
+            str: The path of the file.
+        """
+        return _file_path(self._select_link(resolution, download_highest_resolution, fallback)['urls'][0], path)
+
+    def is_downloaded(self, resolution: str = None, download_highest_resolution: bool = None, path: str = None, fallback: bool = False, timeout: int = 10) -> bool:
+        """
+        Check whether the video has already been downloaded completely to the path `download` would use.
+
+        The local file must have the size the server reports for the resolution; if
+        the server does not report one, any non-empty file counts as complete.
+
+        Args:
+            resolution (str, optional): The desired video resolution (e.g., '144p', '720p').
+            download_highest_resolution (bool, optional): If True, use the highest available resolution.
+            path (str, optional): The path or directory passed to `download`.
+            fallback (bool, optional): If True, use the nearest available resolution when the requested one is missing.
+            timeout (int, optional): The timeout for the HTTP request (default is 10 seconds).
+
+        Returns:
+            bool: True if the file exists and is complete.
+        """
+        url = self._select_link(resolution, download_highest_resolution, fallback)['urls'][0]
+        file_path = _file_path(url, path)
+        if not os.path.isfile(file_path) or not os.path.getsize(file_path):
+            return False
+        size = remote_size(self.session, url, timeout)
+        return size is None or size == os.path.getsize(file_path)
+
+    @with_deadline
+    def download(self, resolution: str = None, download_highest_resolution: bool = None, path: str = None, show_progress_bar: bool = True, deadline: float = None, progress: Callable[[DownloadProgress], None] = None, retries: int = 3, return_result: bool = False, verify: bool = True, expected_hash: str = None, store: DownloadStore = None, max_size: int = None, fallback: bool = False, skip_existing: bool = False, timeout: Union[int, tuple] = (10, 30), stop: threading.Event = None) -> Union[str, DownloadResult]:
+        """
+        Download the video with the specified resolution.
+
+        Failed attempts move on to the next mirror of the resolution and resume
+        from the bytes already written. The size and, when the CDN ETag or
+        `expected_hash` gives one, the hash of the file are verified as it
+        arrives; a corrupted file is fetched again.
+
+        With resolution 'auto', the highest resolution expected to finish within
+        `deadline` (or, without one, as fast as the video plays) and within
+        `max_size` is chosen. The expected throughput comes from recent downloads
+        of the session, or from a short probe when there are none.
+
+        Args:
+            resolution (str, optional): The desired video resolution (e.g., '144p', '720p'), or 'auto'.
+            download_highest_resolution (bool, optional): If True, download the highest available resolution.
+            path (str, optional): The path where the video will be saved. Defaults to the video's name.
+            show_progress_bar (bool, optional): If True, show the download progress bar. Ignored when `progress` is given. Defaults to True.
+            deadline (float, optional): The overall time budget in seconds for the download. Defaults to no deadline.
+            progress (Callable, optional): Called with a `DownloadProgress` after every chunk.
+            retries (int, optional): The number of failed attempts tolerated before giving up. Defaults to 3.
+            return_result (bool, optional): If True, return a `DownloadResult` instead of the path. Defaults to False.
+            verify (bool, optional): Verify the size and hash of the file during the transfer. Defaults to True.
+            expected_hash (str, optional): The MD5, SHA-1 or SHA-256 hex digest of the file at this resolution,
+                e.g. `file_hash` when it describes the downloaded profile.
+            store (DownloadStore, optional): Serve the video from this store if it is already there,
+                and keep a copy in it otherwise.
+            max_size (int, optional): With resolution 'auto', the largest acceptable file size in bytes.
+            fallback (bool, optional): If True, download the nearest available resolution when the
+                requested one is missing. Defaults to False.
+            skip_existing (bool, optional): If True, do not download a file that is already complete at
+                its path, as checked by `is_downloaded`; the result then has `skipped=True`. Defaults to False.
+            timeout (Union[int, tuple], optional): The connect and read timeouts of each file request in seconds.
+                A mirror that sends nothing for the read timeout counts as a failed attempt. Defaults to (10, 30).
+            stop (threading.Event, optional): Set it from another thread to stop the download with
+                `DownloadCancelledError`, at the latest once a stalled read times out.
+
+        Raises:
+            ValueError: If neither `resolution` nor `download_highest_resolution` is specified.
+            ResolutionError: If the specified video resolution is not found.
+            DeadlineExceededError: If the download does not finish within `deadline`.
+            IntegrityError: If the file is still corrupted after every retry.
+
+        Returns:
+            Union[str, DownloadResult]: The path where the downloaded video is saved, or the download result.
+        """
+        selected = self._select_link(resolution, download_highest_resolution, fallback, max_size)
+        urls = selected['urls']
+        file_path = _file_path(urls[0], path)
+
+        if skip_existing and os.path.isfile(file_path) and os.path.getsize(file_path):
+            start = time.monotonic()
+            size = os.path.getsize(file_path)
+            if remote_size(self.session, urls[0]) in (None, size):
+                result = DownloadResult(file_path, urls[0], 0, size, time.monotonic() - start, 0.0, 0.0, 0, 0, skipped=True)
+                return result if return_result else result.path
+
+        bar = TqdmProgress() if show_progress_bar and progress is None else None
+        def fetch(target: str) -> DownloadResult:
+            with _pin_proxy(self.session):
+                return download_file(self.session, urls, target, progress or bar, retries, bandwidth=getattr(self.session, 'bandwidth', None), verify=verify,
+                                     expected_hash=expected_hash, timeout=timeout, stop=stop)
+
+        try:
+            if store is not None:
+                result = store.fetch(self.uid, selected['profile'], file_path, fetch, self.file_hash)
+            else:
+                result = fetch(file_path)
+        finally:
+            if bar is not None:
+                bar.close()
+
+        return result if return_result else result.path
+
+    @with_deadline
+    def download_clip(self, start: Union[str, float], end: Union[str, float], resolution: str = None, path: str = None, limiter: AdaptiveLimiter = None, retries: int = 3, timeout: int = 10, deadline: float = None) -> ClipResult:
+        """
+        Download only the part of the video between `start` and `end`.
+
+        The HLS playlist of the video is used to find the segments that cover the
+        interval; they are fetched, concurrently on a client created with
+        `thread_safe=True`, and written in order to one contiguous file. The clip is cut on segment boundaries, so it may start a
+        little before `start` and end a little after `end`.
+
+        Args:
+            start (Union[str, float]): The start of the clip, in seconds or as 'MM:SS' or 'HH:MM:SS'.
+            end (Union[str, float]): The end of the clip, in the same format.
+            resolution (str, optional): The desired video resolution (e.g., '720p'). Defaults to the highest one.
+            path (str, optional): The path of the clip. Defaults to '<uid>_<start>-<end>.ts' in the current directory.
+            limiter (AdaptiveLimiter, optional): Sets the number of segments fetched in parallel.
+            retries (int, optional): The number of failed attempts tolerated per segment. Defaults to 3.
+            timeout (int, optional): The timeout for each HTTP request (default is 10 seconds).
+            deadline (float, optional): The overall time budget in seconds for the download. Defaults to no deadline.
+
+        Raises:
+            ValueError: If the video has no HLS link, or the interval is empty or outside the video.
+            DeadlineExceededError: If the download does not finish within `deadline`.
+
+        Returns:
+            ClipResult: The written clip, with the time range it actually covers.
+        """
+        if not self.hls_link:
+            raise ValueError("The video has no HLS link.")
+
+        start, end = parse_time(start), parse_time(end)
+        name = f'{self.uid}_{start:g}-{end:g}.ts'
+        if not path:
+            path = name
+        elif path.endswith(os.sep) or os.path.isdir(path):
+            path = os.path.join(path, name)
+
+        # Every segment goes through the proxy of the playlist requests, and within the bandwidth budget
+        with _pin_proxy(self.session) as proxy:
+            pin = lambda: _pin_proxy(self.session, proxy)
+            return download_clip(self.session, self.hls_link, start, end, path, resolution, limiter, retries, timeout=timeout,
+                                 bandwidth=getattr(self.session, 'bandwidth', None), pin=pin)
+
+    @with_deadline
+    def report(self, reason: ReportReason, main_time: str = '', main_time1: str = '', main_time2: str = '', body: str = None, timeout: int = 10, deadline: float = None) -> Union[str, bool]:
         """
         Report the video for a specified reason.
 
@@ -619,6 +983,8 @@ class Video(object):
             main_time1 (str, optional): An additional time point of the issue in the video.
             main_time2 (str, optional): Another additional time point of the issue in the video.
             body (str, optional): Additional details about the report.
+            timeout (int, optional): The timeout for the HTTP request (default is 10 seconds).
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
 
         Raises:
             LoginRequiredError: If the user is not logged in.
@@ -655,12 +1021,14 @@ class Video(object):
         except (KeyError, IndexError):
             return False
 
-    def follow(self, toggle_push_notifications: bool = False, timeout: int = 10) -> bool:
+    @with_deadline
+    def follow(self, toggle_push_notifications: bool = False, timeout: int = 10, deadline: float = None) -> bool:
         """
         Follow a user.
 
         :param toggle_push_notifications: A boolean indicating whether to toggle push notifications for the followed user.
         :param timeout: The timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: True if the user is successfully followed, False otherwise.
         """
         if not self.is_logged_in:
@@ -671,17 +1039,20 @@ class Video(object):
                 if item['attributes']['status'] == 'unfollow':
                     response = self.session.get(item['attributes']['link'], timeout=timeout)
                     if response.status_code == 200:
+                        item['attributes']['status'] = 'follow'
                         if toggle_push_notifications:
                             data = response.json()
                             self.session.get(data['data']['attributes']['link_toggle_push_follow'], timeout=timeout)
                         return True
         return False
 
-    def unfollow(self, timeout: int = 10) -> bool:
+    @with_deadline
+    def unfollow(self, timeout: int = 10, deadline: float = None) -> bool:
         """
         Unfollow a user.
 
         :param timeout: The timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: True if the user is successfully followed, False otherwise.
         """
         if not self.is_logged_in:
@@ -692,14 +1063,17 @@ class Video(object):
                 if item['attributes']['status'] == 'follow':
                     response = self.session.get(item['attributes']['link'], timeout=timeout)
                     if response.status_code == 200:
+                        item['attributes']['status'] = 'unfollow'
                         return True
         return False
 
-    def republish(self, timeout: int = 10) -> MyVideo:
+    @with_deadline
+    def republish(self, timeout: int = 10, deadline: float = None) -> MyVideo:
         """
         republish video.
 
         :param timeout: The timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: True if the user is successfully followed, False otherwise.
         """
         if not self.is_logged_in:
@@ -715,7 +1089,8 @@ class Video(object):
         else:
             raise ValueError(response.json())
 
-    def get_my_video(self, id: str = None, uid: str = None, timeout: int = 10) -> MyVideo:
+    @with_deadline
+    def get_my_video(self, id: str = None, uid: str = None, timeout: int = 10, deadline: float = None) -> MyVideo:
         """
         Get a video by its ID or UID.
 
@@ -723,6 +1098,7 @@ class Video(object):
             id (str, optional): The ID of the video.
             uid (str, optional): The UID of the video.
             timeout (int, optional): The timeout for the HTTP request (default is 10 seconds).
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
 
         Returns:
             MyVideo: The video object.
@@ -748,7 +1124,7 @@ class Video(object):
                         return MyVideo(video, self.is_logged_in, self.session)
         return None
 
-class Playlist(object):
+class Playlist(_Model):
     """Aparat Playlist Model
     
     Attributes:
@@ -770,50 +1146,99 @@ class Playlist(object):
         playlist_follow_status (str): The follow status of the playlist.
         list_videos_playlist (list): The list of videos in the playlist.
         videos (list[Video]): The list of Video objects in the playlist.
+        limiter (AdaptiveLimiter): The concurrency limiter used to fetch the videos.
     """
 
-    def __init__(self, data: Dict[str, Union[str, int]], is_logged_in, session, timeout: int = 10):
+    __slots__ = ('videos', 'limiter')
+
+    id = _Field()
+    title = _Field()
+    description = _Field()
+    cnt = _Field()
+    big_poster = _Field()
+    small_poster = _Field()
+    uid = _Field()
+    toggle_url = _Field()
+    publish_type = _Field()
+    create_type = _Field()
+    checked = _Field()
+    order = _Field()
+    last_update = _Field()
+    isYours = _Field()
+    playlist_follow_link = _Field()
+    playlist_follow_status = _Field()
+    list_videos_playlist = _Field()
+
+    def __init__(self, data: Dict[str, Union[str, int]], is_logged_in, session, timeout: int = 10, limiter: AdaptiveLimiter = None):
+        self.data = data
         self.is_logged_in = is_logged_in
         self.session = session
-        
-        self.id = data['data']['attributes'].get('id')
-        self.title = data['data']['attributes'].get('title')
-        self.description = data['data']['attributes'].get('description')
-        self.cnt = data['data']['attributes'].get('cnt')
-        self.big_poster = data['data']['attributes'].get('big_poster')
-        self.small_poster = data['data']['attributes'].get('small_poster')
-        self.uid = data['data']['attributes'].get('uid')
-        self.toggle_url = data['data']['attributes'].get('toggle_url')
-        self.publish_type = data['data']['attributes'].get('publish_type')
-        self.create_type = data['data']['attributes'].get('create_type')
-        self.checked = data['data']['attributes'].get('checked')
-        self.order = data['data']['attributes'].get('order')
-        self.last_update = data['data']['attributes'].get('last_update')
-        self.isYours = data['data']['attributes'].get('isYours')
-        self.playlist_follow_link = data['data']['attributes'].get('playlist_follow_link')
-        self.playlist_follow_status = data['data']['attributes'].get('playlist_follow_status')
-        self.list_videos_playlist = data['data']['attributes'].get('list_videos_playlist')
+        self._attributes = data['data']['attributes']
+        self.limiter = limiter or AdaptiveLimiter()
         
         # self.videos: list[Video] = [Video({'data': video, 'included': []}, self.is_logged_in, self.session) for video in data['included'] if video['type'] == 'Video']
 
-        videos_data = []
-        for video in data['included']:
-            if video['type'] == 'Video':
-                response = self.session.get(f"{base_url}/api/fa/v1/video/video/show/videohash/{video['attributes']['uid']}?pr=1&mf=1", timeout=timeout)
-                data = response.json()
+        # Fetch the full details of every video, concurrently if the session allows it; unavailable videos are skipped
+        uids = [video['attributes']['uid'] for video in data['included'] if video['type'] == 'Video']
+        fetch = lambda uid: _fetch_video(self.session, uid, self.is_logged_in, timeout)
+        videos = self.limiter.map(fetch, uids) if _thread_safe(self.session) else map(fetch, uids)
+        self.videos: list[Video] = [video for video in videos if video]
 
-                if 'meta' in data and 'status' not in data['meta']:
-                    videos_data.append(Video(data, self.is_logged_in, self.session))
-                else:
-                    self.videos = {'data': video, 'included': []}
-        
-        self.videos: list[Video] = videos_data
+    @with_deadline
+    def download(self, resolution: str = None, download_highest_resolution: bool = None, path: str = None, show_progress_bar: bool = False, limiter: AdaptiveLimiter = None, deadline: float = None, progress: Callable[[DownloadProgress], None] = None, return_result: bool = False, store: DownloadStore = None, scheduler: DownloadScheduler = None, priority: int = 0) -> list[Union[str, DownloadResult]]:
+        """Download every video of the playlist, concurrently if the client was created with `thread_safe=True`.
+
+        The videos are submitted to `scheduler`, where they share the workers and
+        per-host caps with every other submission, under the playlist's name. If
+        one download fails, the videos that have not finished yet are withdrawn:
+        they are cancelled unless another submitter is waiting for them too.
+
+        Args:
+            resolution (str, optional): The desired video resolution (e.g., '144p', '720p').
+            download_highest_resolution (bool, optional): If True, download the highest available resolution.
+            path (str, optional): The directory where the videos will be saved. Defaults to the current directory.
+            show_progress_bar (bool, optional): If True, show a progress bar per video. Defaults to False.
+            limiter (AdaptiveLimiter, optional): Sets the number of parallel downloads. Defaults to a new limiter starting at 2 and capped at 8.
+            deadline (float, optional): The overall time budget in seconds for the download. Defaults to no deadline.
+            progress (Callable, optional): Called with a `DownloadProgress` after every chunk of every video.
+            return_result (bool, optional): If True, return `DownloadResult`s instead of paths. Defaults to False.
+            store (DownloadStore, optional): Serve videos already in this store from it, and keep a copy of the others.
+            scheduler (DownloadScheduler, optional): The scheduler to submit the downloads to. Defaults to a scheduler
+                of the playlist's own, with no per-host cap and as many workers as the limiter allows, or one
+                if the client was not created with `thread_safe=True`.
+            priority (int, optional): The priority of the downloads in `scheduler`. Defaults to 0.
 
-    def follow_playlist(self, timeout: int = 10) -> bool:
+        Returns:
+            list[Union[str, DownloadResult]]: The paths of the downloaded videos, or their download results, in playlist order.
+        """
+        if path and not path.endswith(os.sep):
+            path += os.sep
+        limiter = limiter or AdaptiveLimiter(initial=2, max_limit=8)
+        own = scheduler is None
+        if own:
+            scheduler = DownloadScheduler(max_workers=limiter.max_limit if _thread_safe(self.session) else 1, per_host=None)
+
+        jobs = [scheduler.submit(video, resolution, path, priority, f'playlist:{self.uid or self.id}', progress, limiter, store,
+                                 download_highest_resolution=download_highest_resolution, show_progress_bar=show_progress_bar) for video in self.videos]
+        try:
+            results = [job.wait() for job in jobs]
+        except BaseException:
+            for job in jobs:
+                job.withdraw()
+            raise
+        finally:
+            if own:
+                scheduler.shutdown(wait=False)
+
+        return results if return_result else [result.path for result in results]
+
+    @with_deadline
+    def follow_playlist(self, timeout: int = 10, deadline: float = None) -> bool:
         """Follow the playlist.
         
         Args:
             timeout (int, optional): The timeout for the HTTP request (default is 10 seconds).
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
         
         Returns:
             bool: True if the playlist was successfully followed, False otherwise.
@@ -835,11 +1260,13 @@ class Playlist(object):
                 return True
         return False
 
-    def unfollow_playlist(self, timeout: int = 10) -> bool:
+    @with_deadline
+    def unfollow_playlist(self, timeout: int = 10, deadline: float = None) -> bool:
         """Unfollow the playlist.
         
         Args:
             timeout (int, optional): The timeout for the HTTP request (default is 10 seconds).
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
         
         Returns:
             bool: True if the playlist was successfully unfollowed, False otherwise.
@@ -861,7 +1288,7 @@ class Playlist(object):
                 return True
         return False
 
-class User(object):
+class User(_Model):
     """ Aparat User Model
         
     Attributes:
@@ -890,41 +1317,46 @@ class User(object):
         has_event (str): The event status of the user.
     """
 
+    __slots__ = ()
+
+    id = _Field()
+    hash_user_id = _Field()
+    afcn = _Field()
+    username = _Field()
+    name = _Field()
+    pic_s = _Field()
+    pic_m = _Field()
+    pic_b = _Field()
+    follower_cnt = _Field()
+    follow_cnt = _Field()
+    official = _Field()
+    url = _Field()
+    video_cnt = _Field()
+    cover_src = _Field()
+    video_visit = _Field()
+    priority = _Field()
+    brand_priority = _Field()
+    description = _Field()
+    start_date = _Field()
+    start_date_jalali = _Field()
+    show_kids_friendly = _Field()
+    banned = _Field()
+    has_event = _Field()
+
     def __init__(self, data: Dict[str, Union[str, int]], is_logged_in, session):
         self.data = data
         self.session = session
         self.is_logged_in = is_logged_in
-        
-        self.id = data['data']['attributes'].get('id')
-        self.hash_user_id = data['data']['attributes'].get('hash_user_id')
-        self.afcn = data['data']['attributes'].get('afcn')
-        self.username = data['data']['attributes'].get('username')
-        self.name = data['data']['attributes'].get('name')
-        self.pic_s = data['data']['attributes'].get('pic_s')
-        self.pic_m = data['data']['attributes'].get('pic_m')
-        self.pic_b = data['data']['attributes'].get('pic_b')
-        self.follower_cnt = data['data']['attributes'].get('follower_cnt')
-        self.follow_cnt = data['data']['attributes'].get('follow_cnt')
-        self.official = data['data']['attributes'].get('official')
-        self.url = data['data']['attributes'].get('url')
-        self.video_cnt = data['data']['attributes'].get('video_cnt')
-        self.cover_src = data['data']['attributes'].get('cover_src')
-        self.video_visit = data['data']['attributes'].get('video_visit')
-        self.priority = data['data']['attributes'].get('priority')
-        self.brand_priority = data['data']['attributes'].get('brand_priority')
-        self.description = data['data']['attributes'].get('description')
-        self.start_date = data['data']['attributes'].get('start_date')
-        self.start_date_jalali = data['data']['attributes'].get('start_date_jalali')
-        self.show_kids_friendly = data['data']['attributes'].get('show_kids_friendly')
-        self.banned = data['data']['attributes'].get('banned')
-        self.has_event = data['data']['attributes'].get('has_event')
+        self._attributes = data['data']['attributes']
     
-    def follow(self, toggle_push_notifications: bool = False, timeout: int = 10) -> bool:
+    @with_deadline
+    def follow(self, toggle_push_notifications: bool = False, timeout: int = 10, deadline: float = None) -> bool:
         """
         Follow a user.
 
         :param toggle_push_notifications: A boolean indicating whether to toggle push notifications for the followed user.
         :param timeout: The timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: True if the user is successfully followed, False otherwise.
         """
         if not self.is_logged_in:
@@ -935,17 +1367,20 @@ class User(object):
                 if item['attributes']['status'] == 'unfollow':
                     response = self.session.get(item['attributes']['link'], timeout=timeout)
                     if response.status_code == 200:
+                        item['attributes']['status'] = 'follow'
                         if toggle_push_notifications:
                             data = response.json()
                             self.session.get(data['data']['attributes']['link_toggle_push_follow'], timeout=timeout)
                         return True
         return False
 
-    def unfollow(self, timeout: int = 10) -> bool:
+    @with_deadline
+    def unfollow(self, timeout: int = 10, deadline: float = None) -> bool:
         """
         Unfollow a user.
 
         :param timeout: The timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: True if the user is successfully followed, False otherwise.
         """
         if not self.is_logged_in:
@@ -956,40 +1391,86 @@ class User(object):
                 if item['attributes']['status'] == 'follow':
                     response = self.session.get(item['attributes']['link'], timeout=timeout)
                     if response.status_code == 200:
+                        item['attributes']['status'] = 'unfollow'
                         return True
         return False
 
+def _synchronized(method):
+    """Run an `Aparat` method while holding the client's lock."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class Aparat:
     """Aparat API Client
     
     Attributes:
         proxy (dict): The proxy dictionary, if used.
+        proxy_pool (ProxyPool): The proxy pool, if used.
+        circuit_breakers (CircuitBreakers): The per-endpoint circuit breakers, if used.
+        instrumentation (Instrumentation): The request instrumentation hooks, if used.
+        bandwidth (BandwidthLimiter): The byte-rate budget of downloads and uploads, if used.
+        limiter (AdaptiveLimiter): The concurrency limiter used for playlist, bulk video and comment fetches.
         session (requests.Session): The requests session object.
         is_logged_in (bool): Flag indicating if the client is logged in.
+        thread_safe (bool): Flag indicating if the client uses per-thread sessions with a shared cookie jar.
     """
 
-    def __init__(self, proxy: Union[None, dict] = None):
+    def __init__(self, proxy: Union[None, dict] = None, thread_safe: bool = False, proxy_pool: ProxyPool = None, circuit_breakers: CircuitBreakers = None, instrumentation: Instrumentation = None, bandwidth: BandwidthLimiter = None):
         """Initialize Aparat API client.
         
         Args:
             proxy (dict, optional): The proxy configuration dictionary. Defaults to None.
                 Example: {'http': 'http://proxy.example.com:8080', 'https': 'https://proxy.example.com:8080'}
-        """
-
-        self.session = requests.Session()
+            proxy_pool (ProxyPool, optional): Rotate requests across the proxies of this pool. Takes precedence over `proxy`.
+            circuit_breakers (CircuitBreakers, optional): Fail requests immediately with `CircuitOpenError` while the
+                circuit of their endpoint family is open. Defaults to None (no circuit breaking).
+            instrumentation (Instrumentation, optional): Call its hooks before and after every request. Defaults to None.
+            bandwidth (BandwidthLimiter, optional): Pace video downloads and uploads within this byte-rate budget. Defaults to None.
+            thread_safe (bool, optional): If True, every thread gets its own HTTP session and all of them
+                share one synchronized cookie jar, so a single client can be used from many threads. Defaults to False.
+        """
+
+        self.proxy_pool = proxy_pool
+        self.circuit_breakers = circuit_breakers
+        self.instrumentation = instrumentation
+        self.bandwidth = bandwidth
+        if thread_safe:
+            self.session = ThreadLocalSession(lambda: AparatSession(proxy_pool, circuit_breakers, instrumentation, bandwidth))
+        else:
+            self.session = AparatSession(proxy_pool, circuit_breakers, instrumentation, bandwidth)
+        self.session.hooks['response'].append(self._check_auth_response)
         self.is_logged_in = False
+        self.username = None
+        self.thread_safe = thread_safe
+        self.limiter = AdaptiveLimiter()
+        self.limiter.attach(self.session)
+        self._lock = threading.RLock()
         self.proxy = proxy
+        self._auth_checked_at = None
 
         if self.proxy:
             self.session.proxies.update(self.proxy)
 
-    def login(self, username: str, password: str, timeout: int = 10) -> bool:
+    def _set_logged_in(self, username: str) -> None:
+        """Record a successful login."""
+        with self._lock:
+            self.username = username
+            self.is_logged_in = True
+            self._auth_checked_at = None
+
+    @with_deadline
+    @_synchronized
+    def login(self, username: str, password: str, timeout: int = 10, deadline: float = None) -> bool:
         """
         Log in to the Aparat account.
 
         :param username: The username of the Aparat account.
         :param password: The password of the Aparat account.
         :param timeout: The timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: AuthV1 cookie if login is successful, otherwise None.
         """
 
@@ -1021,8 +1502,7 @@ class Aparat:
             response = self.session.post(f'{base_url}/api/fa/v1/user/Authenticate/signin_step2?callbackType=postmessage', json=json_data, timeout=timeout)
 
             if response.status_code == 200:
-                self.is_logged_in = True
-                self.username = username
+                self._set_logged_in(username)
                 return True
             elif response.status_code == 403 and response.json()['errors'][0]['type_info'] == 'get_max_tokens':
                 url = base_url + response.json()['errors'][0]['uri']
@@ -1042,8 +1522,7 @@ class Aparat:
                 }
                 response = self.session.get(url, params=params, timeout=timeout)
 
-                self.is_logged_in = True
-                self.username = username
+                self._set_logged_in(username)
                 return True
             elif response.status_code == 401:
                 raise IncorrectPasswordError()
@@ -1079,12 +1558,14 @@ class Aparat:
         response = self.session.post('https://www.aparat.com/api/fa/v1/user/Authenticate/auth?callbackType=postmessage', json=json_data, timeout=timeout)
         return response.json()['data']['attributes']['temp_id']
 
-    def signup_step1(self, account: str, timeout: int = 10) -> bool:
+    @with_deadline
+    def signup_step1(self, account: str, timeout: int = 10, deadline: float = None) -> bool:
         """Perform the first step of the signup process.
         
         Args:
             account (str): The account identifier (email or phone number).
             timeout (int, optional): The timeout for the HTTP request (default is 10 seconds).
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
 
         Returns:
             bool: True if the first step is successful, otherwise raises an exception.
@@ -1103,7 +1584,9 @@ class Aparat:
             data = response.json()
             raise ValueError(data)
 
-    def signup_step2(self, url: str, account: str, password: str, timeout: int = 10) -> bool:
+    @with_deadline
+    @_synchronized
+    def signup_step2(self, url: str, account: str, password: str, timeout: int = 10, deadline: float = None) -> bool:
         """Perform the second step of the signup process using the verification link.
 
         Args:
@@ -1111,6 +1594,7 @@ class Aparat:
             account (str): The account identifier (email or phone number).
             password (str): The password for the new account.
             timeout (int, optional): The timeout for the HTTP request (default is 10 seconds).
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
 
         Returns:
             bool: True if the signup process is successful, otherwise raises an exception.
@@ -1146,15 +1630,16 @@ class Aparat:
             'guid': guid,
         }
         response = self.session.post(f'https://www.aparat.com/api/fa/v1/user/Authenticate/signup_step2{additionalget}', json=json_data, timeout=timeout)
-        self.is_logged_in = True
-        self.username = account
+        self._set_logged_in(account)
         return True
 
-    def get_me(self, timeout: int = 10) -> Union[Dict, None]:
+    @with_deadline
+    def get_me(self, timeout: int = 10, deadline: float = None) -> Union[Dict, None]:
         """
         Get information about the current user.
 
         :param timeout: The timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: A dictionary containing user information if successful, otherwise None.
         """
 
@@ -1167,12 +1652,14 @@ class Aparat:
             return data['data']
         return None
 
-    def get_user(self, user_id: str, timeout: int = 10) -> User:
+    @with_deadline
+    def get_user(self, user_id: str, timeout: int = 10, deadline: float = None) -> User:
         """
         Get information about a user by their username.
 
         :param user_id: The username of the user.
         :param timeout: The timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: A dictionary containing user information if successful, otherwise None.
         """
 
@@ -1182,7 +1669,8 @@ class Aparat:
             return User(data, self.is_logged_in, self.session)
         return None
 
-    def get_my_videos(self, timeout: int = 10) -> list[MyVideo]:
+    @with_deadline
+    def get_my_videos(self, timeout: int = 10, deadline: float = None) -> list[MyVideo]:
         """
         Get my videos.
 
@@ -1191,6 +1679,7 @@ class Aparat:
 
         Args:
             timeout (int, optional): The timeout for the HTTP request in seconds. Defaults to 10.
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
 
         Returns:
             list[MyVideo]: A list of MyVideo objects if successful, otherwise an empty list.
@@ -1208,7 +1697,8 @@ class Aparat:
             return [MyVideo(video, self.is_logged_in, self.session) for video in data['included']]
         return []
 
-    def get_my_video(self, id: str = None, uid: str = None, timeout: int = 10) -> MyVideo:
+    @with_deadline
+    def get_my_video(self, id: str = None, uid: str = None, timeout: int = 10, deadline: float = None) -> MyVideo:
         """
         Get a video by its ID or UID.
 
@@ -1216,6 +1706,7 @@ class Aparat:
             id (str, optional): The ID of the video.
             uid (str, optional): The UID of the video.
             timeout (int, optional): The timeout for the HTTP request (default is 10 seconds).
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
 
         Returns:
             MyVideo: The video object.
@@ -1241,13 +1732,15 @@ class Aparat:
                         return MyVideo(video, self.is_logged_in, self.session)
         return None
 
-    def get_comment(self, uid: str, comment_id: str, timeout: int = 10) -> Comment:
+    @with_deadline
+    def get_comment(self, uid: str, comment_id: str, timeout: int = 10, deadline: float = None) -> Comment:
         """
         Get information about a comment by their username.
 
         :param uid: The UID of the video.
         :param comment_id: The ID of the comment.
         :param timeout: The timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: A Comment object containing comment information if successful.
         :raises ValueError: If the comment is not found.
         """
@@ -1267,11 +1760,13 @@ class Aparat:
                             return Comment(comment['attributes'], uid, self.is_logged_in, self.session)
         raise ValueError('No comment found.')
 
-    def notifications(self, timeout: int = 10) -> Union[Dict, None]:
+    @with_deadline
+    def notifications(self, timeout: int = 10, deadline: float = None) -> Union[Dict, None]:
         """
         Get notifications for the current user.
 
         :param timeout: The timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: A dictionary containing notifications if successful, otherwise None.
         """
         response = self.session.get(f'{base_url}/api/fa/v1/user/message/list', timeout=timeout)
@@ -1280,11 +1775,13 @@ class Aparat:
             return data
         return None
 
-    def dashboard(self, timeout: int = 10) -> Union[Dict, None]:
+    @with_deadline
+    def dashboard(self, timeout: int = 10, deadline: float = None) -> Union[Dict, None]:
         """
         Get the dashboard for the current user.
 
         :param timeout: The timeout for the HTTP request (default is 10 seconds).
+        :param deadline: The overall time budget in seconds for all requests of the operation (default is no deadline).
         :return: A dictionary containing the user's dashboard if successful, otherwise None.
         """
         response = self.session.get(f'{base_url}/api/fa/v1/user/dashboard/comments/list_type/all', timeout=timeout)
@@ -1293,12 +1790,45 @@ class Aparat:
             return data
         return None
 
-    def get_video(self, uid: str, timeout: int = 10) -> Video:
+    def iter_dashboard_comments(self, timeout: int = 10) -> Iterator[Comment]:
+        """
+        Iterate over all comments of the current user's dashboard, one page at a time.
+
+        Every page is a JSON:API document: each comment in `data` names its video in
+        `relationships.video`, and the video itself, with its `uid`, is in `included`.
+
+        :param timeout: The timeout for each HTTP request (default is 10 seconds).
+        :return: An iterator of Comment objects.
+        :raises LoginRequiredError: If the user is not logged in.
+        :raises UnexpectedResponseError: If a comment has no attributes, or its video UID cannot be found.
+        """
+
+        if not self.is_logged_in:
+            raise LoginRequiredError()
+
+        url = f'{base_url}/api/fa/v1/user/dashboard/comments/list_type/all'
+        while url:
+            response = self.session.get(url, timeout=timeout)
+            if response.status_code != 200:
+                return
+            data = response.json()
+            videos = {item['id']: item['attributes']['uid'] for item in data.get('included') or [] if item.get('type') == 'Video'}
+            for comment in data.get('data') or []:
+                video = ((comment.get('relationships') or {}).get('video') or {}).get('data') or {}
+                uid = videos.get(video.get('id'))
+                if 'attributes' not in comment or not uid:
+                    raise UnexpectedResponseError(f"The video of dashboard comment {comment.get('id')!r} is missing from the response.")
+                yield Comment(comment['attributes'], uid, self.is_logged_in, self.session)
+            url = (data.get('links') or {}).get('more')
+
+    @with_deadline
+    def get_video(self, uid: str, timeout: int = 10, deadline: float = None) -> Video:
         """Get video details from Aparat.
         
         Args:
             uid (str): The video UID.
             timeout (int, optional): The timeout for the HTTP request (default is 10 seconds).
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
         
         Returns:
             Video: An instance of the Video class representing the video.
@@ -1306,20 +1836,85 @@ class Aparat:
         Raises:
             VideoNotFoundError: If the requested video is not found.
         """
-        response = self.session.get(f'{base_url}/api/fa/v1/video/video/show/videohash/{uid}?pr=1&mf=1', timeout=timeout)
-        data = response.json()
-
-        if 'meta' in data and 'status' not in data['meta']:
-            return Video(data, self.is_logged_in, self.session)
-        else:
+        video = _fetch_video(self.session, uid, self.is_logged_in, timeout)
+        if video is None:
             raise VideoNotFoundError()
+        return video
+
+    @with_deadline
+    def get_videos(self, uids: list, limiter: AdaptiveLimiter = None, timeout: int = 10, deadline: float = None) -> list[Video]:
+        """Get the details of many videos concurrently.
+
+        The videos are only fetched concurrently if the client was created with
+        `thread_safe=True`; a plain session is not shared across threads.
+
+        Args:
+            uids (list): The video UIDs.
+            limiter (AdaptiveLimiter, optional): The concurrency limiter to use. Defaults to the client's limiter.
+            timeout (int, optional): The timeout for each HTTP request (default is 10 seconds).
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
+
+        Returns:
+            list[Video]: The videos that exist, in the order of `uids`.
+        """
+        fetch = lambda uid: _fetch_video(self.session, uid, self.is_logged_in, timeout)
+        videos = (limiter or self.limiter).map(fetch, uids) if _thread_safe(self.session) else map(fetch, uids)
+        return [video for video in videos if video]
+
+    @with_deadline
+    def fetch_images(self, items: list, cache: ImageCache, variants: list = None, limiter: AdaptiveLimiter = None, timeout: int = 10, deadline: float = None) -> list[Dict[str, Union[str, None]]]:
+        """Download the poster, avatar and cover images of many models into a disk cache.
+
+        The images are fetched concurrently if the client was created with `thread_safe=True`.
+        Identical URLs are fetched once, and images already in `cache` are not fetched at all.
+
+        Args:
+            items (list): `Video`, `Playlist` and `User` objects.
+            cache (ImageCache): The cache the images are stored in.
+            variants (list, optional): The image fields to fetch, among 'big_poster', 'medium_poster', 'small_poster',
+                'pic_s', 'pic_m', 'pic_b' and 'cover_src'. Defaults to all fields of each model.
+            limiter (AdaptiveLimiter, optional): Sets the number of images fetched in parallel.
+            timeout (int, optional): The timeout for each HTTP request (default is 10 seconds).
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
+
+        Returns:
+            list[Dict[str, Union[str, None]]]: For every item, the local path of each image by field name, or None if it could not be downloaded.
+        """
+        return fetch_images(self.session, items, cache, variants, limiter, timeout)
+
+    def crawl_comments(self, uids: list, limiter: AdaptiveLimiter = None, perpage: int = 100, timeout: int = 10) -> Iterator[Comment]:
+        """Iterate over the comments of many videos, crawling the videos concurrently.
+
+        Comments are yielded page by page as they arrive; each video being crawled
+        reads at most two pages ahead of the caller. The videos are only crawled
+        concurrently if the client was created with `thread_safe=True`.
 
-    def get_playlist(self, playlist_id: int, timeout: int = 10) -> Playlist:
+        Args:
+            uids (list): The video UIDs.
+            limiter (AdaptiveLimiter, optional): The concurrency limiter to use. Defaults to the client's limiter.
+            perpage (int, optional): The number of comments requested per page (default is 100).
+            timeout (int, optional): The timeout for each HTTP request (default is 10 seconds).
+
+        Yields:
+            Comment: The comments, grouped by video in the order of `uids`.
+        """
+        pages = lambda uid: _iter_comment_pages(self.session, uid, self.is_logged_in, perpage, timeout)
+        if not _thread_safe(self.session):
+            for uid in uids:
+                for page in pages(uid):
+                    yield from page
+            return
+        for page in (limiter or self.limiter).stream(pages, uids):
+            yield from page
+
+    @with_deadline
+    def get_playlist(self, playlist_id: int, timeout: int = 10, deadline: float = None) -> Playlist:
         """Get playlist details from Aparat.
         
         Args:
             playlist_id (int): The ID of the playlist to retrieve.
             timeout (int, optional): The timeout for the request in seconds. Defaults to 10.
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
         
         Returns:
             Playlist: An instance of the Playlist class containing the details of the requested playlist.
@@ -1335,7 +1930,7 @@ class Aparat:
         response = self.session.get(f'{base_url}/api/fa/v1/video/playlist/one/playlist_id/{playlist_id}', timeout=timeout)
         if response.status_code == 200:
             data = response.json()
-            return Playlist(data, self.is_logged_in, self.session)
+            return Playlist(data, self.is_logged_in, self.session, timeout, self.limiter)
         else:
             raise ValueError('There is no playlist with this ID.')
 
@@ -1371,7 +1966,8 @@ class Aparat:
             if response.status_code == 404:
                 return new_uuid
 
-    def upload_video(self, video: str, title: str, category: VideoCategory, tag_list: list, comment: str = 'yes', watermark: bool = True, inappropriate_child_content: bool = False, thumbnail: str = '', description: str = '', retries: int = 6, timeout: int = 10) -> MyVideo:
+    @with_deadline
+    def upload_video(self, video: str, title: str, category: VideoCategory, tag_list: list, comment: str = 'yes', watermark: bool = True, inappropriate_child_content: bool = False, thumbnail: str = '', description: str = '', retries: int = 6, timeout: int = 10, deadline: float = None) -> MyVideo:
         """Uploads a video to Aparat.
 
         Args:
@@ -1385,6 +1981,7 @@ class Aparat:
             description (str, optional): The description of the video. Defaults to ''.
             retries (int, optional): The number of retries for uploading. Defaults to 6.
             timeout (int, optional): The timeout for each HTTP request in seconds. Defaults to 10.
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
 
         Returns:
             MyVideo: An object representing the uploaded video.
@@ -1425,28 +2022,37 @@ class Aparat:
         # Prepare headers for upload request
         headers = {'x-token': data['data'][0]['attributes']['token']}
         uploadId = data['data'][0]['attributes']['uploadId']
-        uuid_ = self.__generate_unique_uuid(timeout)
-
-        # Prepare files for upload
-        files = {
-            'qqpartindex': (None, '0'),
-            'qqchunksize': (None, size),
-            'qqpartbyteoffset': (None, '0'),
-            'qqtotalfilesize': (None, size),
-            'qqtype': (None, mime_type),
-            'qquuid': (None, uuid_),
-            'qqfilename': (None, video),
-            'qqfilepath': (None, video),
-            'qqtotalparts': (None, '1'),
-            'qqfile': (video, open(video, 'rb'), 'application/octet-stream')
-        }
 
-        # Upload video file
-        response = requests.post(f'{upload_base_url}/upload', headers=headers, files=files)
+        # Send every request to the upload host through the same proxy
+        with self.session.pin_proxy(), open(video, 'rb') as file:
+            uuid_ = self.__generate_unique_uuid(timeout)
+
+            # Prepare files for upload
+            files = {
+                'qqpartindex': (None, '0'),
+                'qqchunksize': (None, size),
+                'qqpartbyteoffset': (None, '0'),
+                'qqtotalfilesize': (None, size),
+                'qqtype': (None, mime_type),
+                'qquuid': (None, uuid_),
+                'qqfilename': (None, video),
+                'qqfilepath': (None, video),
+                'qqtotalparts': (None, '1'),
+                'qqfile': (video, file, 'application/octet-stream')
+            }
+
+            # Upload video file, paced by the bandwidth budget if there is one
+            if self.bandwidth is not None:
+                body = self.bandwidth.transfer().multipart(files)
+                response = self.session.post(f'{upload_base_url}/upload', headers={**headers, 'Content-Type': body.content_type}, data=body)
+            else:
+                response = self.session.post(f'{upload_base_url}/upload', headers=headers, files=files)
+
+            # Stop if the upload failed
+            if not response.json()['success']:
+                return None
 
-        # If upload is successful
-        if response.json()['success']:
-            requests.post(f'{upload_base_url}/file/{uuid_}', timeout=timeout)
+            self.session.post(f'{upload_base_url}/file/{uuid_}', timeout=timeout)
 
             # Notify server that upload chunks are done
             data = {
@@ -1455,89 +2061,197 @@ class Aparat:
                 'qqtotalfilesize': size,
                 'qqtotalparts': '1'
             }
-            requests.post(f'{upload_base_url}/chunksdone', headers=headers, data=data, timeout=timeout)
+            self.session.post(f'{upload_base_url}/chunksdone', headers=headers, data=data, timeout=timeout)
 
-            # Prepare thumbnail data if provided
-            if thumbnail:
-                with open(thumbnail, "rb") as file:
-                    image_content = file.read()
-                    image_base64 = base64.b64encode(image_content).decode('utf-8')
+        # Prepare thumbnail data if provided
+        if thumbnail:
+            with open(thumbnail, "rb") as file:
+                image_content = file.read()
+                image_base64 = base64.b64encode(image_content).decode('utf-8')
 
-                thumbnail = f'data:image/jpeg;base64,{image_base64}'
+            thumbnail = f'data:image/jpeg;base64,{image_base64}'
 
-            # Prepare JSON data for video metadata
-            json_data = {
-                'uploadId': uploadId,
-                'video': uuid_,
-
-                'watermark': '1' if watermark else '0',
-                'watermark_bool': watermark,
-                'comment': comment,  # 'yes', 'approve', 'no'
-                'kids_friendly': inappropriate_child_content,
-                'title': title,
-                'descr': description,
-                'thumbnail': thumbnail,
-                'tags': '-'.join(tag_list),
-                'category': category.value if type(category) == VideoCategory else category,
-                'upload_base_url': upload_base_url,
-
-                'new_playlist': '',
-                'playlist_temp': '',
-                'playlistid': [],
-                'subtitle': [],
-                'subtitle_temp': [],
-                'publish_date': '',
-                'video_pass': 0,
-            }
+        # Prepare JSON data for video metadata
+        json_data = {
+            'uploadId': uploadId,
+            'video': uuid_,
+
+            'watermark': '1' if watermark else '0',
+            'watermark_bool': watermark,
+            'comment': comment,  # 'yes', 'approve', 'no'
+            'kids_friendly': inappropriate_child_content,
+            'title': title,
+            'descr': description,
+            'thumbnail': thumbnail,
+            'tags': '-'.join(tag_list),
+            'category': category.value if type(category) == VideoCategory else category,
+            'upload_base_url': upload_base_url,
 
-            # Upload video metadata
-            response = self.session.post(f'{base_url}/api/fa/v1/video/upload/upload/uploadId/{uploadId}', json=json_data, timeout=timeout)
-            data = response.json()
-            if 'data' in data:
-                return self.get_my_video(id=data['data']['id'])
-            else:
-                raise ValueError(data)
+            'new_playlist': '',
+            'playlist_temp': '',
+            'playlistid': [],
+            'subtitle': [],
+            'subtitle_temp': [],
+            'publish_date': '',
+            'video_pass': 0,
+        }
+
+        # Upload video metadata
+        response = self.session.post(f'{base_url}/api/fa/v1/video/upload/upload/uploadId/{uploadId}', json=json_data, timeout=timeout)
+        data = response.json()
+        if 'data' in data:
+            return self.get_my_video(id=data['data']['id'])
+        else:
+            raise ValueError(data)
 
+    @_synchronized
     def logout(self) -> None:
         """
         Log out from the Aparat account.
+
+        The cookies are cleared in place, so objects created by this client keep a valid session.
         """
-        self.session = requests.Session()
+        self.session.cookies.clear()
         self.is_logged_in = False
+        self._auth_checked_at = None
 
-    def save_session(self) -> None:
+    def save_session(self, path: str = None) -> None:
         """
-        Save the session object to a file.
+        Save the session to a file.
+
+        Only the cookies, the username and an expiry hint are stored, as JSON. The file
+        holds the login cookies, so it is made readable and writable by its owner only.
+
+        Args:
+            path (str, optional): The file to write. Defaults to '<username>.session'.
         """
         if not self.is_logged_in:
             raise LoginRequiredError()
-        
-        with open(f'{self.username}.session', 'wb') as file:
-            pickle.dump(self.session, file)
 
-    def load_session(self, username: str, timeout: int = 10) -> bool:
+        cookies = [
+            {
+                'name': cookie.name,
+                'value': cookie.value,
+                'domain': cookie.domain,
+                'path': cookie.path,
+                'expires': cookie.expires,
+                'secure': cookie.secure,
+            }
+            for cookie in self.session.cookies
+        ]
+        auth_expires = [cookie['expires'] for cookie in cookies if cookie['name'] == 'AuthV1' and cookie['expires']]
+
+        state = {
+            'version': 1,
+            'username': self.username,
+            'saved_at': int(time.time()),
+            'expires': min(auth_expires) if auth_expires else None,
+            'cookies': cookies,
+        }
+        fd = os.open(path or f'{self.username}.session', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        if hasattr(os, 'fchmod'):
+            os.fchmod(fd, 0o600)  # the mode of os.open only applies to a new file
+        with os.fdopen(fd, 'w') as file:
+            json.dump(state, file, separators=(',', ':'))
+
+    @with_deadline
+    @_synchronized
+    def load_session(self, username: str, timeout: int = 10, validate: bool = False, path: str = None, allow_legacy_pickle: bool = False, deadline: float = None) -> bool:
         """
-        Load the session object from a file.
-        
+        Load the session from a file.
+
+        The login is not checked against the server unless `validate` is True. Otherwise it is
+        checked lazily: the client is marked as logged out as soon as a request is rejected
+        with 401, and `verify_session()` can be called at any time.
+
+        Files written by older versions are pickled sessions. Unpickling a file can run
+        arbitrary code, so they are only read with `allow_legacy_pickle=True`.
+
         Args:
             username (str): The username of the account.
             timeout (int, optional): The timeout for the HTTP request (default is 10 seconds).
-            
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
+            validate (bool, optional): If True, verify the login with the server before returning. Defaults to False.
+            path (str, optional): The file to read. Defaults to '<username>.session'.
+            allow_legacy_pickle (bool, optional): If True, also read pickled session files written by older
+                versions. Only use it for files you wrote yourself. Defaults to False.
+
         Returns:
             bool: True if the session is successfully loaded and the user is logged in, False otherwise.
+
+        Raises:
+            ValueError: If the file is a pickled session and `allow_legacy_pickle` is False.
         """
-        with open(f'{username}.session', 'rb') as file:
-            session = pickle.load(file)
+        with open(path or f'{username}.session', 'rb') as file:
+            content = file.read()
+
+        if content[:1] == b'\x80':
+            if not allow_legacy_pickle:
+                raise ValueError("The session file was written by an older version as a pickle, which is not read by default "
+                                 "because unpickling can run arbitrary code. Log in and save the session again, or pass "
+                                 "allow_legacy_pickle=True if you wrote the file yourself.")
+            session = pickle.loads(content)
 
             response = session.get(f'{base_url}/api/fa/v1/etc/page/config/mode/full', timeout=timeout)
             if response.json()['included'][0]['attributes']:
-                self.session = session
-                self.is_logged_in = True
-                self.username = username
+                self.session.cookies.update(session.cookies)
+                self._set_logged_in(username)
                 return True
             else:
                 return False
-    
+
+        state = json.loads(content)
+        if state.get('expires') and state['expires'] < time.time():
+            return False
+
+        for cookie in state['cookies']:
+            self.session.cookies.set(
+                cookie['name'], cookie['value'],
+                domain=cookie['domain'], path=cookie['path'], expires=cookie['expires'], secure=cookie['secure'],
+            )
+        self._set_logged_in(state.get('username') or username)
+
+        if validate:
+            return self.verify_session(timeout=timeout)
+        return True
+
+    @with_deadline
+    def verify_session(self, timeout: int = 10, max_age: float = 300, deadline: float = None) -> bool:
+        """
+        Check that the current login is still accepted by the server.
+
+        The result is cached for `max_age` seconds. If the login is rejected the client
+        is marked as logged out.
+
+        Args:
+            timeout (int, optional): The timeout for the HTTP request (default is 10 seconds).
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
+            max_age (float, optional): How long a previous result is reused, in seconds. Defaults to 300.
+
+        Returns:
+            bool: True if the client is logged in, False otherwise.
+        """
+        if not self.is_logged_in:
+            return False
+
+        if self._auth_checked_at is not None and time.monotonic() - self._auth_checked_at < max_age:
+            return True
+
+        response = self.session.get(f'{base_url}/api/fa/v1/user/user/information', timeout=timeout)
+        if response.status_code == 200:
+            self._auth_checked_at = time.monotonic()
+            return True
+
+        self.is_logged_in = False
+        self._auth_checked_at = None
+        return False
+
+    def _check_auth_response(self, response, *args, **kwargs):
+        """Session response hook marking the client as logged out when a request is rejected with 401."""
+        if response.status_code == 401 and self.is_logged_in and response.url.startswith(base_url):
+            self.is_logged_in = False
+            self._auth_checked_at = None
+
     def get_AuthV1(self) -> str:
         """
         Get the AuthV1 cookie.
@@ -1553,25 +2267,27 @@ class Aparat:
         
         return self.session.cookies.get('AuthV1')
 
-    def load_AuthV1(self, AuthV1: str, timeout: int = 10) -> bool:
+    @with_deadline
+    @_synchronized
+    def load_AuthV1(self, AuthV1: str, timeout: int = 10, deadline: float = None) -> bool:
         """
         Load the AuthV1 cookie.
 
         Args:
             AuthV1 (str): The value of the AuthV1 cookie.
             timeout (int, optional): The timeout for the server request. Defaults to 10 seconds.
+            deadline (float, optional): The overall time budget in seconds for all requests of the operation. Defaults to no deadline.
 
         Returns:
             bool: `True` if the cookie is loaded successfully, otherwise `False`.
         """
         cookies = {'AuthV1': AuthV1}
 
-        response = requests.get(f'{base_url}/api/fa/v1/user/user/information', cookies=cookies, timeout=timeout)
+        response = self.session.get(f'{base_url}/api/fa/v1/user/user/information', cookies=cookies, timeout=timeout)
         data = response.json()
         if response.status_code == 200:
             self.session.cookies.set('AuthV1', AuthV1)
-            self.is_logged_in = True
-            self.username = data['data']['attributes']['email'] if data['data']['attributes']['has_email'] else data['data']['attributes']['username']
+            self._set_logged_in(data['data']['attributes']['email'] if data['data']['attributes']['has_email'] else data['data']['attributes']['username'])
             return True
         else:
             return False
@@ -0,0 +1,130 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Iterable, Iterator, Tuple, Union
+from .session import _thread_safe
+from .throttle import RateLimiter
+
+class ActionResult(object):
+    """Outcome of one action run by `BulkExecutor`.
+
+    Attributes:
+        target: The model object the action was applied to.
+        action (str): The name of the method that was called (e.g. 'like', 'follow').
+        status (str): 'done', 'failed', 'skipped' or 'error'.
+        result: The value returned by the method, if it was called.
+        error (Exception): The exception raised by the method, if any.
+    """
+
+    __slots__ = ('target', 'action', 'status', 'result', 'error')
+
+    def __init__(self, target, action: str, status: str, result=None, error: Exception = None):
+        self.target = target
+        self.action = action
+        self.status = status
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        """True if the action succeeded or was skipped as a no-op."""
+        return self.status in ('done', 'skipped')
+
+    def __repr__(self):
+        return f'<ActionResult {self.action} {self.status}>'
+
+def _included_status(target, type_: str) -> Union[str, None]:
+    for item in target.data.get('included') or []:
+        if item.get('type') == type_:
+            return item['attributes']['status']
+    return None
+
+def _is_noop(target, action: str) -> bool:
+    """Return True if `action` would not send a request for `target`.
+
+    This mirrors the status checks made by the model methods themselves.
+    """
+    if action in ('like', 'unlike'):
+        if isinstance(target.data.get('like'), dict):  # Comment
+            status = target.data['like'].get('status')
+        else:
+            status = _included_status(target, 'Like')
+        return status != ('unlike' if action == 'like' else 'like')
+
+    if action in ('follow', 'unfollow'):
+        status = _included_status(target, 'Follow')
+        return status != ('unfollow' if action == 'follow' else 'follow')
+
+    if action == 'follow_playlist':
+        return target.playlist_follow_status != 'no'
+
+    if action == 'unfollow_playlist':
+        return target.playlist_follow_status != 'yes'
+
+    return False
+
+class BulkExecutor(object):
+    """Run many model actions concurrently under a shared rate limit.
+
+    Only actions on targets of a client created with `thread_safe=True` run on
+    the worker threads. The others are run one at a time on the thread reading
+    the results, since a plain session must not be used by several threads.
+
+    Example:
+        >>> executor = BulkExecutor(max_workers=8, rate=5)
+        >>> for result in executor.run([(video, 'like'), (user, 'follow'), (video, 'report', {'reason': ReportReason.OTHER})]):
+        ...     print(result.target, result.status)
+    """
+
+    def __init__(self, max_workers: int = 8, rate: float = None, limiter: RateLimiter = None, skip_noops: bool = True):
+        """Initialize the executor.
+
+        Args:
+            max_workers (int, optional): The number of actions run in parallel. Defaults to 8.
+            rate (float, optional): The maximum number of requests per second. Defaults to no limit.
+            limiter (RateLimiter, optional): A limiter shared with other executors. Overrides `rate`.
+            skip_noops (bool, optional): If True, actions whose like/follow status makes them a no-op are skipped without a request. Defaults to True.
+        """
+        self.max_workers = max_workers
+        self.limiter = limiter or (RateLimiter(rate) if rate else None)
+        self.skip_noops = skip_noops
+
+    def _call(self, target, action: str, kwargs: dict) -> ActionResult:
+        if self.limiter:
+            self.limiter.acquire()
+        try:
+            result = getattr(target, action)(**kwargs)
+        except Exception as e:
+            return ActionResult(target, action, 'error', error=e)
+        return ActionResult(target, action, 'done' if result else 'failed', result=result)
+
+    def run(self, actions: Iterable[Union[Tuple[object, str], Tuple[object, str, dict]]]) -> Iterator[ActionResult]:
+        """Run the actions and yield their outcomes as they complete.
+
+        `actions` is consumed lazily: at most a few batches of work are queued ahead of
+        the workers, so it can be a generator over paginated API results.
+
+        Args:
+            actions (Iterable): (target, action) or (target, action, kwargs) tuples, where `action`
+                is the name of a method of `target` such as 'like', 'follow', 'report' or 'delete'.
+
+        Yields:
+            ActionResult: One result per action, in completion order.
+        """
+        max_pending = self.max_workers * 4
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = set()
+            for item in actions:
+                target, action = item[0], item[1]
+                kwargs = item[2] if len(item) > 2 else {}
+                if self.skip_noops and _is_noop(target, action):
+                    yield ActionResult(target, action, 'skipped')
+                    continue
+                if not _thread_safe(getattr(target, 'session', None)):
+                    yield self._call(target, action, kwargs)
+                    continue
+                pending.add(pool.submit(self._call, target, action, kwargs))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in as_completed(pending):
+                yield future.result()
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Union
+import requests
+
+class CircuitOpenError(requests.RequestException):
+    """Exception raised when a request is refused because the circuit of its endpoint family is open."""
+    def __init__(self, family: str = None, retry_after: float = None, message: str = None):
+        self.family = family
+        self.retry_after = retry_after
+        self.message = message or f"The circuit for '{family}' is open; retry in {retry_after or 0:.1f} seconds."
+        super().__init__(self.message)
+
+class CircuitBreaker(object):
+    """Circuit breaker for one endpoint family.
+
+    The breaker is closed while the failure rate over the last `window` calls stays
+    at or below `failure_rate`. Above it (after at least `min_calls` calls) it opens
+    and refuses calls for `reset_timeout` seconds. It then becomes half-open and lets
+    `half_open_calls` probe calls through: if they all succeed it closes, otherwise it
+    opens again.
+
+    Attributes:
+        family (str): The endpoint family guarded by the breaker.
+        state (str): 'closed', 'open' or 'half_open'.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, family: str, failure_rate: float = 0.5, window: int = 20, min_calls: int = 10, reset_timeout: float = 30, half_open_calls: int = 1):
+        self.family = family
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+
+        self._state = self.CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        self._probes = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._update()
+            return self._state
+
+    def _update(self) -> None:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+            self._probe_successes = 0
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def before_call(self) -> None:
+        """Reserve a call, or raise `CircuitOpenError` if the breaker refuses it."""
+        with self._lock:
+            self._update()
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return
+            retry_after = 0 if self._state == self.HALF_OPEN else self.reset_timeout - (time.monotonic() - self._opened_at)
+            raise CircuitOpenError(self.family, max(0, retry_after))
+
+    def record(self, ok: Union[bool, None]) -> None:
+        """Record the outcome of a call reserved with `before_call()`.
+
+        Args:
+            ok (bool): True for success, False for failure, None if the call ended for an unrelated reason.
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                if ok is False:
+                    self._open()
+                elif ok:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_calls:
+                        self._state = self.CLOSED
+                else:
+                    self._probes -= 1
+                return
+
+            if ok is None or self._state != self.CLOSED:
+                return
+            self._outcomes.append(ok)
+            if len(self._outcomes) >= self.min_calls:
+                failures = self._outcomes.count(False)
+                if failures / len(self._outcomes) > self.failure_rate:
+                    self._open()
+
+    def to_dict(self) -> Dict[str, Union[str, int, float]]:
+        """Return the breaker state as a dictionary."""
+        with self._lock:
+            self._update()
+            return {
+                'family': self.family,
+                'state': self._state,
+                'calls': len(self._outcomes),
+                'failures': self._outcomes.count(False),
+            }
+
+class CircuitBreakers(object):
+    """One `CircuitBreaker` per endpoint family, created on first use with shared settings.
+
+    Example:
+        >>> aparat = Aparat(circuit_breakers=CircuitBreakers(failure_rate=0.5, reset_timeout=30))
+        >>> aparat.circuit_breakers.is_open('video/video/show')
+        False
+    """
+
+    def __init__(self, **settings):
+        """Initialize the registry.
+
+        Args:
+            **settings: The `CircuitBreaker` arguments used for every family
+                (`failure_rate`, `window`, `min_calls`, `reset_timeout`, `half_open_calls`).
+        """
+        self.settings = settings
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, family: str) -> CircuitBreaker:
+        """Return the breaker of `family`, creating it if needed."""
+        breaker = self._breakers.get(family)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(family, CircuitBreaker(family, **self.settings))
+        return breaker
+
+    def is_open(self, family: str) -> bool:
+        """Return True if calls to `family` are currently refused."""
+        breaker = self._breakers.get(family)
+        return breaker is not None and breaker.state == CircuitBreaker.OPEN
+
+    def states(self) -> Dict[str, str]:
+        """Return the state of every known family."""
+        return {family: breaker.state for family, breaker in list(self._breakers.items())}
@@ -1,44 +1,283 @@
 import argparse
-from aparat import Aparat
+import json
+import os
+import queue
+import sys
+import time
+from typing import Iterable, Iterator, Set, Tuple
+from aparat import Aparat, BandwidthLimiter, DownloadScheduler, DownloadStore, FarmWorker, JobFarm
+
+def parse_rate(value: str) -> float:
+    """Parse a rate in bytes per second, with an optional K, M or G suffix (e.g. '500K', '2M')."""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    value = value.strip().upper().rstrip('B')
+    try:
+        if value and value[-1] in units:
+            return float(value[:-1]) * units[value[-1]]
+        return float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid rate: '{value}'")
+
+def parse_target(value: str) -> Tuple[str, str]:
+    """Return ('playlist', id) or ('video', uid) for an Aparat URL or ID."""
+    value = value.strip()
+    if 'playlist=' in value:
+        return 'playlist', value.split('playlist=')[1]
+    if value.isdigit():
+        return 'playlist', value
+    if 'aparat.com/v/' in value:
+        return 'video', value.rstrip('/').split('/')[-1]
+    return 'video', value
+
+def read_inputs(source: str) -> Iterator[str]:
+    """Yield the URLs and IDs listed in a file, or on stdin for '-', skipping blank lines and '#' comments."""
+    f = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    try:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def finished_uids(report: str) -> Set[str]:
+    """Return the UIDs a JSON-lines report records as downloaded or skipped."""
+    if not report or report == '-' or not os.path.exists(report):
+        return set()
+    done = set()
+    with open(report, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by an interrupted run
+            if record.get('status') in ('ok', 'skipped'):
+                done.add(record.get('uid'))
+    return done
+
+def _chunks(values: Iterable[str], size: int) -> Iterator[list]:
+    chunk = []
+    for value in values:
+        chunk.append(value)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _expand(aparat: Aparat, values: list, path: str) -> Iterator[tuple]:
+    """Yield (input, uid, video, path, error) for every video of the inputs.
+
+    Plain videos are looked up with one `get_videos` call, which is concurrent
+    only on a client created with `thread_safe=True`.
+    """
+    uids = [parse_target(value)[1] for value in values if parse_target(value)[0] == 'video']
+    videos = {video.uid: video for video in aparat.get_videos(uids)} if uids else {}
+    for value in values:
+        kind, ident = parse_target(value)
+        if kind == 'video':
+            video = videos.get(ident)
+            yield value, ident, video, path, None if video else 'VideoNotFoundError: Video does not exist.'
+            continue
+        try:
+            playlist = aparat.get_playlist(ident)
+        except Exception as e:
+            yield value, None, None, path, f'{type(e).__name__}: {e}'
+            continue
+        directory = path + os.sep if path and not path.endswith(os.sep) else path
+        for video in playlist.videos:
+            yield value, video.uid, video, directory, None
+
+def run_batch(aparat: Aparat, scheduler: DownloadScheduler, inputs: Iterable[str], resolution: str, path: str, report, skip_existing: bool = False, done: Set[str] = frozenset(), chunk_size: int = 64) -> int:
+    """Download every video of `inputs` through `scheduler`, writing one JSON line per video to `report`.
+
+    Inputs are read in chunks of `chunk_size`, so downloads start before a long
+    list, or a stdin stream, has been read to the end. Reading goes on while
+    earlier downloads run, up to `chunk_size` unfinished jobs or one per worker,
+    and each line is written as soon as its video is done. Every input is a
+    submitter of its own in the scheduler, so a large playlist does not hold up
+    the rest. Jobs already in the scheduler, such as those restored from an
+    interrupted run, are reported too.
+
+    Args:
+        aparat (Aparat): The client.
+        scheduler (DownloadScheduler): The scheduler running the downloads.
+        inputs (Iterable[str]): Video and playlist URLs or IDs.
+        resolution (str): The resolution to download.
+        path (str): The directory or path the videos are saved to.
+        report: The text stream the JSON lines are written to.
+        skip_existing (bool, optional): Skip videos whose file is already complete; the check runs in the download job. Defaults to False.
+        done (Set[str], optional): UIDs to leave out, e.g. those finished by an earlier run.
+        chunk_size (int, optional): The number of inputs looked up at once. Defaults to 64.
+
+    Returns:
+        int: The number of videos that failed.
+    """
+    finished = queue.Queue()
+    tracked = set()
+    failures = pending = 0
+    window = max(chunk_size, scheduler.max_workers)
+
+    def write(record: dict) -> None:
+        nonlocal failures
+        failures += record['status'] == 'failed'
+        record['finished_at'] = time.time()
+        report.write(json.dumps(record, ensure_ascii=False) + '\n')
+        report.flush()
+
+    def track(record: dict, job) -> None:
+        nonlocal pending
+        if job.id in tracked:
+            return  # a video already in the queue, e.g. restored from the saved queue
+        tracked.add(job.id)
+        pending += 1
+        job.add_done_callback(lambda job: finished.put((record, job)))
+
+    def collect(limit: int) -> None:
+        # Write the jobs that have finished, waiting while more than `limit` are unfinished
+        nonlocal pending
+        while pending:
+            try:
+                record, job = finished.get(block=pending > limit)
+            except queue.Empty:
+                return
+            pending -= 1
+            try:
+                result = job.wait()
+            except Exception as e:
+                record['error'] = f'{type(e).__name__}: {e}'
+            else:
+                record.update(status='skipped' if result.skipped else 'ok', path=result.path, bytes=result.bytes_written, size=result.size,
+                              duration=result.duration, ttfb=result.ttfb, throughput=result.average_throughput, retries=result.retries, cached=result.cached)
+            write(record)
+
+    for job in scheduler.restored + scheduler.jobs():
+        track({'input': job.submitter, 'uid': job.uid, 'status': 'failed', 'path': None, 'error': None}, job)
+
+    for values in _chunks(inputs, chunk_size):
+        for value, uid, video, target, error in _expand(aparat, values, path):
+            if uid in done:
+                continue
+            record = {'input': value, 'uid': uid, 'status': 'failed', 'path': None, 'error': error}
+            if video is None:
+                write(record)
+                continue
+            try:
+                job = scheduler.submit(video, resolution, target, submitter=value, skip_existing=skip_existing)
+            except Exception as e:
+                record['error'] = f'{type(e).__name__}: {e}'
+                write(record)
+            else:
+                track(record, job)
+            collect(window)
+
+    collect(0)
+    return failures
 
 def main():
     parser = argparse.ArgumentParser(description='A tool to download videos or playlists from Aparat.')
 
-    parser.add_argument('url', type=str, help='URL or ID of the Aparat video or playlist')
-    parser.add_argument('resolution', type=str, nargs='?', default='480p', help='Resolution of the video (default: 480p)')
+    parser.add_argument('url', type=str, nargs='?', default=None, help='URL or ID of the Aparat video or playlist')
+    parser.add_argument('resolution', type=str, nargs='?', default=None, help="Resolution of the video, or 'auto' to pick one from the measured download speed (default: 480p)")
     parser.add_argument('path', type=str, nargs='?', default=None, help='Path to save the video or playlist (default: current directory)')
+    parser.add_argument('--limit-rate', type=parse_rate, default=None, help='Limit the total download speed in bytes per second, e.g. 500K or 2M (default: no limit)')
+    parser.add_argument('--store', type=str, default=None, help='Keep downloads in this directory and reuse them instead of downloading again (default: off)')
+    parser.add_argument('--transfer-rate', type=parse_rate, default=None, help='Limit the speed of each download in bytes per second (default: no limit)')
+    parser.add_argument('--parallel', '--workers', type=int, default=1, help='Number of videos downloaded at once (default: 1)')
+    parser.add_argument('--per-host', type=int, default=2, help='Number of videos downloaded at once from one CDN host (default: 2)')
+    parser.add_argument('--queue', type=str, default=None, help='Save the download queue to this file, and continue a queue saved by an interrupted run (default: off)')
+    parser.add_argument('--farm', type=str, default=None, help='Add the downloads to this shared job database instead of downloading them')
+    parser.add_argument('--worker', type=str, default=None, help='Run the download and upload jobs of this shared job database')
+    parser.add_argument('--wait', action='store_true', help='With --worker, keep waiting for new jobs when the database is empty')
+    parser.add_argument('--session', type=str, default=None, help='With --worker, log in with the session saved for this username (needed for uploads)')
+    parser.add_argument('--farm-status', type=str, default=None, help='Print the progress of the jobs in this shared job database')
+    parser.add_argument('--input', type=str, default=None, help="Download the URLs and IDs listed in this file, one per line, or on stdin for '-'; the url argument is then left out")
+    parser.add_argument('--report', type=str, default='-', help="With --input, write a JSON line per video to this file (default: stdout)")
+    parser.add_argument('--resume', action='store_true', help='With --input, skip the videos the --report file records as done, and append to it')
+    parser.add_argument('--skip-existing', action='store_true', help='With --input, skip videos whose file is already complete')
 
     args = parser.parse_args()
 
+    if args.farm_status:
+        print(json.dumps(JobFarm(args.farm_status).status(), indent=2))
+        return
+    if args.input:
+        # The positional arguments are only resolution and path in batch mode
+        args.url, args.resolution, args.path = None, args.url, args.resolution
+    elif not args.url and not args.worker:
+        parser.error('the url argument is required')
+    if args.resume and args.report == '-':
+        parser.error('--resume needs a --report file')
+
     url = args.url
-    resolution = args.resolution
+    resolution = args.resolution or '480p'
     path = args.path
 
-    aparat = Aparat()
+    bandwidth = None
+    if args.limit_rate or args.transfer_rate:
+        bandwidth = BandwidthLimiter(rate=args.limit_rate, per_transfer=args.transfer_rate)
+
+    # The scheduler workers, and in batch mode the input lookups, share the client's session,
+    # which a plain one does not allow
+    aparat = Aparat(thread_safe=args.parallel > 1 or bool(args.input), bandwidth=bandwidth)
+    if args.worker:
+        if args.session and not aparat.load_session(args.session):
+            parser.error(f"no valid saved session for '{args.session}'")
+        count = FarmWorker(JobFarm(args.worker), aparat).run(wait=args.wait)
+        print(f"Ran {count} jobs from {args.worker}")
+        return
 
-    if 'playlist=' in url or url.isdigit():
-        if 'playlist=' in url:
-            playlist_id = url.split('playlist=')[1]
-        else:
-            playlist_id = url
+    if args.farm:
+        farm = JobFarm(args.farm)
+        count = 0
+        for value in (read_inputs(args.input) if args.input else [url]):
+            kind, ident = parse_target(value)
+            if kind == 'playlist':
+                directory = path + os.sep if path and not path.endswith(os.sep) else path
+                for video in aparat.get_playlist(ident).videos:
+                    farm.add_download(video.uid, resolution, directory)
+                    count += 1
+            else:
+                farm.add_download(ident, resolution, path)
+                count += 1
+        print(f"Added {count} downloads to {args.farm}")
+        return
+
+    store = DownloadStore(args.store) if args.store else None
+    scheduler = DownloadScheduler(aparat, max_workers=args.parallel, per_host=args.per_host, state_path=args.queue, store=store)
+    restored = scheduler.jobs()
+    if restored:
+        print(f"Continuing {len(restored)} downloads from {args.queue}", file=sys.stderr if args.input else sys.stdout)
+
+    if args.input:
+        done = finished_uids(args.report) if args.resume else set()
+        report = sys.stdout if args.report == '-' else open(args.report, 'a' if args.resume else 'w', encoding='utf-8')
+        try:
+            failures = run_batch(aparat, scheduler, read_inputs(args.input), resolution, path, report, args.skip_existing, done)
+        finally:
+            if report is not sys.stdout:
+                report.close()
+        scheduler.shutdown()
+        sys.exit(1 if failures else 0)
+
+    kind, ident = parse_target(url)
+    if kind == 'playlist':
+        playlist_id = ident
 
         print("Downloading playlist...")
         playlist = aparat.get_playlist(playlist_id)
         print(f"Number of videos in playlist: {len(playlist.videos)}")
-        for video in playlist.videos:
-            video_path = video.download(resolution=resolution, path=path, show_progress_bar=True)
-            print("Video downloaded to:", video_path, end='\n\n')
+        for video_path in playlist.download(resolution, path=path, show_progress_bar=True, scheduler=scheduler):
+            print("Video downloaded to:", video_path)
     else:
-        if 'aparat.com/v/' in url:
-            video_id = url.split('/')[-1]
-        else:
-            video_id = url
-
         print("Downloading video...")
-        video = aparat.get_video(video_id)
+        video = aparat.get_video(ident)
+
+        job = scheduler.submit(video, resolution, path, show_progress_bar=True)
+        print("Video downloaded to:", job.wait().path)
 
-        video_path = video.download(resolution=resolution, path=path, show_progress_bar=True)
-        print("Video downloaded to:", video_path)
+    scheduler.shutdown()
 
 if __name__ == '__main__':
     main()
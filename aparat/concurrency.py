@@ -0,0 +1,250 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, Union
+import requests
+from .deadlines import propagate
+
+class AdaptiveLimiter(object):
+    """AIMD concurrency limiter driven by observed latency and errors.
+
+    The limit grows by `increase` for every `limit` successful operations while
+    latency stays within `latency_tolerance` times the best recent latency, and is
+    multiplied by `decrease` when an operation sees a 429 or 5xx response, a
+    connection error or a timeout, or when latency rises beyond the tolerance.
+    At most one decrease is applied per latency window, so a burst of failures
+    from one overload event does not collapse the limit.
+
+    Responses are observed through a session hook installed with `attach()`;
+    requests made by the thread holding a slot are attributed to that slot.
+
+    Example:
+        >>> limiter = AdaptiveLimiter(initial=4, max_limit=32)
+        >>> limiter.attach(aparat.session)
+        >>> videos = aparat.get_videos(uids, limiter=limiter)
+        >>> limiter.limit
+        12
+
+    Attributes:
+        limit (int): The current number of operations allowed to run concurrently.
+        in_flight (int): The number of operations currently running.
+    """
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 64, increase: float = 1, decrease: float = 0.5, latency_tolerance: float = 2.0, latency_floor: float = 0.05, smoothing: float = 0.1):
+        """Initialize the limiter.
+
+        Args:
+            initial (int, optional): The starting limit. Defaults to 4.
+            min_limit (int, optional): The lowest limit. Defaults to 1.
+            max_limit (int, optional): The highest limit. Defaults to 64.
+            increase (float, optional): The additive increase per window of successes. Defaults to 1.
+            decrease (float, optional): The multiplicative decrease factor on overload. Defaults to 0.5.
+            latency_tolerance (float, optional): The latency, as a multiple of the baseline, treated as overload. Defaults to 2.0.
+            latency_floor (float, optional): Latency increases smaller than this many seconds are ignored. Defaults to 0.05.
+            smoothing (float, optional): The weight of the newest sample in the latency average. Defaults to 0.1.
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.latency_floor = latency_floor
+        self.smoothing = smoothing
+
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self.in_flight = 0
+        self.latency = None
+        self.baseline = None
+        self.successes = 0
+        self.overloads = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self._local = threading.local()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def attach(self, session) -> None:
+        """Observe the responses of `session` to detect 429 and 5xx replies."""
+        session.hooks['response'].append(self._observe)
+
+    def _observe(self, response, *args, **kwargs):
+        if response.status_code == 429 or response.status_code >= 500:
+            if getattr(self._local, 'active', False):
+                self._local.overloaded = True
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Block until a slot is free and take it.
+
+        Returns:
+            bool: True if a slot was taken, False if `timeout` expired first.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_flight < self.limit, timeout):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: float, overloaded: bool = False) -> None:
+        """Free a slot and feed the outcome of the operation back into the limit."""
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+
+            if not overloaded:
+                self.latency = latency if self.latency is None else (1 - self.smoothing) * self.latency + self.smoothing * latency
+                self.baseline = latency if self.baseline is None else min(latency, self.baseline * (1 + self.smoothing))
+                if self.latency > max(self.baseline * self.latency_tolerance, self.baseline + self.latency_floor):
+                    overloaded = True
+
+            if overloaded:
+                self.overloads += 1
+                if now - self._last_decrease >= (self.latency or 0):
+                    self._limit = max(self.min_limit, self._limit * self.decrease)
+                    self._last_decrease = now
+            else:
+                self.successes += 1
+                self._limit = min(self.max_limit, self._limit + self.increase / self._limit)
+
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Context manager holding one slot for the duration of an operation.
+
+        Connection errors and timeouts raised inside the block count as overload;
+        other exceptions are treated as ordinary results.
+        """
+        self.acquire()
+        self._local.active = True
+        self._local.overloaded = False
+        start = time.monotonic()
+        overloaded = False
+        try:
+            yield
+        except (requests.ConnectionError, requests.Timeout):
+            overloaded = True
+            raise
+        finally:
+            self._local.active = False
+            self.release(time.monotonic() - start, overloaded or self._local.overloaded)
+
+    def map(self, func: Callable, items: Iterable, max_workers: int = None) -> Iterator:
+        """Apply `func` to every item concurrently, within the current limit.
+
+        Args:
+            func (Callable): The operation to run.
+            items (Iterable): The operation arguments.
+            max_workers (int, optional): The number of threads. Defaults to `max_limit`.
+
+        Yields:
+            The results of `func`, in input order. An exception raised by `func` is re-raised when its result is reached.
+            The caller's deadline, if any, applies to every operation.
+
+        Items are consumed lazily: only about `limit` operations are submitted ahead of
+        the result being yielded. Closing the generator cancels the ones not yet started.
+        """
+        @propagate
+        def run(item):
+            with self.slot():
+                return func(item)
+
+        items = iter(items)
+        pending = deque()
+        pool = ThreadPoolExecutor(max_workers=max_workers or self.max_limit)
+        try:
+            while True:
+                while len(pending) < max(self.limit, 1):
+                    try:
+                        pending.append(pool.submit(run, next(items)))
+                    except StopIteration:
+                        break
+                if not pending:
+                    break
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def stream(self, func: Callable, items: Iterable, buffer: int = 2, max_workers: int = None) -> Iterator:
+        """Like `map`, for operations that produce their result piece by piece, e.g. one page at a time.
+
+        `func(item)` returns an iterator. Every step of it runs within a slot, so the
+        limit applies to the requests rather than to whole items, and at most `buffer`
+        pieces of each item are held before the caller reaches them.
+
+        Args:
+            func (Callable): Returns the iterator of pieces for an item.
+            items (Iterable): The operation arguments.
+            buffer (int, optional): The number of pieces read ahead per item. Defaults to 2.
+            max_workers (int, optional): The number of threads. Defaults to `max_limit`.
+
+        Yields:
+            The pieces, grouped by item in input order. An exception raised by `func` is re-raised where it occurred.
+            Closing the generator stops the items still running.
+        """
+        done = object()
+        stop = threading.Event()
+
+        def put(pieces, piece):
+            while not stop.is_set():
+                try:
+                    pieces.put(piece, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        @propagate
+        def run(item, pieces):
+            try:
+                iterator = iter(func(item))
+                while not stop.is_set():
+                    with self.slot():
+                        piece = next(iterator, done)
+                    if piece is done or not put(pieces, piece):
+                        break
+            except BaseException as error:
+                put(pieces, error)
+            finally:
+                put(pieces, done)
+
+        items = iter(items)
+        pending = deque()
+        pool = ThreadPoolExecutor(max_workers=max_workers or self.max_limit)
+        try:
+            while True:
+                while len(pending) < max(self.limit, 1):
+                    item = next(items, done)
+                    if item is done:
+                        break
+                    pieces = queue.Queue(maxsize=buffer)
+                    pool.submit(run, item, pieces)
+                    pending.append(pieces)
+                if not pending:
+                    break
+                pieces = pending.popleft()
+                for piece in iter(pieces.get, done):
+                    if isinstance(piece, BaseException):
+                        raise piece
+                    yield piece
+        finally:
+            stop.set()
+            pool.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Return the current limit and its inputs as a dictionary."""
+        with self._condition:
+            return {
+                'limit': self.limit,
+                'in_flight': self.in_flight,
+                'latency': self.latency,
+                'baseline': self.baseline,
+                'successes': self.successes,
+                'overloads': self.overloads,
+            }
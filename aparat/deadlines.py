@@ -0,0 +1,95 @@
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Tuple, Union
+import requests
+
+class DeadlineExceededError(requests.RequestException):
+    """Exception raised when an operation runs out of its overall time budget."""
+    def __init__(self, message="The operation deadline was exceeded."):
+        self.message = message
+        super().__init__(self.message)
+
+_local = threading.local()
+
+def remaining() -> Union[float, None]:
+    """Return the seconds left before the calling thread's deadline, or None if it has none."""
+    expires = getattr(_local, 'expires', None)
+    return None if expires is None else expires - time.monotonic()
+
+def check_deadline() -> None:
+    """Raise `DeadlineExceededError` if the calling thread's deadline has passed."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceededError()
+
+@contextmanager
+def deadline(seconds: Union[float, None]) -> Iterator[None]:
+    """Context manager giving every request made by the calling thread inside the block one shared time budget.
+
+    Each request timeout is shrunk to the time left, and requests started after the
+    budget is spent raise `DeadlineExceededError`. Nested deadlines never extend an
+    outer one. `None` leaves the current deadline, if any, unchanged.
+
+    Example:
+        >>> with deadline(30):
+        ...     aparat.login('username', 'password')
+        ...     aparat.get_video('m98gm8j').send_comment('Nice!')
+    """
+    if seconds is None:
+        yield
+        return
+
+    previous = getattr(_local, 'expires', None)
+    expires = time.monotonic() + seconds
+    _local.expires = expires if previous is None else min(previous, expires)
+    try:
+        yield
+    finally:
+        _local.expires = previous
+
+def clamp_timeout(timeout: Union[float, Tuple[float, float], None]) -> Union[float, Tuple[float, float], None]:
+    """Shrink a `requests` timeout to the time left before the calling thread's deadline.
+
+    Raises:
+        DeadlineExceededError: If the deadline has already passed.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceededError()
+    if timeout is None:
+        return left
+    if isinstance(timeout, tuple):
+        return tuple(left if part is None else min(part, left) for part in timeout)
+    return min(timeout, left)
+
+def propagate(func: Callable) -> Callable:
+    """Bind the calling thread's deadline to `func`, so it also applies when `func` runs in another thread."""
+    expires = getattr(_local, 'expires', None)
+    if expires is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        previous = getattr(_local, 'expires', None)
+        _local.expires = expires
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.expires = previous
+    return wrapper
+
+def with_deadline(method: Callable) -> Callable:
+    """Run a method under the deadline given by its `deadline` argument."""
+    position = list(inspect.signature(method).parameters).index('deadline')
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        seconds = kwargs['deadline'] if 'deadline' in kwargs else (args[position] if len(args) > position else None)
+        with deadline(seconds):
+            return method(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,424 @@
+import hashlib
+import http.client
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Tuple, Union
+import requests
+import urllib3
+from tqdm import tqdm
+from .circuit import CircuitOpenError
+from .deadlines import DeadlineExceededError, check_deadline
+from .throttle import BandwidthLimiter
+
+class IntegrityError(Exception):
+    """Exception raised when a downloaded file does not match its expected size or hash."""
+    def __init__(self, message="The downloaded file is corrupted."):
+        self.message = message
+        super().__init__(self.message)
+
+class DownloadCancelledError(Exception):
+    """Exception raised when a download is stopped, or when waiting for a download job that was cancelled."""
+    def __init__(self, message="The download was cancelled."):
+        self.message = message
+        super().__init__(self.message)
+
+class DownloadProgress(object):
+    """Progress of a running download, passed to progress callbacks.
+
+    Attributes:
+        path (str): The destination file.
+        url (str): The mirror currently in use.
+        downloaded (int): The number of bytes in the file so far, including a resumed prefix.
+        total (int): The expected file size, or 0 if unknown.
+        elapsed (float): The seconds since the download started.
+        throughput (float): The recent transfer rate in bytes per second.
+        retries (int): The number of failed attempts so far.
+    """
+
+    __slots__ = ('path', 'url', 'downloaded', 'total', 'elapsed', 'throughput', 'retries')
+
+    def __init__(self, path: str, url: str, downloaded: int, total: int, elapsed: float, throughput: float, retries: int):
+        self.path = path
+        self.url = url
+        self.downloaded = downloaded
+        self.total = total
+        self.elapsed = elapsed
+        self.throughput = throughput
+        self.retries = retries
+
+class DownloadResult(object):
+    """Outcome and transfer telemetry of a finished download.
+
+    Attributes:
+        path (str): The downloaded file.
+        mirror (str): The URL the file was finally downloaded from.
+        bytes_written (int): The number of bytes written by this download, excluding a resumed prefix.
+        size (int): The size of the file.
+        duration (float): The total time in seconds, including retries.
+        ttfb (float): The time to the response headers of the successful attempt, in seconds.
+        average_throughput (float): `bytes_written / duration`, in bytes per second.
+        peak_throughput (float): The highest rate over any one-second window, in bytes per second.
+        retries (int): The number of failed attempts.
+        resume_offset (int): The offset the successful attempt resumed from, 0 if it started from scratch.
+        digest (str): The hex digest of the file, if it was hashed during the transfer.
+        verified (bool): True if the digest matched the expected hash or the ETag.
+        cached (bool): True if the file was served from a `DownloadStore` without a transfer.
+        skipped (bool): True if the file was already complete at its path and was not downloaded again.
+    """
+
+    __slots__ = ('path', 'mirror', 'bytes_written', 'size', 'duration', 'ttfb', 'average_throughput', 'peak_throughput', 'retries', 'resume_offset', 'digest', 'verified', 'cached', 'skipped')
+
+    def __init__(self, path: str, mirror: str, bytes_written: int, size: int, duration: float, ttfb: float, peak_throughput: float, retries: int, resume_offset: int, digest: str = None, verified: bool = False, cached: bool = False, skipped: bool = False):
+        self.path = path
+        self.mirror = mirror
+        self.bytes_written = bytes_written
+        self.size = size
+        self.duration = duration
+        self.ttfb = ttfb
+        self.average_throughput = bytes_written / duration if duration > 0 else 0.0
+        self.peak_throughput = peak_throughput
+        self.retries = retries
+        self.resume_offset = resume_offset
+        self.digest = digest
+        self.verified = verified
+        self.cached = cached
+        self.skipped = skipped
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def __str__(self) -> str:
+        return self.path
+
+    def __repr__(self) -> str:
+        return f"DownloadResult(path={self.path!r}, size={self.size}, duration={self.duration:.2f}, retries={self.retries})"
+
+    def to_dict(self) -> Dict[str, Union[str, int, float]]:
+        """Return the result as a dictionary."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class TqdmProgress(object):
+    """Progress callback drawing a tqdm bar, used for `show_progress_bar=True`."""
+
+    def __init__(self):
+        self.bar = None
+
+    def __call__(self, progress: DownloadProgress) -> None:
+        if self.bar is None:
+            self.bar = tqdm(total=progress.total, initial=progress.downloaded, unit='B', unit_scale=True, desc=os.path.basename(progress.path))
+        self.bar.update(progress.downloaded - self.bar.n)
+
+    def close(self) -> None:
+        if self.bar is not None:
+            self.bar.close()
+
+class _Meter(object):
+    """Track the recent and peak transfer rate over one-second windows."""
+
+    def __init__(self):
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+        self.rate = 0.0
+        self.peak = 0.0
+
+    def update(self, size: int) -> None:
+        self.window_bytes += size
+        now = time.monotonic()
+        elapsed = now - self.window_start
+        if elapsed >= 1:
+            self.rate = self.window_bytes / elapsed
+            self.peak = max(self.peak, self.rate)
+            self.window_start = now
+            self.window_bytes = 0
+
+    def finish(self) -> None:
+        elapsed = time.monotonic() - self.window_start
+        if self.window_bytes and (elapsed >= 1 or not self.peak):
+            self.peak = max(self.peak, self.window_bytes / max(elapsed, 1e-6))
+
+class _OutputFile(object):
+    """Destination file written at explicit offsets with `pwrite`, preallocated when its size is known.
+
+    Writing from the start replaces an existing file instead of truncating it,
+    so a hardlink to it, such as one placed by a `DownloadStore`, keeps its data.
+    """
+
+    def __init__(self, path: str, offset: int = 0, size: int = None):
+        if not offset:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o666)
+        try:
+            if not offset:
+                os.ftruncate(self.fd, 0)
+            if size and size > offset:
+                self._preallocate(offset, size - offset)
+        except BaseException:
+            os.close(self.fd)
+            raise
+
+    def _preallocate(self, offset: int, length: int) -> None:
+        if hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(self.fd, offset, length)
+                return
+            except OSError:
+                pass  # not supported by the file system
+        os.ftruncate(self.fd, offset + length)
+
+    def write_at(self, data: memoryview, offset: int) -> None:
+        while data:
+            if hasattr(os, 'pwrite'):
+                written = os.pwrite(self.fd, data, offset)
+            else:
+                os.lseek(self.fd, offset, os.SEEK_SET)
+                written = os.write(self.fd, data)
+            data = data[written:]
+            offset += written
+
+    def close(self, size: int = None) -> None:
+        """Close the file, first cutting it to `size` bytes if given."""
+        try:
+            if size is not None:
+                os.ftruncate(self.fd, size)
+        finally:
+            os.close(self.fd)
+
+class _BufferPool(object):
+    """Reusable read buffers, so consecutive downloads do not reallocate them."""
+
+    def __init__(self, max_buffers: int = 16):
+        self.max_buffers = max_buffers
+        self._buffers = []
+        self._lock = threading.Lock()
+
+    def get(self, size: int) -> bytearray:
+        with self._lock:
+            for index, buffer in enumerate(self._buffers):
+                if len(buffer) == size:
+                    return self._buffers.pop(index)
+        return bytearray(size)
+
+    def put(self, buffer: bytearray) -> None:
+        with self._lock:
+            if len(self._buffers) < self.max_buffers:
+                self._buffers.append(buffer)
+
+_buffers = _BufferPool()
+
+def _body_reader(response, chunk_size: int = 1024 * 1024) -> Callable[[memoryview], int]:
+    """Return a function that reads the next bytes of the response body into a buffer.
+
+    When the body is not content-encoded, it is read from the underlying
+    `http.client` response, which fills the buffer straight from the socket
+    instead of going through an intermediate bytes object. A content-encoded
+    body, or a raw stream without `readinto`, is decoded by `iter_content`
+    and copied into the buffer.
+    """
+    raw = response.raw
+    identity = response.headers.get('Content-Encoding', 'identity').lower() == 'identity'
+    fp = getattr(raw, '_fp', None)
+    if identity and callable(getattr(fp, 'readinto', None)):
+        readinto = fp.readinto
+    elif identity and callable(getattr(raw, 'readinto', None)):
+        readinto = raw.readinto
+    else:
+        chunks = response.iter_content(chunk_size)
+        pending = memoryview(b'')
+
+        def readinto(buffer: memoryview) -> int:
+            nonlocal pending
+            while not pending:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return 0
+                pending = memoryview(chunk)
+            count = min(len(buffer), len(pending))
+            buffer[:count] = pending[:count]
+            pending = pending[count:]
+            return count
+
+    def read(buffer: memoryview) -> int:
+        try:
+            return readinto(buffer)
+        except (OSError, http.client.HTTPException, urllib3.exceptions.HTTPError) as error:
+            raise requests.ConnectionError(error)
+    return read
+
+_RETRYABLE = (requests.ConnectionError, requests.Timeout, requests.HTTPError, requests.exceptions.ChunkedEncodingError, CircuitOpenError, IntegrityError)
+
+_HASH_LENGTHS = {32: 'md5', 40: 'sha1', 64: 'sha256'}
+
+def parse_digest(value: str) -> Union[tuple, None]:
+    """Return `(algorithm, hex digest)` if `value` looks like an MD5, SHA-1 or SHA-256 hex digest.
+
+    Quoted values such as strong ETags are accepted; weak ETags and other
+    formats (e.g. nginx's 'mtime-size' ETags) give None.
+    """
+    if not value:
+        return None
+    value = value.strip().lower()
+    if value.startswith('w/'):
+        return None
+    value = value.strip('"')
+    algorithm = _HASH_LENGTHS.get(len(value))
+    if algorithm is None or any(c not in '0123456789abcdef' for c in value):
+        return None
+    return algorithm, value
+
+def _resumes_at(response, offset: int) -> bool:
+    """Return True if `response` continues the file at `offset`."""
+    if response.status_code != 206:
+        return False
+    content_range = response.headers.get('Content-Range')
+    return content_range is None or content_range.startswith(f'bytes {offset}-')
+
+def download_file(session, urls: List[str], file_path: str, progress: Callable[[DownloadProgress], None] = None, retries: int = 3, backoff: float = 0.5, chunk_size: int = 1024 * 1024, bandwidth: BandwidthLimiter = None, verify: bool = True, expected_hash: str = None, timeout: Union[float, Tuple[float, float]] = (10, 30), stop: threading.Event = None) -> DownloadResult:
+    """Download a file from the first mirror that works, resuming after failures.
+
+    A failed attempt (connection error, timeout, error status or open circuit)
+    moves on to the next mirror. If part of the file was already written, the
+    next attempt asks for the rest with a Range request, and starts over if the
+    server ignores it.
+
+    The file is preallocated from Content-Length, and the body is read into a
+    reusable buffer that is written at its offset with `pwrite`.
+
+    With `verify`, the transfer is checked as it arrives: the size must match
+    Content-Length (a short body is resumed from where it stopped), and the
+    bytes are hashed incrementally and compared with `expected_hash` or, if
+    none is given, with the ETag when it is a content hash. A file whose hash
+    does not match is fetched again from the next mirror.
+
+    Args:
+        session (requests.Session): The session to download with.
+        urls (List[str]): The mirror URLs of the file, in order of preference.
+        file_path (str): The destination file.
+        progress (Callable, optional): Called with a `DownloadProgress` after every chunk.
+        retries (int, optional): The number of failed attempts tolerated before giving up. Defaults to 3.
+        backoff (float, optional): The delay before the first retry in seconds, doubled on every retry. Defaults to 0.5.
+        chunk_size (int, optional): The read size in bytes. Defaults to 1 MB.
+        bandwidth (BandwidthLimiter, optional): The byte-rate budget to read within.
+        verify (bool, optional): Check the size and hash of the file during the transfer. Defaults to True.
+        expected_hash (str, optional): The MD5, SHA-1 or SHA-256 hex digest of the file.
+        timeout (Union[float, Tuple[float, float]], optional): The connect and read timeouts of each request in
+            seconds. A mirror that sends nothing for the read timeout, even mid-body, counts as a failed attempt.
+            Defaults to (10, 30).
+        stop (threading.Event, optional): Set it to stop the download: it raises `DownloadCancelledError` after
+            the current chunk, at the latest once a stalled read times out, and instead of any further retry.
+
+    Returns:
+        DownloadResult: The transfer telemetry.
+
+    Raises:
+        requests.RequestException: The last error, once every attempt has failed.
+        IntegrityError: If the file still does not match after every attempt.
+        ValueError: If `expected_hash` is not a supported hex digest.
+        DeadlineExceededError: If the caller's deadline passes.
+        DownloadCancelledError: If `stop` was set.
+    """
+    target = None
+    if verify and expected_hash:
+        target = parse_digest(expected_hash)
+        if target is None:
+            raise ValueError(f"Unsupported hash: '{expected_hash}'.")
+
+    start = time.monotonic()
+    meter = _Meter()
+    transfer = bandwidth.transfer() if bandwidth is not None else None
+    if transfer is not None:
+        chunk_size = min(chunk_size, bandwidth.chunk_size)
+    offset = 0
+    written = 0
+    attempt = 0
+    etag = None
+    encoded = False
+    hasher = None
+    buffer = _buffers.get(chunk_size)
+    view = memoryview(buffer)
+    try:
+        while True:
+            url = urls[attempt % len(urls)]
+            resume_offset = offset
+            headers = {}
+            if offset:
+                headers['Range'] = f'bytes={offset}-'
+                if etag:
+                    headers['If-Range'] = etag
+            try:
+                request_start = time.monotonic()
+                with session.get(url, stream=True, headers=headers, timeout=timeout) as r:
+                    ttfb = time.monotonic() - request_start
+                    r.raise_for_status()
+                    if offset and not _resumes_at(r, offset):
+                        offset = resume_offset = 0
+                    if not offset:
+                        etag = r.headers.get('ETag')
+                        expected = target or (parse_digest(etag) if verify else None)
+                        hasher = hashlib.new(expected[0]) if expected else None
+                    # The length of a content-encoded body is not that of the decoded file
+                    encoded = r.headers.get('Content-Encoding', 'identity').lower() != 'identity'
+                    length = None if encoded else r.headers.get('Content-Length')
+                    total = offset + int(length or 0)
+                    read = _body_reader(r, chunk_size)
+                    output = _OutputFile(file_path, offset, total if length else None)
+                    try:
+                        while True:
+                            check_deadline()
+                            if stop is not None and stop.is_set():
+                                raise DownloadCancelledError()
+                            size = read(view)
+                            if not size:
+                                break
+                            if transfer is not None:
+                                transfer.consume(size)
+                            output.write_at(view[:size], offset)
+                            if hasher is not None:
+                                hasher.update(view[:size])
+                            offset += size
+                            written += size
+                            meter.update(size)
+                            if progress is not None:
+                                progress(DownloadProgress(file_path, url, offset, total, time.monotonic() - start, meter.rate, attempt))
+
+                        if verify and length is not None and offset != total:
+                            message = f"Expected {total} bytes but received {offset}."
+                            if offset > total:
+                                offset = 0
+                            raise IntegrityError(message)
+                        if hasher is not None and hasher.hexdigest() != expected[1]:
+                            offset = 0  # the corrupt bytes could be anywhere, so fetch the whole file again
+                            raise IntegrityError(f"The {expected[0]} digest {hasher.hexdigest()} does not match {expected[1]}.")
+                    finally:
+                        output.close(offset)
+                break
+            except DeadlineExceededError:
+                raise
+            except _RETRYABLE:
+                if encoded:
+                    offset = 0  # a Range counts encoded bytes, so a decoded body cannot be resumed
+                attempt += 1
+                if stop is not None and stop.is_set():
+                    raise DownloadCancelledError()
+                if attempt > retries:
+                    raise
+                check_deadline()
+                delay = backoff * 2 ** (attempt - 1)
+                if stop is None:
+                    time.sleep(delay)
+                elif stop.wait(delay):
+                    raise DownloadCancelledError()
+    finally:
+        view.release()
+        _buffers.put(buffer)
+
+    meter.finish()
+    digest = hasher.hexdigest() if hasher is not None else None
+    result = DownloadResult(file_path, url, written, offset, time.monotonic() - start, ttfb, meter.peak, attempt, resume_offset, digest, digest is not None)
+    history = getattr(session, 'throughput', None)
+    if history is not None:
+        history.record(url, written, result.duration)
+    return result
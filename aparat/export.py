@@ -0,0 +1,235 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, IO, Iterable, List, Union
+
+def _open(file: Union[str, IO], mode: str, **kwargs):
+    """Open ``file`` if it is a path, otherwise return it unchanged.
+
+    Returns:
+        tuple: The file object and a flag telling whether it must be closed by the caller.
+    """
+    if isinstance(file, str):
+        return open(file, mode, **kwargs), True
+    return file, False
+
+def _to_row(item, fields: Union[List[str], None]) -> Dict[str, Union[str, int]]:
+    """Project a model object (or a plain dict) onto the selected fields."""
+    if isinstance(item, dict):
+        return {field: item.get(field) for field in fields} if fields else item
+    return item.to_dict(fields)
+
+def _encode(value):
+    """Encode nested values (lists and dicts) as JSON strings for flat formats."""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+def export_jsonl(items: Iterable, file: Union[str, IO], fields: Union[List[str], None] = None, buffer_size: int = 1000) -> int:
+    """Write models to a JSON Lines file incrementally.
+
+    Args:
+        items (Iterable): Any iterable of `Video`, `Comment`, `User`, `MyVideo` or `Playlist` objects (or dicts).
+        file (Union[str, IO]): The output path or a text file object.
+        fields (List[str], optional): The attribute names to export. Defaults to all fields of each model.
+        buffer_size (int, optional): The maximum number of rows buffered before writing. Defaults to 1000.
+
+    Returns:
+        int: The number of rows written.
+    """
+    f, should_close = _open(file, 'w', encoding='utf-8')
+    count = 0
+    buffer = []
+    try:
+        for item in items:
+            buffer.append(json.dumps(_to_row(item, fields), ensure_ascii=False) + '\n')
+            count += 1
+            if len(buffer) >= buffer_size:
+                f.writelines(buffer)
+                buffer.clear()
+        f.writelines(buffer)
+    finally:
+        if should_close:
+            f.close()
+    return count
+
+def export_csv(items: Iterable, file: Union[str, IO], fields: Union[List[str], None] = None, buffer_size: int = 1000) -> int:
+    """Write models to a CSV file incrementally.
+
+    Nested values such as `file_link_all` or `tags_fa` are written as JSON strings.
+    If there are no items, only the header of `fields` is written.
+
+    Args:
+        items (Iterable): Any iterable of `Video`, `Comment`, `User`, `MyVideo` or `Playlist` objects (or dicts).
+        file (Union[str, IO]): The output path or a text file object.
+        fields (List[str], optional): The columns to export. Defaults to the fields of the first item.
+        buffer_size (int, optional): The maximum number of rows buffered before writing. Defaults to 1000.
+
+    Returns:
+        int: The number of rows written.
+    """
+    f, should_close = _open(file, 'w', encoding='utf-8', newline='')
+    count = 0
+    writer = None
+    buffer = []
+    try:
+        for item in items:
+            row = _to_row(item, fields)
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(fields or row.keys()), extrasaction='ignore')
+                writer.writeheader()
+            buffer.append({key: _encode(value) for key, value in row.items()})
+            count += 1
+            if len(buffer) >= buffer_size:
+                writer.writerows(buffer)
+                buffer.clear()
+        if buffer:
+            writer.writerows(buffer)
+        elif writer is None and fields:
+            csv.DictWriter(f, fieldnames=list(fields)).writeheader()
+    finally:
+        if should_close:
+            f.close()
+    return count
+
+def _column(pa, values: list):
+    """Build an Arrow array from Python values, falling back to strings when their types are mixed."""
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if value is None else str(value) for value in values], pa.string())
+
+def _unify(pa, schemas: list):
+    """Merge row group schemas: numeric types are widened, conflicting types and all-null columns become strings."""
+    types = {}
+    for schema in schemas:
+        for field in schema:
+            types.setdefault(field.name, []).append(field.type)
+
+    fields = []
+    for name, candidates in types.items():
+        candidates = [type for type in candidates if not pa.types.is_null(type)]
+        type = candidates[0] if candidates else pa.string()
+        for other in candidates[1:]:
+            if other == type:
+                continue
+            if pa.types.is_integer(type) and pa.types.is_integer(other):
+                type = pa.int64()
+            elif all(pa.types.is_integer(each) or pa.types.is_floating(each) for each in (type, other)):
+                type = pa.float64()
+            else:
+                type = pa.string()
+        fields.append(pa.field(name, type))
+    return pa.schema(fields)
+
+def _fits(pa, table, schema) -> bool:
+    """Tell whether `table` can be cast to `schema` with the types `_unify` would give them both."""
+    for field in table.schema:
+        if field.name not in schema.names:
+            return False
+        target = schema.field(field.name).type
+        if not (field.type == target or pa.types.is_null(field.type) or pa.types.is_string(target)
+                or (pa.types.is_integer(field.type) and pa.types.is_floating(target))
+                or (pa.types.is_null(target) and pa.types.is_string(field.type))):
+            return False
+    return True
+
+def _conform(pa, table, schema):
+    """Cast `table` to `schema`, adding the columns it lacks as nulls."""
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            columns.append(table.column(field.name).cast(field.type))
+        else:
+            columns.append(pa.nulls(table.num_rows, field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+def export_parquet(items: Iterable, path: str, fields: Union[List[str], None] = None, row_group_size: int = 10000, schema=None) -> int:
+    """Write models to a Parquet file, one row group at a time.
+
+    Requires the optional `pyarrow` package. Nested values are stored as JSON strings.
+
+    With a declared `schema`, every row group is cast to it as it is written. Otherwise
+    the types of the first row group are used, and the file is written in one pass as
+    long as the later groups fit them. Once a group does not, the groups are spooled to
+    a temporary directory next to `path`, and then written with one schema unifying them
+    all: a column holding ints in one group and floats in another becomes a float column,
+    and conflicting types, or values of mixed types within a group, become strings. That
+    writes the data twice and needs as much free space again, so declare `schema` for
+    large exports whose types vary. Either way only one row group is held in memory.
+
+    Args:
+        items (Iterable): Any iterable of `Video`, `Comment`, `User`, `MyVideo` or `Playlist` objects (or dicts).
+        path (str): The output path.
+        fields (List[str], optional): The columns to export. Defaults to the fields of the items.
+        row_group_size (int, optional): The number of rows per row group. Defaults to 10000.
+        schema (pyarrow.Schema, optional): The column types. Defaults to types inferred from all row groups.
+
+    Returns:
+        int: The number of rows written.
+
+    Raises:
+        ImportError: If `pyarrow` is not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export requires 'pyarrow'. Install it with 'pip install pyarrow'.")
+
+    count = 0
+    writer = None
+    buffer = []
+    spool = first = None
+    parts, schemas = [], []
+
+    def flush():
+        nonlocal writer, schema, spool, first
+        names = list(fields) if fields else list(dict.fromkeys(key for row in buffer for key in row))
+        table = pa.Table.from_arrays([_column(pa, [row.get(name) for row in buffer]) for name in names], names=names)
+        if schema is None:
+            # All-null columns of the first group are written as strings until a later group fits them better
+            first = table.schema
+            schema = pa.schema([pa.field(field.name, pa.string() if pa.types.is_null(field.type) else field.type) for field in first])
+        if first is not None and spool is None and not _fits(pa, table, first):
+            # This group does not fit the types written so far: spool the groups and unify them at the end
+            spool = tempfile.mkdtemp(prefix='.parquet-', dir=os.path.dirname(os.path.abspath(path)))
+            writer.close()
+            writer = None
+            parts.append(os.path.join(spool, '0.parquet'))
+            schemas.append(first)
+            os.replace(path, parts[0])
+        if spool is not None:
+            parts.append(os.path.join(spool, f'{len(parts)}.parquet'))
+            schemas.append(table.schema)
+            pq.write_table(table, parts[-1])
+        else:
+            if writer is None:
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(_conform(pa, table, schema))
+        buffer.clear()
+
+    try:
+        for item in items:
+            buffer.append({key: _encode(value) for key, value in _to_row(item, fields).items()})
+            count += 1
+            if len(buffer) >= row_group_size:
+                flush()
+        if buffer:
+            flush()
+
+        if spool is not None:
+            unified = _unify(pa, schemas)
+            writer = pq.ParquetWriter(path, unified)
+            for part in parts:
+                writer.write_table(_conform(pa, pq.read_table(part), unified))
+        elif writer is None:
+            writer = pq.ParquetWriter(path, schema or pa.schema([(name, pa.string()) for name in fields or []]))
+    finally:
+        if writer is not None:
+            writer.close()
+        if spool is not None:
+            shutil.rmtree(spool, ignore_errors=True)
+    return count
@@ -0,0 +1,370 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from enum import Enum
+from typing import Dict, Iterator, List, Union
+from .download import DownloadCancelledError, DownloadProgress
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (state, priority DESC, id);
+"""
+
+class FarmJob(object):
+    """One job of a `JobFarm`, as claimed by a worker.
+
+    Attributes:
+        id (int): The job ID.
+        kind (str): 'download' or 'upload'.
+        payload (dict): The arguments of the job.
+        attempts (int): The number of times the job has been claimed, including this one.
+        worker (str): The worker holding the lease.
+    """
+
+    __slots__ = ('id', 'kind', 'payload', 'attempts', 'worker')
+
+    def __init__(self, id: int, kind: str, payload: dict, attempts: int, worker: str):
+        self.id = id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        self.worker = worker
+
+class JobFarm(object):
+    """Queue of download and upload jobs in a SQLite database shared by worker processes.
+
+    Any number of `FarmWorker`s, in one or several processes and on one or
+    several hosts, claim jobs from the same database file. A claimed job is
+    leased to its worker for `lease` seconds and the worker renews the lease
+    with heartbeats while the job runs. A download whose lease expires, because
+    its worker died or stalled, is stolen by the next worker looking for work. A
+    failed download is retried until it has been attempted `max_attempts` times.
+
+    Uploads are never retried automatically, since a failed attempt may still
+    have published the video: a failed upload, or one whose lease expired, is
+    marked as failed and can be queued again with `retry_failed()`.
+
+    The database must be on a file system with working locks; several hosts can
+    share it over a network file system that provides them, with `wal=False`.
+
+    Example:
+        >>> farm = JobFarm('jobs.db')
+        >>> farm.add_download('m98gm8j', '720p', path='videos/')
+        >>> FarmWorker(farm, Aparat()).run()
+        >>> farm.status()['states']
+        {'done': 1}
+    """
+
+    def __init__(self, path: str, lease: float = 60, max_attempts: int = 3, wal: bool = True):
+        """Open the queue, creating the database if needed.
+
+        Args:
+            path (str): The database file.
+            lease (float, optional): The lease period in seconds. Defaults to 60.
+            max_attempts (int, optional): The number of attempts after which a download fails for good. Defaults to 3.
+            wal (bool, optional): Use SQLite's write-ahead log, which lets readers run alongside a writer but only
+                works on a local file system. Pass False when hosts share the database over the network. Defaults to True.
+        """
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.wal = wal
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL' if self.wal else 'PRAGMA journal_mode=DELETE')
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def close(self) -> None:
+        """Close the database connection of the calling thread."""
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    def _add(self, kind: str, payload: dict, priority: int) -> Union[int, None]:
+        key = kind + ':' + json.dumps(payload, sort_keys=True)
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute('INSERT OR IGNORE INTO jobs (kind, key, payload, priority, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                                (kind, key, json.dumps(payload), priority, now, now))
+            if cursor.rowcount:
+                return cursor.lastrowid
+            return db.execute('SELECT id FROM jobs WHERE key = ?', (key,)).fetchone()['id']
+
+    def add_download(self, uid: str, resolution: str = None, path: str = None, priority: int = 0, **options) -> int:
+        """Queue the download of a video.
+
+        Args:
+            uid (str): The video UID.
+            resolution (str, optional): The desired video resolution, as for `Video.download`.
+            path (str, optional): The path where the video will be saved, on the worker's host.
+            priority (int, optional): Higher priorities are claimed first. Defaults to 0.
+            **options: Other `Video.download` arguments, such as `download_highest_resolution` or `max_size`.
+
+        Returns:
+            int: The job ID. Queuing an identical job again returns the ID of the existing one.
+        """
+        return self._add('download', dict(options, uid=uid, resolution=resolution, path=path), priority)
+
+    def add_upload(self, video: str, title: str, category: Union[Enum, int], tag_list: list, priority: int = 0, **options) -> int:
+        """Queue the upload of a video file.
+
+        Args:
+            video (str): The path to the video file, on the worker's host.
+            title (str): The title of the video.
+            category (Union[VideoCategory, int]): The category of the video.
+            tag_list (list): A list of tags for the video.
+            priority (int, optional): Higher priorities are claimed first. Defaults to 0.
+            **options: Other `Aparat.upload_video` arguments, such as `description` or `thumbnail`.
+
+        Returns:
+            int: The job ID. Queuing an identical job again returns the ID of the existing one.
+        """
+        category = category.value if isinstance(category, Enum) else category
+        return self._add('upload', dict(options, video=video, title=title, category=category, tag_list=tag_list), priority)
+
+    def claim(self, worker: str) -> Union[FarmJob, None]:
+        """Lease the next job to `worker`: the highest-priority queued job, or a download whose lease has expired.
+
+        Returns:
+            FarmJob: The claimed job, or None if there is no work.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET state = 'failed', error = COALESCE(error, 'The lease expired too many times.'), worker = NULL, updated_at = ? "
+                       "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?", (now, now, self.max_attempts))
+            db.execute("UPDATE jobs SET state = 'failed', error = 'The lease of the upload expired; the video may have been uploaded.', "
+                       "worker = NULL, updated_at = ? WHERE state = 'leased' AND lease_expires < ? AND kind = 'upload'", (now, now))
+            row = db.execute("SELECT * FROM jobs WHERE state = 'queued' OR (state = 'leased' AND lease_expires < ?) "
+                             "ORDER BY priority DESC, id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET state = 'leased', worker = ?, attempts = attempts + 1, lease_expires = ?, updated_at = ? WHERE id = ?",
+                       (worker, now + self.lease, now, row['id']))
+        return FarmJob(row['id'], row['kind'], json.loads(row['payload']), row['attempts'] + 1, worker)
+
+    def heartbeat(self, job: FarmJob, progress: int = None, total: int = None) -> bool:
+        """Renew the lease of a running job and record its progress.
+
+        Returns:
+            bool: False if the worker no longer holds the lease, because the job was stolen or cancelled.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET lease_expires = ?, progress = COALESCE(?, progress), total = COALESCE(?, total), updated_at = ? "
+                                "WHERE id = ? AND worker = ? AND state = 'leased'", (now + self.lease, progress, total, now, job.id, job.worker))
+            return cursor.rowcount == 1
+
+    def complete(self, job: FarmJob, result: dict = None) -> bool:
+        """Mark a job as done. Returns False if the worker no longer held the lease."""
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET state = 'done', result = ?, error = NULL, lease_expires = NULL, updated_at = ? "
+                                "WHERE id = ? AND worker = ? AND state = 'leased'", (json.dumps(result), time.time(), job.id, job.worker))
+            return cursor.rowcount == 1
+
+    def fail(self, job: FarmJob, error: Union[Exception, str]) -> bool:
+        """Record a failed attempt: a download is queued again, or fails for good after `max_attempts` attempts.
+
+        An upload fails for good at once, as the failed attempt may still have published the video.
+
+        Returns:
+            bool: False if the worker no longer held the lease.
+        """
+        state = 'failed' if job.kind == 'upload' or job.attempts >= self.max_attempts else 'queued'
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET state = ?, error = ?, worker = NULL, lease_expires = NULL, updated_at = ? "
+                                "WHERE id = ? AND worker = ? AND state = 'leased'", (state, str(error), time.time(), job.id, job.worker))
+            return cursor.rowcount == 1
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a queued or running job. A running job stops at its worker's next heartbeat."""
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET state = 'cancelled', worker = NULL, lease_expires = NULL, updated_at = ? "
+                                "WHERE id = ? AND state IN ('queued', 'leased')", (time.time(), job_id))
+            return cursor.rowcount == 1
+
+    def retry_failed(self) -> int:
+        """Queue every failed job again with a fresh attempt budget. Returns the number of jobs queued."""
+        with self._transaction() as db:
+            return db.execute("UPDATE jobs SET state = 'queued', attempts = 0, updated_at = ? WHERE state = 'failed'", (time.time(),)).rowcount
+
+    def jobs(self, state: str = None) -> List[Dict[str, Union[str, int, float, dict]]]:
+        """Return the jobs, optionally only those in `state`, as dictionaries."""
+        query, parameters = 'SELECT * FROM jobs', ()
+        if state is not None:
+            query, parameters = query + ' WHERE state = ?', (state,)
+        rows = self._connection().execute(query + ' ORDER BY id', parameters).fetchall()
+        jobs = []
+        for row in rows:
+            job = {key: row[key] for key in row.keys() if key != 'key'}
+            job['payload'] = json.loads(row['payload'])
+            job['result'] = json.loads(row['result']) if row['result'] else None
+            jobs.append(job)
+        return jobs
+
+    def status(self) -> Dict[str, Union[int, Dict[str, Union[int, dict]]]]:
+        """Return the aggregate progress of the farm.
+
+        Returns:
+            dict: 'states' (the number of jobs by state), 'bytes' and 'total' (the bytes transferred and
+            expected by running and finished jobs), and 'workers' (the running job count and bytes by worker).
+        """
+        db = self._connection()
+        states = {row['state']: row['count'] for row in db.execute('SELECT state, COUNT(*) AS count FROM jobs GROUP BY state')}
+        totals = db.execute("SELECT COALESCE(SUM(progress), 0) AS bytes, COALESCE(SUM(total), 0) AS total FROM jobs WHERE state IN ('leased', 'done')").fetchone()
+        workers = {row['worker']: {'jobs': row['jobs'], 'bytes': row['bytes']} for row in db.execute(
+            "SELECT worker, COUNT(*) AS jobs, COALESCE(SUM(progress), 0) AS bytes FROM jobs WHERE state = 'leased' GROUP BY worker")}
+        return {'states': states, 'bytes': totals['bytes'], 'total': totals['total'], 'workers': workers}
+
+class FarmWorker(object):
+    """Worker claiming and running the jobs of a `JobFarm` with one client.
+
+    While a job runs, a background thread renews its lease every `heartbeat`
+    seconds and records its progress. If the lease is lost, because the job was
+    stolen after a stall or cancelled, the download stops and the job is left to
+    its new owner. A download whose progress has not advanced for `stall`
+    seconds is given up as a failed attempt and its transfer is stopped, at the
+    latest when a stalled read times out, so that the worker moves on and another
+    worker can retry the job instead of the lease being renewed forever.
+
+    Attributes:
+        farm (JobFarm): The queue to work on.
+        client (Aparat): The client used to run the jobs. Upload jobs need it to be logged in.
+        name (str): The worker name recorded in the leases.
+    """
+
+    def __init__(self, farm: JobFarm, client, name: str = None, heartbeat: float = None, stall: float = None):
+        """Initialize the worker.
+
+        Args:
+            farm (JobFarm): The queue to work on.
+            client (Aparat): The client used to run the jobs.
+            name (str, optional): The worker name. Defaults to '<host>:<pid>:<thread>'.
+            heartbeat (float, optional): The heartbeat period in seconds. Defaults to a third of the lease.
+            stall (float, optional): The time in seconds after which a download without progress is given up.
+                Defaults to five lease periods.
+        """
+        self.farm = farm
+        self.client = client
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+        self.heartbeat = heartbeat or farm.lease / 3
+        self.stall = stall or farm.lease * 5
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Stop claiming jobs; the running job is finished first."""
+        self._stop.set()
+
+    def run(self, wait: bool = False, poll: float = 5) -> int:
+        """Claim and run jobs until the queue is empty, or until `stop()` with `wait`.
+
+        Args:
+            wait (bool, optional): Keep polling for new jobs when the queue is empty. Defaults to False.
+            poll (float, optional): The polling period in seconds. Defaults to 5.
+
+        Returns:
+            int: The number of jobs run.
+        """
+        count = 0
+        while not self._stop.is_set():
+            job = self.farm.claim(self.name)
+            if job is None:
+                if not wait:
+                    break
+                self._stop.wait(poll)
+                continue
+            self.run_job(job)
+            count += 1
+        return count
+
+    def run_job(self, job: FarmJob) -> None:
+        """Run a claimed job and record its outcome."""
+        lost = threading.Event()
+        done = threading.Event()
+        state = {'progress': None, 'total': None}
+
+        def beat():
+            last, since = state['progress'], time.monotonic()
+            try:
+                while not done.wait(self.heartbeat):
+                    if state['progress'] != last:
+                        last, since = state['progress'], time.monotonic()
+                    elif job.kind == 'download' and time.monotonic() - since >= self.stall:
+                        # Stop renewing a stuck download and hand it back; setting `lost` aborts the transfer
+                        lost.set()
+                        self.farm.fail(job, f'The download made no progress for {self.stall:g} seconds.')
+                        return
+                    if not self.farm.heartbeat(job, state['progress'], state['total']):
+                        lost.set()
+                        return
+            finally:
+                self.farm.close()
+
+        def progress(update: DownloadProgress) -> None:
+            if lost.is_set():
+                raise DownloadCancelledError("The lease of the job was lost.")
+            state['progress'], state['total'] = update.downloaded, update.total
+
+        heart = threading.Thread(target=beat, name=f'aparat-farm-heartbeat-{job.id}', daemon=True)
+        heart.start()
+        try:
+            result = self._execute(job, progress, lost)
+        except DownloadCancelledError:
+            return
+        except Exception as e:
+            self.farm.fail(job, e)
+        else:
+            self.farm.complete(job, result)
+        finally:
+            done.set()
+            heart.join()
+
+    def _execute(self, job: FarmJob, progress, stop: threading.Event) -> dict:
+        payload = dict(job.payload)
+        if job.kind == 'download':
+            video = self.client.get_video(payload.pop('uid'))
+            result = video.download(**payload, show_progress_bar=False, progress=progress, return_result=True, stop=stop)
+            self.farm.heartbeat(job, result.size, result.size)
+            return result.to_dict()
+        if job.kind == 'upload':
+            my_video = self.client.upload_video(**payload)
+            return {'uid': my_video.uid}
+        raise ValueError(f"Unknown job kind: '{job.kind}'.")
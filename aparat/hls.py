@@ -0,0 +1,264 @@
+import os
+import re
+import time
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, List, Union
+from urllib.parse import urljoin
+import requests
+from .concurrency import AdaptiveLimiter
+from .deadlines import DeadlineExceededError, check_deadline
+from .download import _RETRYABLE
+from .session import _thread_safe
+from .throttle import BandwidthLimiter, Transfer
+
+_ATTRIBUTE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+def parse_time(value: Union[str, int, float]) -> float:
+    """Convert seconds or an 'SS', 'MM:SS' or 'HH:MM:SS' string to seconds."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    seconds = 0.0
+    for part in value.strip().split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def _attributes(line: str) -> Dict[str, str]:
+    return {key: value.strip('"') for key, value in _ATTRIBUTE.findall(line.split(':', 1)[1])}
+
+class Segment(object):
+    """One media segment of an HLS playlist.
+
+    Attributes:
+        url (str): The absolute segment URL.
+        start (float): The start time of the segment in seconds.
+        duration (float): The duration of the segment in seconds.
+        byte_range (tuple): `(offset, length)` for EXT-X-BYTERANGE segments, or None.
+    """
+
+    __slots__ = ('url', 'start', 'duration', 'byte_range')
+
+    def __init__(self, url: str, start: float, duration: float, byte_range: tuple = None):
+        self.url = url
+        self.start = start
+        self.duration = duration
+        self.byte_range = byte_range
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+class Playlist(object):
+    """A parsed HLS playlist: either a master playlist with variants or a media playlist with segments.
+
+    Attributes:
+        variants (List[dict]): The variant streams of a master playlist, with 'url', 'bandwidth' and 'height'.
+        segments (List[Segment]): The segments of a media playlist.
+        init (Segment): The EXT-X-MAP initialization segment of a fragmented MP4 playlist, or None.
+    """
+
+    def __init__(self, text: str, url: str):
+        """Parse a playlist.
+
+        Args:
+            text (str): The playlist text.
+            url (str): The playlist URL, used to resolve relative URIs.
+
+        Raises:
+            ValueError: If the text is not an HLS playlist, or its segments are encrypted.
+        """
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        if not lines or lines[0] != '#EXTM3U':
+            raise ValueError("Not an HLS playlist.")
+
+        self.variants = []
+        self.segments = []
+        self.init = None
+        variant = duration = byte_range = None
+        position = 0.0
+        next_offset = 0
+        for line in lines[1:]:
+            if line.startswith('#EXT-X-STREAM-INF:'):
+                attributes = _attributes(line)
+                resolution = attributes.get('RESOLUTION', '')
+                variant = {
+                    'bandwidth': int(attributes.get('BANDWIDTH', 0)),
+                    'height': int(resolution.split('x')[1]) if 'x' in resolution else None,
+                }
+            elif line.startswith('#EXTINF:'):
+                duration = float(line[8:].split(',')[0])
+            elif line.startswith('#EXT-X-BYTERANGE:'):
+                length, _, offset = line[17:].partition('@')
+                offset = int(offset) if offset else next_offset
+                byte_range = (offset, int(length))
+                next_offset = offset + int(length)
+            elif line.startswith('#EXT-X-MAP:'):
+                attributes = _attributes(line)
+                init_range = None
+                if 'BYTERANGE' in attributes:
+                    length, _, offset = attributes['BYTERANGE'].partition('@')
+                    init_range = (int(offset or 0), int(length))
+                self.init = Segment(urljoin(url, attributes['URI']), 0.0, 0.0, init_range)
+            elif line.startswith('#EXT-X-KEY:') and 'METHOD=NONE' not in line:
+                raise ValueError("Encrypted HLS segments are not supported.")
+            elif not line.startswith('#'):
+                if variant is not None:
+                    variant['url'] = urljoin(url, line)
+                    self.variants.append(variant)
+                    variant = None
+                elif duration is not None:
+                    self.segments.append(Segment(urljoin(url, line), position, duration, byte_range))
+                    position += duration
+                    duration = byte_range = None
+
+    @property
+    def duration(self) -> float:
+        return sum(segment.duration for segment in self.segments)
+
+    def select_variant(self, resolution: str = None) -> dict:
+        """Return the variant matching `resolution` (e.g. '720p'), the nearest one if it is missing, or the best one if None."""
+        if not self.variants:
+            raise ValueError("The playlist has no variants.")
+        if resolution is None:
+            return max(self.variants, key=lambda variant: (variant['height'] or 0, variant['bandwidth']))
+        height = int(resolution.rstrip('p'))
+        return min(self.variants, key=lambda variant: (abs((variant['height'] or 0) - height), -variant['bandwidth']))
+
+    def segments_between(self, start: float, end: float) -> List[Segment]:
+        """Return the segments overlapping the interval from `start` to `end` seconds."""
+        return [segment for segment in self.segments if segment.end > start and segment.start < end]
+
+class ClipResult(object):
+    """Outcome of `Video.download_clip`.
+
+    The clip is cut on segment boundaries, so it usually starts a little before
+    the requested start and ends a little after the requested end.
+
+    Attributes:
+        path (str): The written file.
+        start (float): The start time of the first written segment in seconds.
+        end (float): The end time of the last written segment in seconds.
+        segments (int): The number of media segments written.
+        bytes_written (int): The size of the file.
+        duration (float): The time the transfer took in seconds.
+    """
+
+    __slots__ = ('path', 'start', 'end', 'segments', 'bytes_written', 'duration')
+
+    def __init__(self, path: str, start: float, end: float, segments: int, bytes_written: int, duration: float):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.segments = segments
+        self.bytes_written = bytes_written
+        self.duration = duration
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def __str__(self) -> str:
+        return self.path
+
+    def __repr__(self) -> str:
+        return f"ClipResult(path={self.path!r}, start={self.start:.2f}, end={self.end:.2f}, segments={self.segments})"
+
+def _fetch(session, segment: Segment, retries: int, backoff: float, timeout: int, transfer: Transfer = None) -> bytes:
+    headers = {}
+    if segment.byte_range is not None:
+        offset, length = segment.byte_range
+        headers['Range'] = f'bytes={offset}-{offset + length - 1}'
+    attempt = 0
+    while True:
+        try:
+            with session.get(segment.url, headers=headers, timeout=timeout, stream=transfer is not None) as response:
+                response.raise_for_status()
+                if transfer is None:
+                    return response.content
+                chunks = []
+                for chunk in response.iter_content(transfer.limiter.chunk_size):
+                    transfer.consume(len(chunk))
+                    chunks.append(chunk)
+                return b''.join(chunks)
+        except DeadlineExceededError:
+            raise
+        except _RETRYABLE:
+            attempt += 1
+            if attempt > retries:
+                raise
+            check_deadline()
+            time.sleep(backoff * 2 ** (attempt - 1))
+
+def load_playlist(session, url: str, resolution: str = None, timeout: int = 10) -> Playlist:
+    """Fetch an HLS playlist, following a master playlist to the variant of `resolution`."""
+    response = session.get(url, timeout=timeout)
+    response.raise_for_status()
+    playlist = Playlist(response.text, response.url or url)
+    if playlist.variants:
+        variant_url = playlist.select_variant(resolution)['url']
+        response = session.get(variant_url, timeout=timeout)
+        response.raise_for_status()
+        playlist = Playlist(response.text, response.url or variant_url)
+    return playlist
+
+def download_clip(session, hls_url: str, start: float, end: float, path: str, resolution: str = None, limiter: AdaptiveLimiter = None, retries: int = 3, backoff: float = 0.5, timeout: int = 10, bandwidth: BandwidthLimiter = None, pin: Callable[[], ContextManager] = None) -> ClipResult:
+    """Download the HLS segments covering `start` to `end` seconds into one contiguous file.
+
+    The segments are fetched in parallel only if `session` is thread-safe (a
+    client created with `thread_safe=True`); otherwise they are fetched in turn.
+
+    Args:
+        session (requests.Session): The session to download with.
+        hls_url (str): The master or media playlist URL.
+        start (float): The start of the interval in seconds.
+        end (float): The end of the interval in seconds.
+        path (str): The output file.
+        resolution (str, optional): The variant to use, e.g. '720p'. Defaults to the best one.
+        limiter (AdaptiveLimiter, optional): Sets the number of segments fetched in parallel. Defaults to a limiter starting at 4.
+        retries (int, optional): The number of failed attempts tolerated per segment. Defaults to 3.
+        backoff (float, optional): The delay before the first retry in seconds, doubled on every retry. Defaults to 0.5.
+        timeout (int, optional): The timeout for each HTTP request in seconds. Defaults to 10.
+        bandwidth (BandwidthLimiter, optional): The byte-rate budget the segments are read within, as one transfer.
+        pin (Callable, optional): Returns a context manager entered by every worker around its segment requests,
+            e.g. to pin them to the proxy of the calling thread.
+
+    Returns:
+        ClipResult: The written clip.
+
+    Raises:
+        ValueError: If the interval is empty or outside the video.
+    """
+    if end <= start:
+        raise ValueError("'end' must be after 'start'.")
+
+    began = time.monotonic()
+    playlist = load_playlist(session, hls_url, resolution, timeout)
+    segments = playlist.segments_between(start, end)
+    if not segments:
+        raise ValueError(f"The interval {start}-{end} is outside the video ({playlist.duration:.1f} seconds).")
+
+    parts = ([playlist.init] if playlist.init is not None else []) + segments
+    transfer = bandwidth.transfer() if bandwidth is not None else None
+    pin = pin or nullcontext
+
+    def fetch(segment: Segment) -> bytes:
+        with pin():
+            return _fetch(session, segment, retries, backoff, timeout, transfer)
+
+    if _thread_safe(session):
+        fetched = (limiter or AdaptiveLimiter(initial=4, max_limit=16)).map(fetch, parts)
+    else:
+        fetched = map(fetch, parts)
+
+    written = 0
+    temp_path = f'{path}.part'
+    try:
+        with open(temp_path, 'wb') as f:
+            for data in fetched:
+                f.write(data)
+                written += len(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return ClipResult(path, segments[0].start, segments[-1].end, len(segments), written, time.monotonic() - began)
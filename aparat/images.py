@@ -0,0 +1,201 @@
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Union
+import requests
+from .concurrency import AdaptiveLimiter
+from .deadlines import DeadlineExceededError
+from .session import _thread_safe
+
+IMAGE_FIELDS = ('big_poster', 'medium_poster', 'small_poster', 'pic_s', 'pic_m', 'pic_b', 'cover_src')
+
+class ImageCache(object):
+    """Size-bounded LRU disk cache of images, keyed by URL.
+
+    Images are stored under `root` by the SHA-1 of their URL. The recency of an
+    entry is its file modification time, updated on every hit, so the cache
+    survives restarts and can be shared by several processes. Once the cache
+    grows beyond `max_size` bytes, the least recently used images are removed.
+
+    Example:
+        >>> cache = ImageCache('~/.cache/aparat-images', max_size=200 * 1024 ** 2)
+        >>> paths = aparat.fetch_images(videos, cache, variants=['small_poster'])
+
+    Attributes:
+        root (str): The cache directory.
+        max_size (int): The size limit in bytes, or None.
+    """
+
+    def __init__(self, root: str, max_size: int = 100 * 1024 ** 2):
+        """Initialize the cache, creating its directory if needed.
+
+        Args:
+            root (str): The cache directory.
+            max_size (int, optional): The size limit in bytes, or None for no limit. Defaults to 100 MB.
+        """
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.max_size = max_size
+        os.makedirs(self.root, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._size = 0
+        self._scan()
+
+    def _scan(self) -> None:
+        found = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                if name.endswith('.tmp'):
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                found.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self._size += size
+
+    @staticmethod
+    def key(url: str) -> str:
+        """Return the cache key of `url`."""
+        return hashlib.sha1(url.encode()).hexdigest()
+
+    def path(self, url: str) -> str:
+        """Return the path at which the image of `url` is (or would be) stored."""
+        key = self.key(url)
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, url: str) -> Union[str, None]:
+        """Return the path of the cached image of `url` and mark it as recently used, or None on a miss."""
+        key = self.key(url)
+        path = self.path(url)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            try:
+                os.utime(path)
+            except FileNotFoundError:  # removed by another process
+                self._size -= self._entries.pop(key)
+                return None
+            self._entries.move_to_end(key)
+        return path
+
+    def put(self, url: str, data: bytes) -> str:
+        """Store the image of `url` and return its path, evicting older images if the cache is full."""
+        key = self.key(url)
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self._size += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep: str = None) -> None:
+        while self.max_size is not None and self._size > self.max_size and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                self._entries.move_to_end(key)
+                continue
+            self._size -= self._entries.pop(key)
+            try:
+                os.remove(os.path.join(self.root, key[:2], key))
+            except FileNotFoundError:
+                pass
+
+    @property
+    def size(self) -> int:
+        """The total size of the cached images in bytes."""
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, url: str) -> bool:
+        return self.key(url) in self._entries
+
+    def clear(self) -> None:
+        """Remove every cached image."""
+        with self._lock:
+            for key in list(self._entries):
+                try:
+                    os.remove(os.path.join(self.root, key[:2], key))
+                except FileNotFoundError:
+                    pass
+            self._entries.clear()
+            self._size = 0
+
+def image_urls(item, variants: Iterable[str] = None) -> Dict[str, str]:
+    """Return the image URLs of a `Video`, `Playlist` or `User`, by field name.
+
+    Args:
+        item: The model object.
+        variants (Iterable[str], optional): The fields to include, e.g. ['small_poster', 'pic_s'].
+            Fields the model does not have are skipped. Defaults to all image fields of the model.
+    """
+    fields = IMAGE_FIELDS if variants is None else variants
+    urls = {}
+    for field in fields:
+        if field in IMAGE_FIELDS and hasattr(type(item), field):
+            url = getattr(item, field)
+            if url:
+                urls[field] = url
+    return urls
+
+def fetch_images(session, items: Iterable, cache: ImageCache, variants: Iterable[str] = None, limiter: AdaptiveLimiter = None, timeout: int = 10) -> List[Dict[str, Union[str, None]]]:
+    """Download the images of several models into `cache`.
+
+    The images are fetched concurrently if `session` is thread-safe (a client
+    created with `thread_safe=True`), and one at a time otherwise. Every distinct URL is fetched at most once, however many models share it,
+    and not at all when it is already cached. An image that cannot be downloaded
+    is reported as None instead of failing the whole batch.
+
+    Args:
+        session (requests.Session): The session to download with.
+        items (Iterable): `Video`, `Playlist` and `User` objects.
+        cache (ImageCache): The cache the images are stored in.
+        variants (Iterable[str], optional): The image fields to fetch. Defaults to all of them.
+        limiter (AdaptiveLimiter, optional): Sets the number of images fetched in parallel. Defaults to a limiter starting at 8.
+        timeout (int, optional): The timeout for each HTTP request in seconds. Defaults to 10.
+
+    Returns:
+        List[Dict[str, Union[str, None]]]: For every item, in order, the local path of each of its images by field name.
+    """
+    variants = list(variants) if variants is not None else None
+    wanted = [image_urls(item, variants) for item in items]
+
+    paths = {}
+    missing = []
+    for urls in wanted:
+        for url in urls.values():
+            if url not in paths:
+                paths[url] = cache.get(url)
+                if paths[url] is None:
+                    missing.append(url)
+
+    def fetch(url: str) -> Union[str, None]:
+        try:
+            response = session.get(url, timeout=timeout)
+            response.raise_for_status()
+        except DeadlineExceededError:
+            raise
+        except requests.RequestException:
+            return None
+        return cache.put(url, response.content)
+
+    if _thread_safe(session):
+        fetched = (limiter or AdaptiveLimiter(initial=8, max_limit=32)).map(fetch, missing)
+    else:
+        fetched = map(fetch, missing)
+    for url, path in zip(missing, fetched):
+        paths[url] = path
+
+    return [{field: paths[url] for field, url in urls.items()} for urls in wanted]
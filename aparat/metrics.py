@@ -0,0 +1,257 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterator, Tuple, Union
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class RequestEvent(object):
+    """One request, as seen by the instrumentation hooks.
+
+    The 'before_request' hooks receive the event before the request is sent, with
+    `status` and `timings` still empty. The 'after_request' hooks receive it once
+    the response headers (or the body, for non-streamed requests) have arrived or
+    the request has failed.
+
+    Attributes:
+        method (str): The HTTP method.
+        url (str): The request URL.
+        family (str): The endpoint family, e.g. 'video/video/show'.
+        template (str): The endpoint template, e.g. '/api/fa/v1/video/video/show/videohash/{videohash}'.
+        status (int): The response status code, or None if no response was received.
+        bytes_sent (int): The size of the request body.
+        bytes_received (int): The size of the response body, from Content-Length for streamed responses.
+        timings (dict): 'ttfb' (until the response headers were parsed, including DNS, connect and TLS),
+            'transfer' (reading the body) and 'total', in seconds.
+        error (Exception): The exception raised by the request, if any.
+        started_at (float): The wall-clock time the request was sent.
+    """
+
+    __slots__ = ('method', 'url', 'family', 'template', 'status', 'bytes_sent', 'bytes_received', 'timings', 'error', 'started_at')
+
+    def __init__(self, method: str, url: str, family: str, template: str):
+        self.method = method.upper()
+        self.url = url
+        self.family = family
+        self.template = template
+        self.status = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.timings = {}
+        self.error = None
+        self.started_at = time.time()
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None or (self.status is not None and self.status >= 500)
+
+    def to_dict(self) -> Dict[str, Union[str, int, float, dict, None]]:
+        """Return the event as a dictionary."""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['error'] = repr(self.error) if self.error is not None else None
+        return data
+
+class Instrumentation(object):
+    """Hooks called around every request sent by a client.
+
+    Attach it with `Aparat(instrumentation=...)`. Callbacks take one
+    `RequestEvent`; exceptions raised by a callback propagate to the caller.
+
+    Example:
+        >>> metrics = MetricsRegistry()
+        >>> aparat = Aparat(instrumentation=Instrumentation(metrics))
+        >>> aparat.instrumentation.add_hook('after_request', lambda event: print(event.template, event.timings))
+
+    Attributes:
+        hooks (dict): The 'before_request' and 'after_request' callback lists.
+        metrics (MetricsRegistry): The registry fed by this instrumentation, if any.
+    """
+
+    def __init__(self, metrics: 'MetricsRegistry' = None):
+        """Initialize the instrumentation.
+
+        Args:
+            metrics (MetricsRegistry, optional): A registry to record every request in.
+        """
+        self.hooks = {'before_request': [], 'after_request': []}
+        self.metrics = metrics
+        if metrics is not None:
+            self.add_hook('after_request', metrics.observe)
+
+    def add_hook(self, event: str, callback: Callable[[RequestEvent], None]) -> None:
+        """Register `callback` for 'before_request' or 'after_request'."""
+        if event not in self.hooks:
+            raise ValueError(f"Unsupported event '{event}'.")
+        self.hooks[event].append(callback)
+
+    def remove_hook(self, event: str, callback: Callable[[RequestEvent], None]) -> None:
+        """Unregister a callback added with `add_hook()`."""
+        self.hooks[event].remove(callback)
+
+    def before_request(self, method: str, url: str, family: str, template: str) -> RequestEvent:
+        event = RequestEvent(method, url, family, template)
+        for callback in list(self.hooks['before_request']):
+            callback(event)
+        return event
+
+    def after_request(self, event: RequestEvent, response, error: Exception, elapsed: float) -> None:
+        event.error = error
+        event.timings['total'] = elapsed
+        if response is not None:
+            event.status = response.status_code
+            body = response.request.body if response.request is not None else None
+            event.bytes_sent = len(body) if isinstance(body, (bytes, str)) else 0
+            if response._content_consumed:
+                event.bytes_received = len(response.content or b'')
+            else:
+                event.bytes_received = int(response.headers.get('Content-Length', 0))
+            ttfb = min(response.elapsed.total_seconds(), elapsed)
+            event.timings['ttfb'] = ttfb
+            event.timings['transfer'] = elapsed - ttfb
+        for callback in list(self.hooks['after_request']):
+            callback(event)
+
+class Histogram(object):
+    """Cumulative histogram with fixed bucket bounds.
+
+    Attributes:
+        buckets (tuple): The upper bounds of the buckets, in seconds.
+        count (int): The number of observations.
+        sum (float): The sum of the observations.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Union[float, None]:
+        """Estimate the `q` quantile (0 to 1) by interpolating inside its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def to_dict(self) -> Dict[str, Union[int, float, list]]:
+        """Return the cumulative bucket counts, count, sum and common quantiles."""
+        cumulative, total = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {
+            'buckets': cumulative,
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+        }
+
+class EndpointMetrics(object):
+    """Counters and latency histograms of one endpoint family."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.requests = 0
+        self.errors = 0
+        self.statuses = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = Histogram(buckets)
+        self.ttfb = Histogram(buckets)
+
+    def to_dict(self) -> Dict[str, Union[int, dict]]:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'statuses': dict(self.statuses),
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'latency': self.latency.to_dict(),
+            'ttfb': self.ttfb.to_dict(),
+        }
+
+class MetricsRegistry(object):
+    """In-process request metrics per endpoint family.
+
+    Records request and error counts, status codes, bytes and latency histograms
+    from the `RequestEvent`s of an `Instrumentation`. A request counts as an error
+    if it raised or got a 5xx response.
+
+    Example:
+        >>> metrics = MetricsRegistry()
+        >>> aparat = Aparat(instrumentation=Instrumentation(metrics))
+        >>> aparat.get_video('m98gm8j')
+        >>> metrics.snapshot()['video/video/show']['latency']['p50']
+        0.21
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """Initialize the registry.
+
+        Args:
+            buckets (tuple, optional): The latency histogram bucket bounds in seconds.
+        """
+        self.buckets = tuple(buckets)
+        self._endpoints: Dict[str, EndpointMetrics] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, event: RequestEvent) -> None:
+        """Record a finished request."""
+        with self._lock:
+            metrics = self._endpoints.get(event.family)
+            if metrics is None:
+                metrics = self._endpoints[event.family] = EndpointMetrics(self.buckets)
+            metrics.requests += 1
+            if event.failed:
+                metrics.errors += 1
+            status = str(event.status) if event.status is not None else type(event.error).__name__
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.bytes_sent += event.bytes_sent
+            metrics.bytes_received += event.bytes_received
+            metrics.latency.observe(event.timings['total'])
+            if 'ttfb' in event.timings:
+                metrics.ttfb.observe(event.timings['ttfb'])
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Return the metrics of every endpoint family as plain dictionaries."""
+        with self._lock:
+            return {family: metrics.to_dict() for family, metrics in self._endpoints.items()}
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        """Yield the metrics as `(name, labels, value)` samples, ready for an exporter.
+
+        Names follow Prometheus conventions, e.g. 'aparat_requests_total' and
+        'aparat_request_duration_seconds_bucket' with an 'le' label.
+        """
+        for family, metrics in self.snapshot().items():
+            labels = {'family': family}
+            yield 'aparat_requests_total', labels, metrics['requests']
+            yield 'aparat_request_errors_total', labels, metrics['errors']
+            for status, count in metrics['statuses'].items():
+                yield 'aparat_responses_total', dict(labels, status=status), count
+            yield 'aparat_request_bytes_total', labels, metrics['bytes_sent']
+            yield 'aparat_response_bytes_total', labels, metrics['bytes_received']
+            for name, histogram in (('aparat_request_duration_seconds', metrics['latency']), ('aparat_request_ttfb_seconds', metrics['ttfb'])):
+                for bound, count in histogram['buckets']:
+                    yield f'{name}_bucket', dict(labels, le='+Inf' if bound == float('inf') else str(bound)), count
+                yield f'{name}_count', labels, histogram['count']
+                yield f'{name}_sum', labels, histogram['sum']
+
+    def reset(self) -> None:
+        """Drop every recorded metric."""
+        with self._lock:
+            self._endpoints.clear()
@@ -0,0 +1,96 @@
+from enum import Enum
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Tuple, Union
+from .bulk import ActionResult, BulkExecutor
+
+class ModerationAction(Enum):
+    SKIP = 'skip'
+    APPROVE = 'approve'
+    DELETE = 'delete'
+    REPLY = 'reply'
+
+def _to_action(comment, decision) -> Union[Tuple, None]:
+    """Translate a classifier decision into a `BulkExecutor` action tuple."""
+    if isinstance(decision, tuple):
+        decision, body = decision
+    else:
+        body = None
+    if decision is None:
+        return None
+
+    decision = ModerationAction(decision.value if isinstance(decision, ModerationAction) else decision)
+    if decision == ModerationAction.APPROVE:
+        return (comment, 'approve')
+    if decision == ModerationAction.DELETE:
+        return (comment, 'delete')
+    if decision == ModerationAction.REPLY:
+        if not body:
+            raise ValueError("A reply decision must be given as (ModerationAction.REPLY, body).")
+        return (comment, 'reply_to_comment', {'body': body})
+    return None
+
+class ModerationPipeline(object):
+    """Classify and moderate dashboard comments in batches.
+
+    Dashboard pages are streamed, wrapped as `Comment` objects and passed to the
+    classifier `batch_size` at a time. On a client created with `thread_safe=True`,
+    the resulting approve, delete and reply actions run concurrently on a
+    `BulkExecutor` while the next pages are fetched; on a plain client, pages
+    and actions take turns on the calling thread.
+
+    The classifier receives a list of comments and returns one decision per comment:
+    `None` or `ModerationAction.SKIP`, `ModerationAction.APPROVE`, `ModerationAction.DELETE`
+    or `(ModerationAction.REPLY, body)`. Plain strings such as 'approve' are accepted too.
+
+    Example:
+        >>> def classifier(comments):
+        ...     return [ModerationAction.DELETE if 'spam' in c.body else ModerationAction.APPROVE for c in comments]
+        >>> pipeline = ModerationPipeline(aparat, classifier, max_workers=16, rate=10)
+        >>> for result in pipeline.run():
+        ...     print(result.target.id, result.action, result.status)
+    """
+
+    def __init__(self, client, classifier: Callable[[List], Iterable], batch_size: int = 100, max_workers: int = 8, rate: float = None, executor: BulkExecutor = None):
+        """Initialize the pipeline.
+
+        Args:
+            client (Aparat): A logged-in client.
+            classifier (Callable): Called with a list of comments; returns one decision per comment.
+            batch_size (int, optional): The number of comments passed to the classifier at once. Defaults to 100.
+            max_workers (int, optional): The number of actions run in parallel. Defaults to 8.
+            rate (float, optional): The maximum number of moderation requests per second. Defaults to no limit.
+            executor (BulkExecutor, optional): A preconfigured executor. Overrides `max_workers` and `rate`.
+        """
+        self.client = client
+        self.classifier = classifier
+        self.batch_size = batch_size
+        self.executor = executor or BulkExecutor(max_workers=max_workers, rate=rate, skip_noops=False)
+
+    def _actions(self, comments: Iterable, limit: Union[int, None]) -> Iterator[Tuple]:
+        comments = iter(comments if limit is None else islice(comments, limit))
+        while True:
+            batch = list(islice(comments, self.batch_size))
+            if not batch:
+                return
+            decisions = list(self.classifier(batch))
+            if len(decisions) != len(batch):
+                raise ValueError("The classifier must return one decision per comment.")
+            for comment, decision in zip(batch, decisions):
+                action = _to_action(comment, decision)
+                if action:
+                    yield action
+
+    def run(self, comments: Iterable = None, limit: int = None, timeout: int = 10) -> Iterator[ActionResult]:
+        """Run the pipeline and yield the outcome of every action taken.
+
+        Args:
+            comments (Iterable, optional): The comments to moderate. Defaults to all dashboard comments.
+            limit (int, optional): The maximum number of comments to classify. Defaults to no limit.
+            timeout (int, optional): The timeout for each dashboard page request (default is 10 seconds).
+
+        Yields:
+            ActionResult: One result per approve, delete or reply action, in completion order.
+        """
+        if comments is None:
+            comments = self.client.iter_dashboard_comments(timeout=timeout)
+        return self.executor.run(self._actions(comments, limit))
@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import json
+import threading
+import requests
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List
+from .aparat import LoginRequiredError, base_url
+
+class NotificationWatcher(object):
+    """Poll the notification list and report only new notifications.
+
+    The watcher remembers the IDs it has already reported and sends conditional
+    requests (`If-None-Match` / `If-Modified-Since`) when the server returns an
+    `ETag` or `Last-Modified` header. Unchanged payloads are detected by digest and
+    are not parsed again. The polling interval shrinks to `min_interval` when new
+    notifications arrive and grows by `backoff` up to `max_interval` while idle.
+    `watch()` and iteration also back off on 429 and 5xx responses and on
+    connection errors, and stop with `LoginRequiredError` if the session expires.
+
+    Example:
+        >>> watcher = NotificationWatcher(aparat, callback=print)
+        >>> watcher.watch()  # blocks; call watcher.stop() from another thread
+
+        >>> async for notification in NotificationWatcher(aparat):
+        ...     print(notification)
+
+    Attributes:
+        interval (float): The current polling interval in seconds.
+        last_id: The ID of the newest notification seen so far.
+    """
+
+    def __init__(self, client, callback: Callable[[Dict], None] = None, min_interval: float = 2, max_interval: float = 60, backoff: float = 1.5, include_existing: bool = False, max_seen: int = 1000):
+        """Initialize the watcher.
+
+        Args:
+            client (Aparat): A logged-in client.
+            callback (Callable, optional): Called with each new notification by `watch()`.
+            min_interval (float, optional): The shortest polling interval in seconds. Defaults to 2.
+            max_interval (float, optional): The longest polling interval in seconds. Defaults to 60.
+            backoff (float, optional): The factor applied to the interval after an idle poll. Defaults to 1.5.
+            include_existing (bool, optional): If True, the notifications present at the first poll are reported too. Defaults to False.
+            max_seen (int, optional): The number of notification IDs remembered. Defaults to 1000.
+        """
+        self.client = client
+        self.callback = callback
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.include_existing = include_existing
+        self.max_seen = max_seen
+
+        self.interval = min_interval
+        self.last_id = None
+        self._seen = OrderedDict()
+        self._primed = False
+        self._etag = None
+        self._last_modified = None
+        self._digest = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _key(notification: Dict):
+        """Return the ID of a notification, or a digest of its content if it has none."""
+        if notification.get('id') is not None:
+            return notification['id']
+        return hashlib.sha1(json.dumps(notification, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def _remember(self, notification_id) -> bool:
+        """Record `notification_id`; return True if it had not been seen before."""
+        if notification_id in self._seen:
+            return False
+        self._seen[notification_id] = None
+        if len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+        return True
+
+    def _update_interval(self, found_new: bool) -> None:
+        if found_new:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+
+    def poll(self, timeout: int = 10) -> List[Dict]:
+        """Fetch the notification list once and return the new notifications.
+
+        Args:
+            timeout (int, optional): The timeout for the HTTP request (default is 10 seconds).
+
+        Returns:
+            List[Dict]: The notifications not reported before, oldest first.
+
+        Raises:
+            LoginRequiredError: If the server rejects the session (401 or 403).
+            requests.HTTPError: If the server answers with any other error.
+        """
+        headers = {}
+        if self._etag:
+            headers['If-None-Match'] = self._etag
+        if self._last_modified:
+            headers['If-Modified-Since'] = self._last_modified
+
+        response = self.client.session.get(f'{base_url}/api/fa/v1/user/message/list', headers=headers, timeout=timeout)
+        if response.status_code == 304:
+            self._update_interval(False)
+            return []
+        if response.status_code in (401, 403):
+            raise LoginRequiredError()
+        if response.status_code != 200:
+            raise requests.HTTPError(f'{response.status_code} error while polling notifications.', response=response)
+
+        self._etag = response.headers.get('ETag')
+        self._last_modified = response.headers.get('Last-Modified')
+
+        digest = hashlib.sha1(response.content).digest()
+        if digest == self._digest:
+            self._update_interval(False)
+            return []
+        self._digest = digest
+
+        items = response.json().get('data') or []
+        new = [item for item in items if self._remember(self._key(item))]
+        if new:
+            self.last_id = new[0].get('id')
+
+        if not self._primed:
+            self._primed = True
+            if not self.include_existing:
+                new = []
+
+        self._update_interval(bool(new))
+        # The API lists the newest notification first.
+        return list(reversed(new))
+
+    def _poll_or_back_off(self, timeout: int = 10) -> List[Dict]:
+        """Poll once; on a transient error (429, 5xx, connection error or timeout), back off and return nothing."""
+        try:
+            return self.poll(timeout)
+        except requests.HTTPError as e:
+            if e.response is None or (e.response.status_code != 429 and e.response.status_code < 500):
+                raise
+        except (requests.ConnectionError, requests.Timeout):
+            pass
+        self._update_interval(False)
+        return []
+
+    def stop(self) -> None:
+        """Stop a running `watch()` loop or iterator."""
+        self._stop.set()
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Poll until `stop()` is called, yielding new notifications."""
+        self._stop.clear()
+        while not self._stop.is_set():
+            for notification in self._poll_or_back_off():
+                yield notification
+            self._stop.wait(self.interval)
+
+    def watch(self, timeout: int = 10) -> None:
+        """Poll until `stop()` is called, passing new notifications to the callback.
+
+        Args:
+            timeout (int, optional): The timeout for each HTTP request (default is 10 seconds).
+
+        Raises:
+            ValueError: If no callback was given.
+        """
+        if not self.callback:
+            raise ValueError("A callback is required to watch notifications.")
+
+        self._stop.clear()
+        while not self._stop.is_set():
+            for notification in self._poll_or_back_off(timeout):
+                self.callback(notification)
+            self._stop.wait(self.interval)
+
+    async def __aiter__(self):
+        """Asynchronously poll until `stop()` is called, yielding new notifications."""
+        loop = asyncio.get_event_loop()
+        self._stop.clear()
+        while not self._stop.is_set():
+            for notification in await loop.run_in_executor(None, self._poll_or_back_off):
+                yield notification
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,223 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Union
+import requests
+from .aparat import Aparat, IncorrectPasswordError, LoginFailedError, LoginRequiredError, NoAccountAvailableError
+from .throttle import RateLimiter
+
+# Errors that may be the account's fault; others, such as a missing video, say nothing about it
+_ACCOUNT_ERRORS = (requests.RequestException, LoginRequiredError, LoginFailedError, IncorrectPasswordError)
+
+class Account(object):
+    """One authenticated client held by an `AccountPool`.
+
+    Attributes:
+        client (Aparat): The logged-in client.
+        username (str): The account username.
+        limiter (RateLimiter): The per-account request budget, if any.
+        in_flight (int): The number of operations currently using the account.
+        requests (int): The number of operations run with the account.
+        failures (int): The number of consecutive failed operations.
+        healthy (bool): False once the account has been evicted.
+    """
+
+    def __init__(self, client: Aparat, password: str = None, rate: float = None):
+        self.client = client
+        self.username = getattr(client, 'username', None)
+        self.password = password
+        self.limiter = RateLimiter(rate) if rate else None
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.healthy = True
+        self.recovering = False
+
+    def to_dict(self) -> Dict[str, Union[str, int, bool]]:
+        """Return the load and health counters as a dictionary."""
+        return {
+            'username': self.username,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'failures': self.failures,
+            'healthy': self.healthy,
+            'logged_in': self.client.is_logged_in,
+        }
+
+class AccountPool(object):
+    """Distribute authenticated operations across several Aparat accounts.
+
+    Accounts are handed out least-loaded first (or round-robin), each with its own
+    optional rate budget. An account whose session has expired is logged in again
+    when its password is known, and evicted otherwise; so is an account that fails
+    `max_failures` operations in a row and no longer passes `verify_session()`.
+
+    Example:
+        >>> pool = AccountPool(rate=2)
+        >>> pool.add_session('first_user')
+        >>> pool.add_AuthV1('...')
+        >>> with pool.client() as aparat:
+        ...     aparat.get_video('m98gm8j').like()
+    """
+
+    def __init__(self, strategy: str = 'least_loaded', rate: float = None, max_failures: int = 3, proxy: Union[None, dict] = None):
+        """Initialize the pool.
+
+        Args:
+            strategy (str, optional): 'least_loaded' or 'round_robin'. Defaults to 'least_loaded'.
+            rate (float, optional): The default per-account budget in operations per second. Defaults to no limit.
+            max_failures (int, optional): Consecutive failures after which an account is re-checked. Defaults to 3.
+            proxy (dict, optional): The proxy configuration used for clients created by the pool.
+        """
+        if strategy not in ('least_loaded', 'round_robin'):
+            raise ValueError("'strategy' must be 'least_loaded' or 'round_robin'.")
+
+        self.strategy = strategy
+        self.rate = rate
+        self.max_failures = max_failures
+        self.proxy = proxy
+        self.accounts: List[Account] = []
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(1 for account in self.accounts if account.healthy)
+
+    def add_client(self, client: Aparat, password: str = None, rate: float = None) -> Account:
+        """Add an already logged-in client.
+
+        Args:
+            client (Aparat): The logged-in client.
+            password (str, optional): The account password, used to log in again when the session expires.
+            rate (float, optional): The account budget in operations per second. Defaults to the pool rate.
+
+        Returns:
+            Account: The added account.
+
+        Raises:
+            LoginRequiredError: If the client is not logged in.
+        """
+        if not client.is_logged_in:
+            raise LoginRequiredError()
+
+        account = Account(client, password, rate or self.rate)
+        with self._lock:
+            self.accounts.append(account)
+        return account
+
+    def add_login(self, username: str, password: str, rate: float = None, timeout: int = 10) -> Account:
+        """Log in with a username and password and add the account."""
+        client = Aparat(proxy=self.proxy)
+        client.login(username, password, timeout=timeout)
+        return self.add_client(client, password, rate)
+
+    def add_session(self, username: str, path: str = None, password: str = None, rate: float = None) -> Account:
+        """Restore a session saved with `Aparat.save_session()` and add the account."""
+        client = Aparat(proxy=self.proxy)
+        if not client.load_session(username, path=path):
+            raise LoginFailedError("The saved session has expired.")
+        return self.add_client(client, password, rate)
+
+    def add_AuthV1(self, AuthV1: str, password: str = None, rate: float = None, timeout: int = 10) -> Account:
+        """Restore a login from an AuthV1 cookie and add the account."""
+        client = Aparat(proxy=self.proxy)
+        if not client.load_AuthV1(AuthV1, timeout=timeout):
+            raise LoginFailedError("The AuthV1 cookie was rejected.")
+        return self.add_client(client, password, rate)
+
+    def _candidates(self) -> List[Account]:
+        healthy = [account for account in self.accounts if account.healthy]
+        if self.strategy == 'round_robin':
+            start = self._next % len(healthy) if healthy else 0
+            self._next += 1
+            return healthy[start:] + healthy[:start]
+        return sorted(healthy, key=lambda account: account.in_flight)
+
+    def acquire(self, timeout: float = None) -> Account:
+        """Take an account for one operation. Prefer the `client()` context manager.
+
+        Args:
+            timeout (float, optional): The maximum time to wait for an account with budget left. Defaults to waiting forever.
+
+        Returns:
+            Account: The acquired account. Pass it to `release()` when done.
+
+        Raises:
+            NoAccountAvailableError: If the pool has no healthy account or `timeout` expired.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                candidates = self._candidates()
+                if not candidates:
+                    raise NoAccountAvailableError()
+                for account in candidates:
+                    if account.limiter is None or account.limiter.try_acquire():
+                        account.in_flight += 1
+                        account.requests += 1
+                        return account
+            if deadline is not None and time.monotonic() >= deadline:
+                raise NoAccountAvailableError("All accounts are out of budget.")
+            time.sleep(0.01)
+
+    def release(self, account: Account, ok: bool = True) -> None:
+        """Return an account after an operation and update its health."""
+        with self._lock:
+            account.in_flight -= 1
+            account.failures = 0 if ok else account.failures + 1
+            check = account.healthy and not account.recovering and (not account.client.is_logged_in or account.failures >= self.max_failures)
+            if check:
+                account.recovering = True
+
+        if check:
+            try:
+                self._recover(account)
+            finally:
+                account.recovering = False
+
+    def _recover(self, account: Account) -> None:
+        """Log the account in again if possible, otherwise evict it."""
+        client = account.client
+        if client.is_logged_in and client.verify_session(max_age=0):
+            account.failures = 0
+            return
+
+        if account.password and account.username:
+            try:
+                client.logout()
+                client.login(account.username, account.password)
+                account.failures = 0
+                return
+            except Exception:
+                pass
+
+        self.evict(account)
+
+    def evict(self, account: Account) -> None:
+        """Remove an account from rotation."""
+        with self._lock:
+            account.healthy = False
+
+    @contextmanager
+    def client(self, timeout: float = None) -> Iterator[Aparat]:
+        """Context manager yielding the client of an acquired account.
+
+        A request or authentication error raised inside the block counts as a failed
+        operation; it is re-raised, like any other exception.
+        """
+        account = self.acquire(timeout)
+        try:
+            yield account.client
+        except _ACCOUNT_ERRORS:
+            self.release(account, ok=False)
+            raise
+        except BaseException:
+            self.release(account, ok=True)
+            raise
+        else:
+            self.release(account, ok=True)
+
+    def stats(self) -> List[Dict[str, Union[str, int, bool]]]:
+        """Return a snapshot of the load and health of every account."""
+        with self._lock:
+            return [account.to_dict() for account in self.accounts]
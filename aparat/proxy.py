@@ -0,0 +1,173 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Union
+
+class Proxy(object):
+    """Health statistics of one proxy in a `ProxyPool`.
+
+    Attributes:
+        url (str): The proxy URL.
+        proxies (dict): The `requests` proxies mapping for this proxy.
+        latency (float): The smoothed response latency in seconds, or None before the first response.
+        error_rate (float): The smoothed error rate between 0 and 1.
+        requests (int): The number of requests sent through the proxy.
+        errors (int): The number of failed requests.
+        ejected_until (float): Monotonic time until which the proxy is out of rotation, or None.
+    """
+
+    def __init__(self, proxy: Union[str, dict]):
+        if isinstance(proxy, dict):
+            self.proxies = dict(proxy)
+            self.url = proxy.get('https') or proxy.get('http')
+        else:
+            self.proxies = {'http': proxy, 'https': proxy}
+            self.url = proxy
+        self.latency = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.ejected_until = None
+        self.ejections = 0
+        self.probing = False
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until is None
+
+    def to_dict(self) -> Dict[str, Union[str, int, float, bool]]:
+        """Return the proxy statistics as a dictionary."""
+        return {
+            'url': self.url,
+            'latency': self.latency,
+            'error_rate': self.error_rate,
+            'requests': self.requests,
+            'errors': self.errors,
+            'healthy': self.healthy,
+        }
+
+class ProxyPool(object):
+    """Rotate requests across several proxies and keep unhealthy ones out.
+
+    Every response or connection error updates the proxy's smoothed latency and
+    error rate. A proxy whose error rate exceeds `max_error_rate` (after at least
+    `min_requests` requests) is ejected for `eject_time` seconds, doubling on each
+    repeated ejection. Once that time has passed the proxy receives a single probe
+    request: success puts it back in rotation and resets the period, failure
+    ejects it again.
+
+    Use `pin()` to send every request of a thread through the same proxy, e.g. for
+    the duration of a download or upload.
+
+    Example:
+        >>> pool = ProxyPool(['http://10.0.0.1:3128', 'http://10.0.0.2:3128'])
+        >>> aparat = Aparat(proxy_pool=pool)
+    """
+
+    def __init__(self, proxies: List[Union[str, dict]], max_error_rate: float = 0.5, min_requests: int = 5, eject_time: float = 30, max_eject_time: float = 600, smoothing: float = 0.2):
+        """Initialize the pool.
+
+        Args:
+            proxies (List[Union[str, dict]]): Proxy URLs or `requests` proxies mappings.
+            max_error_rate (float, optional): The smoothed error rate above which a proxy is ejected. Defaults to 0.5.
+            min_requests (int, optional): The number of requests before a proxy can be ejected. Defaults to 5.
+            eject_time (float, optional): The initial ejection period in seconds. Defaults to 30.
+            max_eject_time (float, optional): The longest ejection period in seconds. Defaults to 600.
+            smoothing (float, optional): The weight of the newest sample in the moving averages. Defaults to 0.2.
+        """
+        if not proxies:
+            raise ValueError("At least one proxy is required.")
+
+        self.proxies = [Proxy(proxy) for proxy in proxies]
+        self.max_error_rate = max_error_rate
+        self.min_requests = min_requests
+        self.eject_time = eject_time
+        self.max_eject_time = max_eject_time
+        self.smoothing = smoothing
+        self._cycle = itertools.cycle(self.proxies)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def select(self) -> Proxy:
+        """Return the proxy for the next request.
+
+        A pinned proxy is returned if the calling thread has one. Otherwise ejected
+        proxies that are due for a probe come first, then healthy proxies in turn.
+        If every proxy is ejected, the one that is due back soonest is used.
+        """
+        pinned = getattr(self._local, 'pinned', None)
+        if pinned is not None:
+            return pinned
+
+        now = time.monotonic()
+        with self._lock:
+            for proxy in self.proxies:
+                if proxy.ejected_until is not None and proxy.ejected_until <= now and not proxy.probing:
+                    proxy.probing = True
+                    return proxy
+            for _ in range(len(self.proxies)):
+                proxy = next(self._cycle)
+                if proxy.healthy:
+                    return proxy
+            return min(self.proxies, key=lambda proxy: proxy.ejected_until)
+
+    def record(self, proxy: Proxy, latency: float, ok: Union[bool, None]) -> None:
+        """Record the outcome of a request sent through `proxy`.
+
+        Args:
+            proxy (Proxy): The proxy the request was sent through.
+            latency (float): The duration of the request in seconds.
+            ok (bool): True for success, False for failure, None if the request ended for an unrelated reason.
+                A None outcome is not counted, but it ends the proxy's probe so that another one can be made.
+        """
+        with self._lock:
+            if ok is None:
+                proxy.probing = False
+                return
+            proxy.requests += 1
+            if not ok:
+                proxy.errors += 1
+            if ok:
+                proxy.latency = latency if proxy.latency is None else (1 - self.smoothing) * proxy.latency + self.smoothing * latency
+            proxy.error_rate = (1 - self.smoothing) * proxy.error_rate + self.smoothing * (0.0 if ok else 1.0)
+
+            if proxy.probing:
+                proxy.probing = False
+                if ok:
+                    proxy.ejected_until = None
+                    proxy.error_rate = 0.0
+                    proxy.ejections = 0  # a later ejection starts again from `eject_time`
+                    return
+                self._eject(proxy)
+            elif proxy.healthy and proxy.requests >= self.min_requests and proxy.error_rate > self.max_error_rate:
+                self._eject(proxy)
+
+    def _eject(self, proxy: Proxy) -> None:
+        proxy.ejections += 1
+        period = min(self.max_eject_time, self.eject_time * 2 ** (proxy.ejections - 1))
+        proxy.ejected_until = time.monotonic() + period
+
+    @contextmanager
+    def pin(self, proxy: Proxy = None) -> Iterator[Proxy]:
+        """Context manager sending every request of the calling thread through one proxy.
+
+        Args:
+            proxy (Proxy, optional): The proxy to use, e.g. one pinned by another thread working on the same
+                transfer. Defaults to the proxy already pinned by the thread, or the next one of the pool.
+        """
+        if proxy is None and getattr(self._local, 'pinned', None) is not None:
+            yield self._local.pinned
+            return
+
+        previous = getattr(self._local, 'pinned', None)
+        self._local.pinned = proxy or self.select()
+        try:
+            yield self._local.pinned
+        finally:
+            self._local.pinned = previous
+
+    def stats(self) -> List[Dict[str, Union[str, int, float, bool]]]:
+        """Return a snapshot of the statistics of every proxy."""
+        with self._lock:
+            return [proxy.to_dict() for proxy in self.proxies]
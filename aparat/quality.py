@@ -0,0 +1,195 @@
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Union
+from urllib.parse import urlsplit
+import requests
+from .deadlines import remaining
+
+class ThroughputHistory(object):
+    """Recent download throughput, per host, used to choose a resolution automatically.
+
+    Every finished download (and every probe) adds a sample; the estimate for a
+    host is the median of its samples younger than `max_age` seconds, or of all
+    hosts' recent samples if the host has none.
+
+    Attributes:
+        size (int): The number of samples kept per host.
+        max_age (float): The age in seconds after which a sample is ignored.
+    """
+
+    def __init__(self, size: int = 20, max_age: float = 600):
+        self.size = size
+        self.max_age = max_age
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, url: str, size: int, seconds: float) -> None:
+        """Record a transfer of `size` bytes from the host of `url` that took `seconds`."""
+        if size <= 0 or seconds <= 0:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            samples = self._samples.setdefault(host, deque(maxlen=self.size))
+            samples.append((time.monotonic(), size / seconds))
+
+    def estimate(self, url: str = None) -> Union[float, None]:
+        """Return the estimated throughput in bytes per second for the host of `url`, or None without recent samples."""
+        cutoff = time.monotonic() - self.max_age
+        with self._lock:
+            host = urlsplit(url).netloc if url else None
+            values = [rate for at, rate in self._samples.get(host, ()) if at >= cutoff]
+            if not values:
+                values = [rate for samples in self._samples.values() for at, rate in samples if at >= cutoff]
+        if not values:
+            return None
+        values.sort()
+        return values[len(values) // 2]
+
+def profile_height(profile: str) -> int:
+    """Return the height of a profile name such as '720p', or 0 if it has none."""
+    match = re.match(r'(\d+)', profile or '')
+    return int(match.group(1)) if match else 0
+
+def nearest_profile(links: List[dict], resolution: str) -> Union[dict, None]:
+    """Return the link of `resolution`, or of the available profile closest to it (preferring the lower one on a tie)."""
+    links = [link for link in links if link.get('urls')]
+    if not links:
+        return None
+    height = profile_height(resolution)
+    return min(links, key=lambda link: (abs(profile_height(link['profile']) - height), profile_height(link['profile'])))
+
+def _parse_duration(duration: Union[str, int, float, None]) -> Union[float, None]:
+    if duration in (None, ''):
+        return None
+    try:
+        seconds = 0.0
+        for part in str(duration).split(':'):
+            seconds = seconds * 60 + float(part)
+    except ValueError:
+        return None
+    return seconds or None
+
+def remote_size(session, url: str, timeout: int = 10) -> Union[int, None]:
+    """Return the size of the file at `url` from a one-byte Range request, or None if the server does not tell."""
+    try:
+        with session.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=timeout) as response:
+            if response.status_code == 206 and '/' in response.headers.get('Content-Range', ''):
+                total = response.headers['Content-Range'].rsplit('/', 1)[1]
+                return int(total) if total.isdigit() else None
+            if response.status_code == 200 and response.headers.get('Content-Length', '').isdigit():
+                return int(response.headers['Content-Length'])
+    except requests.RequestException:
+        pass
+    return None
+
+def probe_throughput(session, url: str, size: int = 512 * 1024, timeout: int = 10, history: ThroughputHistory = None, max_time: float = None) -> Union[float, None]:
+    """Measure the throughput of `url` by downloading its first `size` bytes.
+
+    With `max_time`, the probe stops after that many seconds and measures what
+    it received so far.
+
+    Returns:
+        float: The throughput in bytes per second, or None if the probe failed.
+    """
+    start = time.monotonic()
+    received = 0
+    try:
+        with session.get(url, headers={'Range': f'bytes=0-{size - 1}'}, stream=True, timeout=timeout) as response:
+            if response.status_code not in (200, 206):
+                return None
+            for chunk in response.iter_content(64 * 1024):
+                received += len(chunk)
+                if received >= size or (max_time is not None and time.monotonic() - start >= max_time):
+                    break
+    except requests.RequestException:
+        return None
+
+    elapsed = time.monotonic() - start
+    if received == 0 or elapsed <= 0:
+        return None
+    if history is not None:
+        history.record(url, received, elapsed)
+    return received / elapsed
+
+_MIN_PROBE_TIME = 0.5
+
+def select_profile(session, links: List[dict], max_size: int = None, duration: Union[str, float] = None, history: ThroughputHistory = None, safety: float = 0.8, probe: bool = True, timeout: int = 10, selection_share: float = 0.1) -> Union[dict, None]:
+    """Choose the highest profile that fits the caller's budget at the expected throughput.
+
+    The time budget is what is left of the current `deadline()`. Without one, the
+    video's `duration` is used instead, so that the chosen profile downloads at
+    least as fast as it plays. The expected throughput comes from `history`, or
+    from a short probe of the lowest profile when there is no recent sample, and is
+    capped by the session's `BandwidthLimiter`. Only `safety` of the time budget is
+    planned for.
+
+    Under a deadline, the probe and the size requests may take no more than
+    `selection_share` of the time left, and the time they took is not planned
+    for. If that share is too short for a probe, the lowest profile is chosen.
+
+    Args:
+        session (requests.Session): The session to probe with.
+        links (List[dict]): The `file_link_all` entries of the video.
+        max_size (int, optional): The largest acceptable file size in bytes.
+        duration (Union[str, float], optional): The video duration, in seconds or as 'MM:SS'.
+        history (ThroughputHistory, optional): Recent throughput samples.
+        safety (float, optional): The share of the time budget to plan for. Defaults to 0.8.
+        probe (bool, optional): Probe the throughput when `history` has no recent sample. Defaults to True.
+        timeout (int, optional): The timeout for each HTTP request in seconds. Defaults to 10.
+        selection_share (float, optional): The share of the time left before the deadline the choice may take. Defaults to 0.1.
+
+    Returns:
+        dict: The chosen link, the lowest profile if none fits, or None if `links` has no URLs.
+    """
+    links = sorted((link for link in links if link.get('urls')), key=lambda link: profile_height(link['profile']))
+    if not links:
+        return None
+
+    time_budget = remaining()
+    start, allowed = time.monotonic(), None
+    if time_budget is not None:
+        allowed = time_budget * selection_share
+    else:
+        time_budget = _parse_duration(duration)
+    if time_budget is None and max_size is None:
+        return links[-1]
+
+    def time_left() -> Union[float, None]:
+        # The time the choice may still take, or None without a deadline
+        return None if allowed is None else allowed - (time.monotonic() - start)
+
+    throughput = None
+    if time_budget is not None:
+        url = links[0]['urls'][0]
+        throughput = history.estimate(url) if history is not None else None
+        if throughput is None and probe:
+            if allowed is None or allowed >= _MIN_PROBE_TIME:
+                throughput = probe_throughput(session, url, timeout=min(timeout, allowed or timeout), history=history, max_time=allowed)
+            elif max_size is None:
+                return links[0]
+        bandwidth = getattr(session, 'bandwidth', None)
+        limits = [limit for limit in (getattr(bandwidth, 'rate', None), getattr(bandwidth, 'per_transfer', None)) if limit]
+        if limits:
+            throughput = min([throughput] + limits) if throughput else min(limits)
+        if throughput is None and max_size is None:
+            return links[-1]
+
+    if allowed is not None:
+        time_budget = max(remaining(), 0)
+
+    budget = None
+    if throughput is not None:
+        budget = throughput * time_budget * safety
+    if max_size is not None:
+        budget = max_size if budget is None else min(budget, max_size)
+
+    for link in reversed(links):
+        left = time_left()
+        if left is not None and left <= 0:
+            break
+        size = remote_size(session, link['urls'][0], timeout if left is None else min(timeout, left))
+        if size is not None and size <= budget:
+            return link
+    return links[0]
@@ -0,0 +1,505 @@
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from typing import Callable, Dict, List, Union
+from urllib.parse import urlsplit
+from .deadlines import propagate
+from .download import DownloadCancelledError, DownloadProgress, DownloadResult, TqdmProgress
+from .session import _thread_safe
+
+class DownloadJob(object):
+    """One video download queued in a `DownloadScheduler`.
+
+    Attributes:
+        id (str): The job ID.
+        uid (str): The video UID.
+        options (dict): The `Video.download` arguments of the job.
+        priority (int): Higher priorities run first.
+        submitter (str): The name used to share the workers fairly between submitters.
+        host (str): The CDN host the video is downloaded from.
+        state (str): 'queued', 'running', 'done', 'failed' or 'cancelled'.
+        downloaded (int): The number of bytes downloaded so far.
+        total (int): The size of the file, once known.
+        result (DownloadResult): The download result, once done.
+        error (Exception): The error the job failed with, if any.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, uid: str, options: dict, priority: int = 0, submitter: str = 'default', id: str = None, submitted_at: float = None):
+        self.id = id or uuid.uuid4().hex
+        self.uid = uid
+        self.options = options
+        self.priority = priority
+        self.submitter = submitter
+        self.submitted_at = submitted_at or time.time()
+        self.host = None
+        self.state = self.QUEUED
+        self.downloaded = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.sequence = None
+
+        self._video = None
+        self._run = None
+        self._progress = []
+        self._limiters = []
+        self._owners = 0
+        self._store = None
+        self._scheduler = None
+        self._callbacks = []
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def cancel(self) -> bool:
+        """Cancel the job. Returns False if it had already finished."""
+        return self._scheduler.cancel(self)
+
+    def withdraw(self) -> bool:
+        """Withdraw one submission of the job; see `DownloadScheduler.withdraw()`."""
+        return self._scheduler.withdraw(self)
+
+    def add_done_callback(self, callback: Callable[['DownloadJob'], None]) -> None:
+        """Call `callback` with the job once it has finished, at once if it already has.
+
+        The callback runs in the thread that finished the job, so it should return quickly.
+        """
+        with self._scheduler._condition:
+            if not self.finished:
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def wait(self, timeout: float = None) -> DownloadResult:
+        """Wait for the job to finish and return its result.
+
+        Raises:
+            TimeoutError: If the job is still unfinished after `timeout` seconds.
+            DownloadCancelledError: If the job was cancelled.
+            Exception: The error the download failed with.
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"The download of '{self.uid}' is still {self.state}.")
+        if self.state == self.CANCELLED:
+            raise DownloadCancelledError()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def to_dict(self) -> Dict[str, Union[str, int, float, dict]]:
+        """Return the job as a dictionary."""
+        return {
+            'id': self.id,
+            'uid': self.uid,
+            'options': self.options,
+            'priority': self.priority,
+            'submitter': self.submitter,
+            'submitted_at': self.submitted_at,
+            'host': self.host,
+            'state': self.state,
+            'downloaded': self.downloaded,
+            'total': self.total,
+            'error': str(self.error) if self.error is not None else None,
+        }
+
+class DownloadScheduler(object):
+    """Run video downloads from a priority queue with global and per-host concurrency caps.
+
+    Jobs run highest priority first. Among jobs of equal priority, the submitter
+    with the fewest running jobs (and then the one served least recently) goes
+    next, so one large submission does not starve the others; each submitter's
+    jobs run in submission order. A job is only started while fewer than
+    `per_host` downloads run against its CDN host, so idle hosts are used while
+    a busy one is capped. A plain session may not be shared by threads, so jobs
+    whose video was fetched by a client without `thread_safe=True` run one at a
+    time per session; the caller should not use that session meanwhile either.
+
+    With `state_path`, unfinished jobs are saved to a JSON file by a background
+    thread, at most every `save_interval` seconds, and loaded again by the next
+    scheduler using the file, so a restarted process continues the queue.
+    Interrupted jobs start their download again, and jobs whose video no longer
+    exists are dropped.
+
+    Submitting a job identical to a queued or running one returns that job; the
+    new submission's `progress` callback and `limiter` are added to it. Such a
+    shared job is only cancelled by `withdraw()` once every submission has been
+    withdrawn.
+
+    Example:
+        >>> scheduler = DownloadScheduler(aparat, max_workers=8, per_host=2, state_path='queue.json')
+        >>> job = scheduler.submit(video, '720p', path='videos/', priority=10)
+        >>> result = job.wait()
+
+    Finished jobs are dropped from the scheduler; `stats()` keeps counting them.
+
+    Attributes:
+        max_workers (int): The number of downloads run at once.
+        per_host (int): The number of downloads run at once against one host, or None for no cap.
+        store (DownloadStore): The store used by jobs that do not name one, if any.
+        restored (List[DownloadJob]): The jobs loaded from `state_path`, finished or not.
+    """
+
+    def __init__(self, client=None, max_workers: int = 4, per_host: int = 2, state_path: str = None, store=None, save_interval: float = 0.5):
+        """Initialize the scheduler and start its workers.
+
+        Args:
+            client (Aparat, optional): The client used to look up videos submitted by UID and restored jobs.
+            max_workers (int, optional): The number of downloads run at once. Defaults to 4.
+            per_host (int, optional): The number of downloads run at once against one host, or None for no cap. Defaults to 2.
+            state_path (str, optional): The JSON file the queue is persisted in. Defaults to no persistence.
+            store (DownloadStore, optional): The store used by jobs that do not name one.
+            save_interval (float, optional): The shortest time in seconds between two saves of the queue. Defaults to 0.5.
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.state_path = state_path
+        self.store = store
+        self.save_interval = save_interval
+
+        self.restored: List[DownloadJob] = []
+
+        self._jobs: Dict[tuple, DownloadJob] = {}
+        self._queue: List[DownloadJob] = []
+        self._finished = Counter()
+        self._running_hosts = Counter()
+        self._running_submitters = Counter()
+        self._running_sessions = Counter()
+        self._served: Dict[str, int] = {}
+        self._sequence = itertools.count()
+        self._turns = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._version = self._written = 0
+        self._changed = threading.Event()
+        self._stopping = threading.Event()
+        self._write_lock = threading.Lock()
+
+        if state_path and os.path.exists(state_path):
+            self._restore()
+
+        self._workers = [threading.Thread(target=self._work, name=f'aparat-download-{i}', daemon=True) for i in range(max_workers)]
+        if state_path:
+            self._workers.append(threading.Thread(target=self._persist, name='aparat-download-state', daemon=True))
+        for worker in self._workers:
+            worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    @staticmethod
+    def _host(video, options: dict) -> Union[str, None]:
+        links = [link for link in video.file_link_all or [] if link.get('urls')]
+        if not links:
+            return None
+        link = links[-1]
+        for candidate in links:
+            if candidate['profile'] == options.get('resolution'):
+                link = candidate
+        return urlsplit(link['urls'][0]).netloc
+
+    def submit(self, video, resolution: str = None, path: str = None, priority: int = 0, submitter: str = 'default', progress: Callable[[DownloadProgress], None] = None, limiter=None, store=None, **options) -> DownloadJob:
+        """Queue the download of a video.
+
+        Args:
+            video (Union[Video, str]): The video, or its UID if the scheduler has a client.
+            resolution (str, optional): The desired video resolution, as for `Video.download`.
+            path (str, optional): The path where the video will be saved.
+            priority (int, optional): Higher priorities run first. Defaults to 0.
+            submitter (str, optional): The name used to share the workers fairly. Defaults to 'default'.
+            progress (Callable, optional): Called with a `DownloadProgress` after every chunk.
+            limiter (AdaptiveLimiter, optional): A limiter whose slot the download holds while it runs.
+            store (DownloadStore, optional): The store to download through. Defaults to the scheduler's store.
+            **options: Other `Video.download` arguments, such as `download_highest_resolution`, `retries`,
+                `show_progress_bar` or `max_size`. They are saved with the job, so they must be JSON values.
+
+        Returns:
+            DownloadJob: The queued job, or the identical job already queued or running. In that case `progress`
+            is called for the shared job too, and `limiter` applies to it unless it has already started.
+        """
+        if isinstance(video, str):
+            if self.client is None:
+                raise ValueError("A client is required to submit videos by UID.")
+            video = self.client.get_video(video)
+
+        options = dict(options, resolution=resolution, path=path)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The scheduler has been shut down.")
+            job = self._jobs.get(self._key(video.uid, options))
+            if job is not None:
+                self._join(job, progress, limiter)
+                return job
+
+            job = DownloadJob(video.uid, options, priority, submitter)
+            self._prepare(job, video, progress, limiter, store)
+            self._add(job)
+        return job
+
+    @staticmethod
+    def _key(uid: str, options: dict) -> tuple:
+        # Identical submissions share a job; the options are JSON values
+        return uid, json.dumps(options, sort_keys=True)
+
+    def _prepare(self, job: DownloadJob, video, progress=None, limiter=None, store=None) -> None:
+        session = getattr(video, 'session', None)
+        job._video = video
+        job._store = store
+        job._scheduler = self
+        job._key = self._key(job.uid, job.options)
+        job._session = session if session is not None and not _thread_safe(session) else None
+        job.host = self._host(video, job.options)
+        job._run = propagate(functools.partial(self._execute, job))
+        self._join(job, progress, limiter)
+
+    @staticmethod
+    def _join(job: DownloadJob, progress=None, limiter=None) -> None:
+        job._owners += 1
+        if progress is not None:
+            job._progress.append(progress)
+        if limiter is not None and limiter not in job._limiters:
+            job._limiters.append(limiter)
+
+    def _add(self, job: DownloadJob) -> None:
+        job.sequence = next(self._sequence)
+        self._jobs[job._key] = job
+        self._queue.append(job)
+        self._save()
+        self._condition.notify()
+
+    def _restore(self) -> None:
+        with open(self.state_path, encoding='utf-8') as f:
+            saved = [DownloadJob(item['uid'], item['options'], item['priority'], item['submitter'], item['id'], item['submitted_at']) for item in json.load(f)['jobs']]
+        if not saved:
+            return
+        if self.client is None:
+            raise ValueError("A client is required to restore the saved download queue.")
+
+        videos = {video.uid: video for video in self.client.get_videos(list({job.uid for job in saved}))}
+        with self._condition:
+            for job in saved:
+                if job.uid in videos and self._key(job.uid, job.options) not in self._jobs:
+                    self._prepare(job, videos[job.uid])
+                    self._add(job)
+                    self.restored.append(job)
+
+    def _save(self) -> None:
+        # Called with the condition held: only mark the queue as changed, the state thread writes it
+        if self.state_path:
+            self._version += 1
+            self._changed.set()
+
+    def _write(self) -> None:
+        """Write the queue to `state_path` if it changed since the last write."""
+        if not self.state_path:
+            return
+        with self._write_lock:
+            with self._condition:
+                version = self._version
+                if version == self._written:
+                    return
+                jobs = [job.to_dict() for job in self._jobs.values() if job.state in (DownloadJob.QUEUED, DownloadJob.RUNNING)]
+            temp_path = f'{self.state_path}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'jobs': jobs}, f, ensure_ascii=False)
+            os.replace(temp_path, self.state_path)
+            self._written = version
+
+    def _persist(self) -> None:
+        while not self._closed:
+            self._changed.wait()
+            self._changed.clear()
+            self._write()
+            self._stopping.wait(self.save_interval)
+
+    def _next(self) -> Union[DownloadJob, None]:
+        eligible = [job for job in self._queue if (self.per_host is None or self._running_hosts[job.host] < self.per_host)
+                    and (job._session is None or not self._running_sessions[job._session])]
+        if not eligible:
+            return None
+        top = max(job.priority for job in eligible)
+        eligible = [job for job in eligible if job.priority == top]
+        submitter = min({job.submitter for job in eligible}, key=lambda name: (self._running_submitters[name], self._served.get(name, -1)))
+        return min((job for job in eligible if job.submitter == submitter), key=lambda job: job.sequence)
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                job = None
+                while job is None:
+                    if self._closed and not self._queue:
+                        return
+                    job = self._next()
+                    if job is None:
+                        self._condition.wait()
+                self._queue.remove(job)
+                job.state = DownloadJob.RUNNING
+                self._running_hosts[job.host] += 1
+                self._running_submitters[job.submitter] += 1
+                if job._session is not None:
+                    self._running_sessions[job._session] += 1
+                self._served[job.submitter] = next(self._turns)
+                self._save()
+
+            state, result, error = DownloadJob.DONE, None, None
+            try:
+                result = job._run()
+            except DownloadCancelledError:
+                state = DownloadJob.CANCELLED
+            except Exception as e:
+                state, error = DownloadJob.FAILED, e
+
+            with self._condition:
+                job.state, job.result, job.error = state, result, error
+                self._running_hosts[job.host] -= 1
+                self._running_submitters[job.submitter] -= 1
+                if job._session is not None:
+                    self._running_sessions[job._session] -= 1
+                    if not self._running_sessions[job._session]:
+                        del self._running_sessions[job._session]
+                self._retire(job)
+                self._save()
+                self._condition.notify_all()
+            if self._closed:
+                # The state thread may be gone; a job finishing after shutdown() is written at once
+                self._write()
+            self._finish(job)
+
+    def _retire(self, job: DownloadJob) -> None:
+        # Called with the condition held once the job has reached its final state
+        if self._jobs.get(job._key) is job:
+            del self._jobs[job._key]
+        self._finished[job.state] += 1
+
+    def _finish(self, job: DownloadJob) -> None:
+        with self._condition:
+            job._done.set()
+            callbacks, job._callbacks = job._callbacks, []
+        for callback in callbacks:
+            callback(job)
+
+    def _execute(self, job: DownloadJob) -> DownloadResult:
+        if job._cancel.is_set():
+            raise DownloadCancelledError()
+
+        options = dict(job.options)
+        bar = TqdmProgress() if options.pop('show_progress_bar', False) and not job._progress else None
+
+        def progress(update: DownloadProgress) -> None:
+            if job._cancel.is_set():
+                raise DownloadCancelledError()
+            job.downloaded, job.total = update.downloaded, update.total
+            for callback in [bar] + job._progress:
+                if callback is not None:
+                    callback(update)
+
+        try:
+            with ExitStack() as slots:
+                for limiter in list(job._limiters):
+                    slots.enter_context(limiter.slot())
+                return job._video.download(**options, show_progress_bar=False, progress=progress, return_result=True, store=job._store or self.store, stop=job._cancel)
+        finally:
+            if bar is not None:
+                bar.close()
+
+    def cancel(self, job: DownloadJob) -> bool:
+        """Cancel a job: a queued job is dropped, a running one stops after its current chunk.
+
+        Returns:
+            bool: False if the job had already finished.
+        """
+        with self._condition:
+            if job.finished:
+                return False
+            job._cancel.set()
+            dropped = job.state == DownloadJob.QUEUED
+            if dropped:
+                self._queue.remove(job)
+                job.state = DownloadJob.CANCELLED
+                self._retire(job)
+                self._save()
+                self._condition.notify_all()
+        if dropped:
+            self._finish(job)
+        return True
+
+    def withdraw(self, job: DownloadJob) -> bool:
+        """Withdraw one submission of a job, cancelling the job once no submission of it is left.
+
+        Use it instead of `cancel()` to give up a job that may have been shared with other
+        submitters through deduplication.
+
+        Returns:
+            bool: True if the job was cancelled, False if other submissions keep it or it had already finished.
+        """
+        with self._condition:
+            job._owners -= 1
+            if job._owners > 0:
+                return False
+        return self.cancel(job)
+
+    def jobs(self) -> List[DownloadJob]:
+        """Return the queued and running jobs."""
+        with self._condition:
+            return list(self._jobs.values())
+
+    def join(self, timeout: float = None) -> bool:
+        """Wait until no job is queued or running.
+
+        Returns:
+            bool: False if `timeout` expired first.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queue and not any(self._running_hosts.values()), timeout)
+
+    def shutdown(self, wait: bool = True, cancel: bool = False) -> None:
+        """Stop the workers once the queue is empty, or at once with `cancel`.
+
+        No job can be submitted afterwards. Without `cancel`, the queued jobs still run.
+
+        Args:
+            wait (bool, optional): Wait for the queue to be run and the workers to stop. Defaults to True.
+            cancel (bool, optional): Cancel every unfinished job instead of running the queue to the end.
+                Cancelled jobs are not kept in the persisted queue. Defaults to False.
+        """
+        if cancel:
+            for job in self.jobs():
+                self.cancel(job)
+        elif wait:
+            self.join()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._stopping.set()
+        self._changed.set()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+        self._write()
+
+    def stats(self) -> Dict[str, Union[int, Dict[str, int]]]:
+        """Return the number of jobs by state and the running downloads by host and submitter."""
+        with self._condition:
+            return {
+                'states': dict(Counter(job.state for job in self._jobs.values()) + self._finished),
+                'hosts': {host: count for host, count in self._running_hosts.items() if count},
+                'submitters': {name: count for name, count in self._running_submitters.items() if count},
+            }
@@ -0,0 +1,197 @@
+import threading
+import time
+import weakref
+import requests
+from contextlib import nullcontext
+from requests.cookies import RequestsCookieJar
+from requests.hooks import default_hooks
+from requests.utils import default_headers
+from urllib.parse import urlsplit
+from .deadlines import DeadlineExceededError, clamp_timeout
+from .quality import ThroughputHistory
+
+class LockingCookieJar(RequestsCookieJar):
+    """Cookie jar that can be shared by sessions running in different threads.
+
+    `http.cookiejar.CookieJar` already locks its mutating methods; this also makes
+    iteration (used by `get()`, `items()` and friends) work on a consistent snapshot.
+    """
+
+    def __iter__(self):
+        with self._cookies_lock:
+            return iter(list(super().__iter__()))
+
+    def __len__(self):
+        with self._cookies_lock:
+            return super().__len__()
+
+def endpoint_family(url: str) -> str:
+    """Group a request URL into an endpoint family.
+
+    API URLs are grouped by their module, controller and action
+    ('video/video/show'); any other request, such as those to the upload
+    host or to a download mirror, is grouped by host name.
+    """
+    parts = urlsplit(url)
+    path = parts.path.split('/')
+    if path[1:4] == ['api', 'fa', 'v1'] and len(path) >= 7:
+        return '/'.join(path[4:7])
+    return parts.netloc
+
+def endpoint_template(url: str) -> str:
+    """Return the URL path with its parameter values replaced by their names.
+
+    API paths end in name/value pairs, so
+    '/api/fa/v1/video/video/show/videohash/abc' becomes
+    '/api/fa/v1/video/video/show/videohash/{videohash}'. Other URLs are reduced
+    to their host name.
+    """
+    parts = urlsplit(url)
+    path = parts.path.split('/')
+    if path[1:4] == ['api', 'fa', 'v1'] and len(path) >= 7:
+        names = path[7::2]
+        return '/'.join(path[:7] + [part for name in names for part in (name, '{' + name + '}')])
+    return parts.netloc
+
+class AparatSession(requests.Session):
+    """`requests.Session` used by the Aparat client.
+
+    When a `ProxyPool` is attached, every request without explicit `proxies` is
+    sent through a proxy chosen by the pool, and its outcome is reported back.
+    When `CircuitBreakers` are attached, requests to an endpoint family whose
+    circuit is open fail immediately with `CircuitOpenError`. Inside a
+    `deadline()` block the request timeout is shrunk to the time left, and a
+    request that runs out of it raises `DeadlineExceededError`. When an
+    `Instrumentation` is attached, its hooks are called before and after every
+    request that is sent. The `BandwidthLimiter`, if any, is read by the
+    downloads and uploads made with the session, and `throughput` collects the
+    speed of finished downloads for automatic resolution selection.
+    """
+
+    def __init__(self, proxy_pool=None, circuit_breakers=None, instrumentation=None, bandwidth=None):
+        super().__init__()
+        self.proxy_pool = proxy_pool
+        self.circuit_breakers = circuit_breakers
+        self.instrumentation = instrumentation
+        self.bandwidth = bandwidth
+        self.throughput = ThroughputHistory()
+
+    def request(self, method, url, *args, **kwargs):
+        timeout = kwargs.get('timeout')
+        kwargs['timeout'] = clamp_timeout(timeout)
+        clamped = kwargs['timeout'] != timeout
+
+        family = endpoint_family(url)
+        breaker = self.circuit_breakers.get(family) if self.circuit_breakers is not None else None
+        if breaker is not None:
+            breaker.before_call()
+
+        # From here on the breaker slot and the proxy probe are released on every path, in the finally
+        proxy = event = response = error = None
+        ok = proxy_ok = None
+        start = time.monotonic()
+        try:
+            if self.proxy_pool is not None and not kwargs.get('proxies'):
+                proxy = self.proxy_pool.select()
+                kwargs['proxies'] = proxy.proxies
+
+            if self.instrumentation is not None:
+                event = self.instrumentation.before_request(method, url, family, endpoint_template(url))
+
+            start = time.monotonic()
+            response = super().request(method, url, *args, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+            if clamped and isinstance(e, requests.Timeout):
+                error = DeadlineExceededError()
+                raise error from e
+            ok = proxy_ok = False
+            raise
+        except Exception as e:
+            error = e
+            raise
+        else:
+            ok = response.status_code < 500
+            proxy_ok = ok and response.status_code != 407
+        finally:
+            latency = time.monotonic() - start
+            if event is not None:
+                self.instrumentation.after_request(event, response, error, latency)
+            if proxy is not None:
+                self.proxy_pool.record(proxy, latency, ok=proxy_ok)
+            if breaker is not None:
+                breaker.record(ok)
+        return response
+
+    def pin_proxy(self, proxy=None):
+        """Context manager sending every request of the calling thread through one proxy of the pool.
+
+        Pass the proxy yielded by another thread's `pin_proxy()` to share its pin.
+        """
+        return self.proxy_pool.pin(proxy) if self.proxy_pool is not None else nullcontext()
+
+class ThreadLocalSession(object):
+    """Session proxy that gives every thread its own `AparatSession`.
+
+    All per-thread sessions share one `LockingCookieJar`, and the same headers,
+    proxies, hooks and throughput history, so a login performed in one thread
+    is visible in all of them while connection pools are never used by two threads at once. Any other
+    attribute access is forwarded to the calling thread's session. A thread's
+    session is closed and dropped once the thread has exited and is collected.
+
+    Attributes:
+        cookies (LockingCookieJar): The cookie jar shared by all threads.
+        headers (dict): The default headers shared by all threads.
+        proxies (dict): The proxies shared by all threads.
+        hooks (dict): The event hooks shared by all threads.
+        throughput (ThroughputHistory): The download throughput history shared by all threads.
+    """
+
+    def __init__(self, factory=AparatSession):
+        """Initialize the proxy.
+
+        Args:
+            factory (Callable, optional): Creates the per-thread sessions. Defaults to `AparatSession`.
+        """
+        self._factory = factory
+        self._local = threading.local()
+        self._sessions = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+        self.cookies = LockingCookieJar()
+        self.headers = default_headers()
+        self.proxies = {}
+        self.hooks = default_hooks()
+        self.throughput = ThroughputHistory()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._factory()
+            session.cookies = self.cookies
+            session.headers = self.headers
+            session.proxies = self.proxies
+            session.hooks = self.hooks
+            session.throughput = self.throughput
+            self._local.session = session
+            thread = threading.current_thread()
+            with self._lock:
+                self._sessions[thread] = session
+            weakref.finalize(thread, session.close)
+        return session
+
+    def __getattr__(self, name):
+        return getattr(self._session(), name)
+
+    def close(self) -> None:
+        """Close the sessions of all threads."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
+
+def _thread_safe(session) -> bool:
+    """Whether `session` can be used by several threads at once, i.e. it was created with `thread_safe=True`."""
+    return isinstance(session, ThreadLocalSession)
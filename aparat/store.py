@@ -0,0 +1,324 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Union
+from .download import DownloadResult
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+FICLONE = 0x40049409  # Linux ioctl cloning a file on copy-on-write file systems (Btrfs, XFS)
+
+def _reflink(source: str, destination: str) -> bool:
+    """Clone `source` into a new file at `destination`, sharing its blocks. Return False if unsupported."""
+    if fcntl is None:
+        return False
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return True
+        except OSError:
+            pass
+    os.remove(destination)
+    return False
+
+class DownloadStore(object):
+    """Content-addressed store of downloaded videos, shared by all downloads that use it.
+
+    Files are keyed by video UID, resolution profile and file hash. A download
+    that is already in the store is served by a reflink (on copy-on-write file
+    systems), a hardlink, or, across file systems, a copy into the requested
+    path, instead of a network transfer. A JSON index in the store directory
+    records what is on disk; the least recently used files are evicted once the
+    store grows beyond `max_size` bytes, and files older than `max_age` seconds
+    are dropped.
+
+    Several processes can share one store: the index is re-read and merged under
+    a file lock before every write, so no process overwrites the entries of
+    another.
+
+    Hardlinked files share their data with the store, so they should be treated
+    as read-only. Downloading over one is safe: the download replaces the file
+    rather than rewriting it.
+
+    Example:
+        >>> store = DownloadStore('~/.cache/aparat', max_size=50 * 1024 ** 3)
+        >>> video.download('720p', path='videos/', store=store)
+
+    Attributes:
+        root (str): The store directory.
+        max_size (int): The size limit in bytes, or None.
+        max_age (float): The age limit in seconds, or None.
+    """
+
+    def __init__(self, root: str, max_size: int = None, max_age: float = None, link: str = 'auto'):
+        """Initialize the store, creating its directory if needed.
+
+        Args:
+            root (str): The store directory.
+            max_size (int, optional): The size limit in bytes. Defaults to no limit.
+            max_age (float, optional): The age limit in seconds. Defaults to no limit.
+            link (str, optional): How files are placed at the requested path: 'auto' (reflink, then hardlink,
+                then copy), 'hardlink', 'reflink' or 'copy'. Defaults to 'auto'.
+        """
+        if link not in ('auto', 'hardlink', 'reflink', 'copy'):
+            raise ValueError("'link' must be 'auto', 'hardlink', 'reflink' or 'copy'.")
+
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.max_size = max_size
+        self.max_age = max_age
+        self.link = link
+        self.index_path = os.path.join(self.root, 'index.json')
+        self.lock_path = os.path.join(self.root, 'index.lock')
+        os.makedirs(os.path.join(self.root, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(self.root, 'tmp'), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, list] = {}
+        self._index: Dict[str, dict] = self._load()
+
+    @staticmethod
+    def key(uid: str, profile: str, file_hash: str = None) -> str:
+        """Return the store key of a video file."""
+        return hashlib.sha1(f'{uid}:{profile}:{file_hash or ""}'.encode('utf-8')).hexdigest()
+
+    def _object_path(self, key: str) -> str:
+        return os.path.join(self.root, 'objects', key[:2], key)
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load(self) -> Dict[str, dict]:
+        return {key: entry for key, entry in self._read().items() if os.path.isfile(self._object_path(key))}
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Hold the lock shared by all processes writing the index."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _save(self) -> None:
+        """Merge the index on disk into this process's index and write the result. Call with `_lock` held."""
+        with self._file_lock():
+            saved = self._read()
+            for key in [key for key in self._index if key not in saved]:
+                # Either added here since the last write, or removed by another process
+                if not os.path.isfile(self._object_path(key)):
+                    del self._index[key]
+            for key, entry in saved.items():
+                mine = self._index.get(key)
+                if mine is None:
+                    # Added by another process, or removed here (then its file is gone)
+                    if os.path.isfile(self._object_path(key)):
+                        self._index[key] = entry
+                elif entry['used_at'] > mine['used_at']:
+                    mine['used_at'] = entry['used_at']
+
+            temp_path = f'{self.index_path}.{os.getpid()}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._index, f, separators=(',', ':'))
+            os.replace(temp_path, self.index_path)
+
+    @contextmanager
+    def _key_lock(self, key: str) -> Iterator[None]:
+        """Hold the lock of one key; keys in use are not evicted, and unused locks are dropped."""
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.RLock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    @property
+    def size(self) -> int:
+        """The total size of the stored files in bytes."""
+        with self._lock:
+            return sum(entry['size'] for entry in self._index.values())
+
+    def entries(self) -> List[dict]:
+        """Return a copy of the index entries."""
+        with self._lock:
+            return [dict(entry, key=key) for key, entry in self._index.items()]
+
+    def _place(self, source: str, destination: str) -> None:
+        """Put the stored file `source` at `destination`."""
+        directory = os.path.dirname(os.path.abspath(destination))
+        os.makedirs(directory, exist_ok=True)
+        if os.path.lexists(destination):
+            if os.path.exists(destination) and os.path.samefile(source, destination):
+                return
+            os.remove(destination)
+
+        if self.link in ('auto', 'reflink') and _reflink(source, destination):
+            return
+        if self.link == 'reflink':
+            raise OSError("The file system does not support reflinks.")
+        if self.link in ('auto', 'hardlink'):
+            try:
+                os.link(source, destination)
+                return
+            except OSError:
+                if self.link == 'hardlink':
+                    raise
+        shutil.copyfile(source, destination)
+
+    def get(self, uid: str, profile: str, destination: str, file_hash: str = None) -> Union[DownloadResult, None]:
+        """Place a stored file at `destination`.
+
+        Returns:
+            DownloadResult: The result with `cached=True`, or None if the file is not in the store.
+        """
+        key = self.key(uid, profile, file_hash)
+        start = time.monotonic()
+        with self._key_lock(key):
+            with self._lock:
+                entry = self._index.get(key)
+                if entry is None:
+                    return None
+                entry['used_at'] = time.time()
+            source = self._object_path(key)
+            try:
+                self._place(source, destination)
+            except FileNotFoundError:
+                with self._lock:
+                    self._index.pop(key, None)
+                    self._save()
+                return None
+        return DownloadResult(destination, None, 0, entry['size'], time.monotonic() - start, 0.0, 0.0, 0, 0, entry.get('digest'), entry.get('verified', False), cached=True)
+
+    def add(self, uid: str, profile: str, path: str, file_hash: str = None, digest: str = None, verified: bool = False) -> str:
+        """Move the file at `path` into the store.
+
+        Returns:
+            str: The store key.
+        """
+        key = self.key(uid, profile, file_hash)
+        target = self._object_path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+        with self._lock:
+            now = time.time()
+            self._index[key] = {
+                'uid': uid,
+                'profile': profile,
+                'file_hash': file_hash,
+                'size': os.path.getsize(target),
+                'digest': digest,
+                'verified': verified,
+                'added_at': now,
+                'used_at': now,
+            }
+            self._save()
+        self.evict(keep=key)
+        return key
+
+    def fetch(self, uid: str, profile: str, destination: str, download: Callable[[str], DownloadResult], file_hash: str = None) -> DownloadResult:
+        """Place a video file at `destination`, downloading it into the store first if it is missing.
+
+        Concurrent requests for the same file wait for a single download.
+
+        Args:
+            uid (str): The video UID.
+            profile (str): The resolution profile, e.g. '720p'.
+            destination (str): The requested path.
+            download (Callable): Downloads the file to the path it is given and returns its `DownloadResult`.
+            file_hash (str, optional): The video file hash, if known.
+
+        Returns:
+            DownloadResult: The download result, with `cached=True` if no transfer was needed.
+        """
+        key = self.key(uid, profile, file_hash)
+        with self._key_lock(key):
+            result = self.get(uid, profile, destination, file_hash)
+            if result is not None:
+                return result
+
+            temp_path = os.path.join(self.root, 'tmp', f'{key}.{os.getpid()}.{threading.get_ident()}')
+            try:
+                result = download(temp_path)
+                self.add(uid, profile, temp_path, file_hash, result.digest, result.verified)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+            # Still under the key lock, so a concurrent eviction cannot remove the file first
+            self._place(self._object_path(key), destination)
+        result.path = destination
+        return result
+
+    def evict(self, keep: str = None) -> List[str]:
+        """Remove files older than `max_age`, then the least recently used ones until the store fits in `max_size`.
+
+        Files being placed or downloaded by this store are skipped.
+
+        Args:
+            keep (str, optional): A key that must not be evicted.
+
+        Returns:
+            List[str]: The evicted keys.
+        """
+        with self._lock:
+            evicted = []
+            busy = set(self._key_locks)
+            if keep is not None:
+                busy.add(keep)
+            if self.max_age is not None:
+                cutoff = time.time() - self.max_age
+                evicted += [key for key, entry in self._index.items() if entry['added_at'] < cutoff and key not in busy]
+            if self.max_size is not None:
+                size = sum(entry['size'] for key, entry in self._index.items() if key not in evicted)
+                for key, entry in sorted(self._index.items(), key=lambda item: item[1]['used_at']):
+                    if size <= self.max_size:
+                        break
+                    if key not in evicted and key not in busy:
+                        evicted.append(key)
+                        size -= entry['size']
+
+            for key in evicted:
+                del self._index[key]
+                try:
+                    os.remove(self._object_path(key))
+                except FileNotFoundError:
+                    pass
+            if evicted:
+                self._save()
+            return evicted
+
+    def clear(self) -> None:
+        """Remove every stored file."""
+        with self._lock:
+            for key in list(self._index):
+                try:
+                    os.remove(self._object_path(key))
+                except FileNotFoundError:
+                    pass
+            self._index.clear()
+            self._save()
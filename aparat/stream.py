@@ -0,0 +1,225 @@
+import io
+import time
+from typing import Iterator, List, Tuple, Union
+import requests
+from .deadlines import DeadlineExceededError, check_deadline
+from .download import _RETRYABLE, _body_reader, _resumes_at
+from .throttle import BandwidthLimiter
+
+class VideoStream(io.RawIOBase):
+    """Read-only, seekable file-like object over a video file on the CDN.
+
+    Data is fetched on demand with HTTP Range requests, so memory use is bounded
+    by the reads of the consumer and nothing touches the disk. Like
+    `Video.download`, a failed request moves on to the next mirror and resumes
+    at the current position. Seeking closes the current response; the next read
+    continues from the new position. Iterating yields chunks of `chunk_size` bytes.
+
+    Wrap it in `io.BufferedReader` for small reads.
+
+    Example:
+        >>> with video.stream('720p') as stream:
+        ...     for chunk in stream:
+        ...         transcoder.stdin.write(chunk)
+
+    Attributes:
+        urls (List[str]): The mirror URLs.
+        start (int): The first byte of the streamed range.
+        end (int): The end of the streamed range (exclusive), or None for the end of the file.
+        retries (int): The number of failed requests so far.
+        timeout (Union[float, Tuple[float, float]]): The connect and read timeouts of each request.
+    """
+
+    def __init__(self, session, urls: List[str], start: int = 0, end: int = None, retries: int = 3, backoff: float = 0.5, chunk_size: int = 1024 * 1024, bandwidth: BandwidthLimiter = None, timeout: Union[float, Tuple[float, float]] = (10, 30)):
+        """Initialize the stream. No request is made until the first read.
+
+        Args:
+            session (requests.Session): The session to stream with.
+            urls (List[str]): The mirror URLs of the file, in order of preference.
+            start (int, optional): The first byte to stream. Defaults to 0.
+            end (int, optional): The byte to stop before. Defaults to the end of the file.
+            retries (int, optional): The number of failed requests tolerated before giving up. Defaults to 3.
+            backoff (float, optional): The delay before the first retry in seconds, doubled on every retry. Defaults to 0.5.
+            chunk_size (int, optional): The size of the chunks yielded when iterating. Defaults to 1 MB.
+            bandwidth (BandwidthLimiter, optional): The byte-rate budget to read within.
+            timeout (Union[float, Tuple[float, float]], optional): The connect and read timeouts of each request in
+                seconds. A mirror that sends nothing for the read timeout counts as a failed request. Defaults to (10, 30).
+        """
+        super().__init__()
+        self.session = session
+        self.urls = list(urls)
+        self.start = start
+        self.end = end
+        self.max_retries = retries
+        self.backoff = backoff
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retries = 0
+        self._transfer = bandwidth.transfer() if bandwidth is not None else None
+        self._position = start
+        self._size = None
+        self._response = None
+        self._read = None
+
+    @property
+    def size(self) -> int:
+        """The size of the whole file in bytes. Makes a request if nothing has been read yet."""
+        if self._size is None:
+            self._open()
+        return self._size
+
+    @property
+    def url(self) -> str:
+        """The mirror currently in use."""
+        return self.urls[self.retries % len(self.urls)]
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = (self.end if self.end is not None else self.size) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position.")
+        if position != self._position:
+            self._close_response()
+            self._position = position
+        return position
+
+    def _limit(self) -> int:
+        """The position to stop reading at, or None if unknown."""
+        if self.end is not None:
+            return self.end if self._size is None else min(self.end, self._size)
+        return self._size
+
+    def _open(self) -> None:
+        """Request the data from the current position, moving to the next mirror on failures."""
+        while True:
+            check_deadline()
+            headers = {}
+            if self._position or self.end is not None:
+                headers['Range'] = f'bytes={self._position}-' + (str(self.end - 1) if self.end is not None else '')
+            try:
+                response = self.session.get(self.url, stream=True, headers=headers, timeout=self.timeout)
+                try:
+                    if response.status_code == 416:
+                        self._size = self._size if self._size is not None else self._position
+                        response.close()
+                        self._response, self._read = None, None
+                        return
+                    response.raise_for_status()
+                    self._size = self._parse_size(response)
+                    if self._position and not _resumes_at(response, self._position):
+                        self._skip(response, self._position)
+                except BaseException:
+                    response.close()
+                    raise
+                self._response, self._read = response, _body_reader(response)
+                return
+            except DeadlineExceededError:
+                raise
+            except _RETRYABLE as error:
+                self._failed(error)
+
+    def _parse_size(self, response) -> int:
+        content_range = response.headers.get('Content-Range', '')
+        if response.status_code == 206 and '/' in content_range and not content_range.endswith('*'):
+            return int(content_range.rsplit('/', 1)[1])
+        if response.status_code == 200 and response.headers.get('Content-Length'):
+            return int(response.headers['Content-Length'])
+        return self._size
+
+    def _skip(self, response, count: int) -> None:
+        """Discard the first `count` bytes of a response that ignored the Range header."""
+        read = _body_reader(response)
+        buffer = memoryview(bytearray(min(count, self.chunk_size)))
+        while count:
+            size = read(buffer[:min(count, len(buffer))])
+            if not size:
+                raise requests.ConnectionError("The response ended before the requested position.")
+            count -= size
+
+    def _failed(self, error: Exception) -> None:
+        """Drop the current response and wait before the next attempt, or raise `error` once out of retries."""
+        self._close_response()
+        self.retries += 1
+        if self.retries > self.max_retries:
+            raise error
+        check_deadline()
+        time.sleep(self.backoff * 2 ** (self.retries - 1))
+
+    def _close_response(self) -> None:
+        if self._response is not None:
+            self._response.close()
+        self._response, self._read = None, None
+
+    def readinto(self, buffer) -> int:
+        """Read up to `len(buffer)` bytes at the current position into `buffer`.
+
+        Returns:
+            int: The number of bytes read, 0 at the end of the stream.
+        """
+        if self.closed:
+            raise ValueError("I/O operation on closed stream.")
+        view = memoryview(buffer).cast('B')
+        limit = self._limit()
+        if limit is not None:
+            if self._position >= limit:
+                return 0
+            view = view[:limit - self._position]
+        if not len(view):
+            return 0
+
+        while True:
+            check_deadline()
+            if self._response is None:
+                self._open()
+                limit = self._limit()
+                if self._response is None or (limit is not None and self._position >= limit):
+                    return 0
+                view = view[:limit - self._position] if limit is not None else view
+            try:
+                size = self._read(view)
+            except DeadlineExceededError:
+                raise
+            except _RETRYABLE as error:
+                self._failed(error)
+                continue
+            if not size:
+                limit = self._limit()
+                if limit is not None and self._position < limit:
+                    # The response ended early; continue from the next mirror
+                    self._failed(requests.ConnectionError("The response ended before the end of the range."))
+                    continue
+                return 0
+            if self._transfer is not None:
+                self._transfer.consume(size)
+            self._position += size
+            return size
+
+    def iter_chunks(self, chunk_size: int = None) -> Iterator[bytes]:
+        """Yield the rest of the stream in chunks of up to `chunk_size` bytes."""
+        while True:
+            chunk = self.read(chunk_size or self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.iter_chunks()
+
+    def close(self) -> None:
+        self._close_response()
+        super().close()
@@ -0,0 +1,232 @@
+import io
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Union
+from .deadlines import DeadlineExceededError, remaining
+
+class RateLimiter(object):
+    """Thread-safe token bucket.
+
+    Tokens are refilled continuously at `rate` per second up to `burst`.
+    A single limiter can be shared by any number of threads.
+
+    Attributes:
+        rate (float): The number of tokens added per second.
+        burst (float): The maximum number of tokens that can accumulate.
+    """
+
+    def __init__(self, rate: float, burst: float = None):
+        """Initialize the limiter.
+
+        Args:
+            rate (float): The number of tokens added per second.
+            burst (float, optional): The bucket capacity. Defaults to `rate` (one second worth of tokens).
+        """
+        if rate <= 0:
+            raise ValueError("'rate' must be greater than zero.")
+
+        self.rate = float(rate)
+        self.burst = float(burst) if burst else max(self.rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take `tokens` from the bucket without blocking.
+
+        Returns:
+            bool: True if the tokens were available, False otherwise.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1, timeout: float = None) -> bool:
+        """Block until `tokens` are available and take them.
+
+        Requests larger than `burst` are allowed; they drive the bucket negative
+        and delay the following callers accordingly.
+
+        Args:
+            tokens (float, optional): The number of tokens to take. Defaults to 1.
+            timeout (float, optional): The maximum time to wait in seconds. Defaults to waiting forever.
+
+        Returns:
+            bool: True if the tokens were taken, False if `timeout` expired first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        needed = min(tokens, self.burst)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= needed:
+                    self._tokens -= tokens
+                    return True
+                wait = (needed - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+class BandwidthLimiter(object):
+    """Byte-rate budget shared by concurrent downloads and uploads.
+
+    Every transfer draws from one process-wide token bucket of `rate` bytes per
+    second and, if `per_transfer` is set, from its own bucket as well, so the
+    aggregate throughput of all transfers sharing the limiter stays predictable.
+
+    Example:
+        >>> bandwidth = BandwidthLimiter(rate=10 * 1024 * 1024, per_transfer=2 * 1024 * 1024)
+        >>> aparat = Aparat(bandwidth=bandwidth)
+        >>> aparat.get_playlist(123456).download('720p')
+
+    Attributes:
+        rate (float): The shared limit in bytes per second, or None.
+        per_transfer (float): The limit of each transfer in bytes per second, or None.
+    """
+
+    def __init__(self, rate: float = None, per_transfer: float = None, burst: float = None):
+        """Initialize the limiter.
+
+        Args:
+            rate (float, optional): The shared limit in bytes per second. Defaults to no shared limit.
+            per_transfer (float, optional): The limit of each transfer in bytes per second. Defaults to no per-transfer limit.
+            burst (float, optional): The shared bucket capacity in bytes. Defaults to one second worth of bytes.
+        """
+        if not rate and not per_transfer:
+            raise ValueError("Either 'rate' or 'per_transfer' must be specified.")
+
+        self.rate = rate
+        self.per_transfer = per_transfer
+        self._bucket = RateLimiter(rate, burst) if rate else None
+
+    @property
+    def chunk_size(self) -> int:
+        """A read size that keeps transfers smooth: about a tenth of a second of the tightest limit."""
+        limit = min(rate for rate in (self.rate, self.per_transfer) if rate)
+        return max(16 * 1024, int(limit / 10))
+
+    def transfer(self) -> 'Transfer':
+        """Start a transfer that draws from the shared budget."""
+        return Transfer(self)
+
+class Transfer(object):
+    """One download or upload drawing from a `BandwidthLimiter`."""
+
+    def __init__(self, limiter: BandwidthLimiter):
+        self.limiter = limiter
+        self._bucket = RateLimiter(limiter.per_transfer) if limiter.per_transfer else None
+
+    def consume(self, size: int) -> None:
+        """Block until `size` bytes fit in the budget.
+
+        Raises:
+            DeadlineExceededError: If the caller's deadline passes while waiting.
+        """
+        for bucket in (self._bucket, self.limiter._bucket):
+            if bucket is not None and not bucket.acquire(size, remaining()):
+                raise DeadlineExceededError()
+
+    def wrap(self, data: Union[bytes, io.RawIOBase]) -> '_ThrottledReader':
+        """Wrap a request body so that sending it is paced by the budget."""
+        return _ThrottledReader(io.BytesIO(data) if isinstance(data, bytes) else data, self)
+
+    def multipart(self, fields: Dict[str, tuple]) -> 'MultipartBody':
+        """Return a streaming multipart/form-data body for `fields`, paced by the budget."""
+        return MultipartBody(fields, self)
+
+class _ThrottledReader(object):
+    """File-like request body that takes tokens for every block read by the HTTP client."""
+
+    def __init__(self, stream, transfer: Transfer):
+        self.stream = stream
+        self.transfer = transfer
+        position = stream.tell()
+        self.len = stream.seek(0, io.SEEK_END) - position
+        stream.seek(position)
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to `size` bytes, at most one chunk at a time, or the rest of the body if `size` is negative."""
+        if size is None or size < 0:
+            return b''.join(iter(lambda: self.read(self.transfer.limiter.chunk_size), b''))
+        data = self.stream.read(min(size, self.transfer.limiter.chunk_size))
+        if data:
+            self.transfer.consume(len(data))
+        return data
+
+    def tell(self) -> int:
+        return self.stream.tell()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self.stream.seek(offset, whence)
+
+class MultipartBody(object):
+    """Streaming multipart/form-data request body.
+
+    Takes the same `fields` as the `files` argument of `requests`, as
+    `(filename, content)` or `(filename, content, content_type)` tuples, but reads
+    file contents block by block while the request is sent instead of building
+    the whole body in memory. Every block read is charged to `transfer`, if given.
+
+    Attributes:
+        content_type (str): The Content-Type header of the body, with its boundary.
+        len (int): The size of the body in bytes.
+    """
+
+    def __init__(self, fields: Dict[str, tuple], transfer: Transfer = None, chunk_size: int = 64 * 1024):
+        self.transfer = transfer
+        self.chunk_size = min(chunk_size, transfer.limiter.chunk_size) if transfer is not None else chunk_size
+        boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+
+        self._parts = []
+        for name, value in fields.items():
+            filename, content = value[0], value[1]
+            content_type = value[2] if len(value) > 2 else None
+            header = f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"'
+            if filename:
+                header += '; filename="{}"'.format(str(filename).replace('"', '%22'))
+            if content_type:
+                header += f'\r\nContent-Type: {content_type}'
+            self._parts.append(io.BytesIO(f'{header}\r\n\r\n'.encode()))
+            if hasattr(content, 'read'):
+                self._parts.append(content)
+            else:
+                self._parts.append(io.BytesIO(content if isinstance(content, bytes) else str(content).encode()))
+            self._parts.append(io.BytesIO(b'\r\n'))
+        self._parts.append(io.BytesIO(f'--{boundary}--\r\n'.encode()))
+
+        self.len = sum(self._size(part) for part in self._parts)
+        self._index = 0
+
+    @staticmethod
+    def _size(part) -> int:
+        if isinstance(part, io.BytesIO):
+            return len(part.getbuffer()) - part.tell()
+        return os.fstat(part.fileno()).st_size - part.tell()
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to `size` bytes, at most one chunk at a time, or the rest of the body if `size` is negative."""
+        if size is None or size < 0:
+            return b''.join(iter(lambda: self.read(self.chunk_size), b''))
+        size = min(size, self.chunk_size)
+        while self._index < len(self._parts):
+            data = self._parts[self._index].read(size)
+            if data:
+                if self.transfer is not None:
+                    self.transfer.consume(len(data))
+                return data
+            self._index += 1
+        return b''
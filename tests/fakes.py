@@ -0,0 +1,115 @@
+"""A fake CDN serving real `Video` objects, shared by the scheduler, farm and CLI tests."""
+import io
+import socket
+import threading
+import time
+import requests
+from requests.adapters import BaseAdapter
+from aparat.aparat import Video
+from aparat.session import ThreadLocalSession
+
+class Body(io.RawIOBase):
+    """A response body of `size` bytes.
+
+    While `release` is unset, the body trickles out one byte every 10 ms, so a
+    download keeps reporting progress without finishing. With `stall=(offset,
+    seconds)`, the body stops for `seconds` once `offset` bytes have been read,
+    or times out like a socket after the read `timeout` if that is shorter.
+    """
+
+    def __init__(self, size, offset=0, release=None, stall=None, timeout=None):
+        super().__init__()
+        self.size = size
+        self.offset = offset
+        self.release = release
+        self.stall = stall
+        self.timeout = timeout
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.offset >= self.size:
+            return 0
+        count = min(len(buffer), self.size - self.offset)
+        if self.release is not None and not self.release.wait(0.01):
+            count = 1
+        if self.stall and self.offset < self.stall[0]:
+            count = min(count, self.stall[0] - self.offset)
+        elif self.stall and self.offset == self.stall[0]:
+            if self.timeout is not None and self.timeout < self.stall[1]:
+                time.sleep(self.timeout)
+                raise socket.timeout('timed out')
+            time.sleep(self.stall[1])
+        buffer[:count] = b'x' * count
+        self.offset += count
+        return count
+
+class FakeCDN(BaseAdapter):
+    """Serve the files of the videos created with `add()`, honouring Range requests.
+
+    The UIDs of the downloads started, in order, are kept in `started`. The
+    files of failing videos refuse the connection with a `ConnectionError`
+    that is not retried. The videos share one session, which is thread-safe
+    unless `thread_safe` is False.
+    """
+
+    def __init__(self, thread_safe=True):
+        super().__init__()
+        self.session = ThreadLocalSession(self._mounted) if thread_safe else self._mounted()
+        self.videos = {}
+        self.files = {}
+        self.started = []
+
+    def add(self, uid, host='cdn1', size=10, release=None, stall=None, fail=False):
+        """Create a `Video` with one 720p file on `host` and return it."""
+        url = f'https://{host}/{uid}.mp4'
+        self.files[url] = (uid, size, release, stall, fail)
+        data = {'data': {'attributes': {'uid': uid, 'file_link_all': [{'profile': '720p', 'urls': [url]}]}}, 'included': []}
+        self.videos[uid] = Video(data, False, self.session)
+        return self.videos[uid]
+
+    def _mounted(self):
+        session = requests.Session()
+        session.mount('https://', self)
+        return session
+
+    def send(self, request, **kwargs):
+        uid, size, release, stall, fail = self.files[request.url]
+        if fail:
+            raise ConnectionError('mirror down')
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = 200
+        start, end = 0, size - 1
+        if 'Range' in request.headers:
+            first, last = request.headers['Range'][len('bytes='):].split('-')
+            start, end = int(first), int(last) if last else size - 1
+            response.status_code = 206
+            response.headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        else:
+            self.started.append(uid)
+        response.headers['Content-Length'] = str(end + 1 - start)
+        timeout = kwargs.get('timeout')
+        response.raw = Body(end + 1, start, release, stall, timeout[1] if isinstance(timeout, tuple) else timeout)
+        return response
+
+    def close(self):
+        pass
+
+class FakeClient(object):
+    """Client stand-in looking videos and playlists up in a `FakeCDN`."""
+
+    def __init__(self, cdn, playlists=None):
+        self.cdn = cdn
+        self.playlists = playlists or {}
+
+    def get_video(self, uid):
+        return self.cdn.videos[uid]
+
+    def get_videos(self, uids):
+        return [self.cdn.videos[uid] for uid in uids if uid in self.cdn.videos]
+
+    def get_playlist(self, playlist_id):
+        return self.playlists[playlist_id]
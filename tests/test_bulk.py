@@ -0,0 +1,108 @@
+import io
+import json
+import threading
+import unittest
+import requests
+from requests.adapters import BaseAdapter
+from aparat.aparat import Comment, UnexpectedResponseError
+from aparat import Aparat, BulkExecutor, ModerationAction, ModerationPipeline
+
+class DashboardAdapter(BaseAdapter):
+    """Serve the given dashboard comment pages in turn."""
+
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = list(pages)
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = 200
+        response.raw = io.BytesIO(json.dumps(self.pages.pop(0)).encode())
+        return response
+
+    def close(self):
+        pass
+
+def dashboard_page(comments, more=None):
+    return {
+        'data': [{'type': 'Comment', 'id': str(id), 'attributes': {'id': id, 'body': 'hi'},
+                  'relationships': {'video': {'data': {'type': 'Video', 'id': str(video)}}}} for id, video in comments],
+        'included': [{'type': 'Video', 'id': str(video), 'attributes': {'uid': f'uid{video}'}} for _, video in comments],
+        'links': {'more': more},
+    }
+
+class FakeResponse(object):
+    status_code = 200
+
+class FakeSession(object):
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, timeout=None):
+        self.calls.append(url)
+        return FakeResponse()
+
+class TestBulkExecutor(unittest.TestCase):
+    def test_skips_noops_and_runs_the_rest(self):
+        session = FakeSession()
+        liked = Comment({'id': 1, 'like': {'status': 'like', 'link': 'liked'}}, 'v', True, session)
+        pending = Comment({'id': 2, 'like': {'status': 'unlike', 'link': 'pending'}}, 'v', True, session)
+
+        results = list(BulkExecutor(max_workers=2, rate=100).run([(liked, 'like'), (pending, 'like')]))
+        statuses = {result.target.id: result.status for result in results}
+
+        self.assertEqual(statuses, {1: 'skipped', 2: 'done'})
+        self.assertEqual(session.calls, ['pending'])
+        self.assertEqual(pending.data['like']['status'], 'like')
+
+    def test_plain_sessions_stay_on_the_calling_thread(self):
+        threads = []
+
+        class RecordingSession(FakeSession):
+            def get(self, url, timeout=None):
+                threads.append(threading.current_thread())
+                return super().get(url, timeout)
+
+        session = RecordingSession()
+        comments = [Comment({'id': i, 'like': {'status': 'unlike', 'link': str(i)}}, 'v', True, session) for i in range(8)]
+        results = list(BulkExecutor(max_workers=4).run((comment, 'like') for comment in comments))
+        self.assertEqual([result.status for result in results], ['done'] * 8)
+        self.assertEqual(set(threads), {threading.current_thread()})
+
+class TestModerationPipeline(unittest.TestCase):
+    def test_classifier_decisions_become_actions(self):
+        session = FakeSession()
+        comments = [
+            Comment({'id': i, 'approve_link_href': f'/approve/{i}', 'delete_url': f'/delete/{i}'}, 'v', True, session)
+            for i in range(5)
+        ]
+
+        def classifier(batch):
+            return [ModerationAction.APPROVE if c.id % 2 else None for c in batch]
+
+        results = list(ModerationPipeline(None, classifier, batch_size=2).run(comments))
+
+        self.assertEqual(sorted(result.target.id for result in results), [1, 3])
+        self.assertTrue(all(result.action == 'approve' and result.ok for result in results))
+
+class TestDashboardComments(unittest.TestCase):
+    def client(self, pages):
+        aparat = Aparat()
+        aparat.is_logged_in = True
+        aparat.session.mount('https://', DashboardAdapter(pages))
+        return aparat
+
+    def test_comments_are_tied_to_their_videos(self):
+        aparat = self.client([dashboard_page([(1, 10), (2, 20)], more='https://www.aparat.com/next'), dashboard_page([(3, 10)])])
+        self.assertEqual([(comment.id, comment.uid) for comment in aparat.iter_dashboard_comments()], [(1, 'uid10'), (2, 'uid20'), (3, 'uid10')])
+
+    def test_missing_video_uid_raises(self):
+        page = dashboard_page([(1, 10)])
+        page['included'] = []
+        with self.assertRaises(UnexpectedResponseError):
+            list(self.client([page]).iter_dashboard_comments())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import time
+import unittest
+from aparat import CircuitBreaker, CircuitBreakers, CircuitOpenError, Instrumentation
+from aparat.session import AparatSession, endpoint_family
+
+class FailingInstrumentation(Instrumentation):
+    def before_request(self, *args):
+        raise RuntimeError('hook failed')
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_on_failure_rate(self):
+        breaker = CircuitBreaker('video/video/show', failure_rate=0.5, window=4, min_calls=4)
+        for ok in (True, False, False, False):
+            breaker.before_call()
+            breaker.record(ok)
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError) as context:
+            breaker.before_call()
+        self.assertEqual(context.exception.family, 'video/video/show')
+
+    def test_half_open_probe_closes(self):
+        breaker = CircuitBreaker('upload', window=1, min_calls=1, reset_timeout=0.01)
+        breaker.before_call()
+        breaker.record(False)
+        time.sleep(0.02)
+
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record(True)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_slot_is_released_when_a_hook_raises(self):
+        breakers = CircuitBreakers(window=1, min_calls=1, reset_timeout=0.01, half_open_calls=1)
+        breaker = breakers.get('video/video/show')
+        breaker.before_call()
+        breaker.record(False)
+        time.sleep(0.02)
+
+        session = AparatSession(circuit_breakers=breakers, instrumentation=FailingInstrumentation())
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                session.get('https://www.aparat.com/api/fa/v1/video/video/show/videohash/x')
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+
+    def test_registry_and_families(self):
+        breakers = CircuitBreakers(window=1, min_calls=1)
+        breakers.get('uc3.aparat.com').record(False)
+
+        self.assertTrue(breakers.is_open('uc3.aparat.com'))
+        self.assertFalse(breakers.is_open('video/video/show'))
+        self.assertEqual(endpoint_family('https://www.aparat.com/api/fa/v1/video/video/show/videohash/x?pr=1'), 'video/video/show')
+        self.assertEqual(endpoint_family('https://uc3.aparat.com/upload'), 'uc3.aparat.com')
+
+if __name__ == '__main__':
+    unittest.main()
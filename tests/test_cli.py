@@ -0,0 +1,103 @@
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from aparat import DownloadScheduler
+from aparat.cli import finished_uids, parse_target, read_inputs, run_batch
+from .fakes import FakeCDN, FakeClient
+
+class FakePlaylist(object):
+    def __init__(self, videos):
+        self.videos = videos
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.cdn = FakeCDN()
+        self.directory = tempfile.TemporaryDirectory()
+        self.out = os.path.join(self.directory.name, 'out') + os.sep
+        os.mkdir(self.out)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_parse_target(self):
+        self.assertEqual(parse_target('https://www.aparat.com/v/m98gm8j'), ('video', 'm98gm8j'))
+        self.assertEqual(parse_target('https://www.aparat.com/playlist?playlist=123'), ('playlist', '123'))
+        self.assertEqual(parse_target('123'), ('playlist', '123'))
+        self.assertEqual(parse_target('m98gm8j'), ('video', 'm98gm8j'))
+
+    def test_run_batch_and_resume(self):
+        for uid in ('good', 'have'):
+            self.cdn.add(uid, size=100)
+        self.cdn.add('bad', fail=True)
+        client = FakeClient(self.cdn, {'7': FakePlaylist([self.cdn.add('p1'), self.cdn.add('p2')])})
+        with open(self.out + 'have.mp4', 'wb') as f:
+            f.write(b'x' * 100)
+        input_path = os.path.join(self.directory.name, 'inputs.txt')
+        with open(input_path, 'w') as f:
+            f.write('# nightly\ngood\n\nhave\nbad\nmissing\nhttps://www.aparat.com/playlist?playlist=7\n')
+        report_path = os.path.join(self.directory.name, 'report.jsonl')
+
+        scheduler = DownloadScheduler(max_workers=2)
+        with open(report_path, 'w') as report:
+            failures = run_batch(client, scheduler, read_inputs(input_path), '720p', self.out, report, skip_existing=True, chunk_size=2)
+        scheduler.shutdown()
+        self.assertEqual(failures, 2)
+
+        with open(report_path) as f:
+            records = {record['uid']: record for record in map(json.loads, f)}
+        self.assertEqual({uid: record['status'] for uid, record in records.items()},
+                         {'good': 'ok', 'have': 'skipped', 'bad': 'failed', 'missing': 'failed', 'p1': 'ok', 'p2': 'ok'})
+        self.assertEqual((records['good']['bytes'], records['good']['path']), (100, self.out + 'good.mp4'))
+        self.assertEqual((records['have']['bytes'], records['have']['size']), (0, 100))
+        self.assertEqual(records['p1']['path'], self.out + 'p1.mp4')
+        self.assertEqual(records['bad']['error'], 'ConnectionError: mirror down')
+        self.assertEqual(self.cdn.started.count('have'), 0)
+
+        done = finished_uids(report_path)
+        self.assertEqual(done, {'good', 'have', 'p1', 'p2'})
+        report = io.StringIO()
+        scheduler = DownloadScheduler(max_workers=2)
+        run_batch(client, scheduler, read_inputs(input_path), '720p', self.out, report, done=done)
+        scheduler.shutdown()
+        self.assertEqual(sorted(json.loads(line)['uid'] for line in report.getvalue().splitlines()), ['bad', 'missing'])
+
+    def test_reports_as_jobs_finish(self):
+        gate = threading.Event()
+        self.cdn.add('slow', release=gate)
+        self.cdn.add('fast')
+        client = FakeClient(self.cdn)
+
+        class Report(io.StringIO):
+            def write(self, text):
+                if '"fast"' in text:
+                    gate.set()  # the slow download only ends once the fast one is reported
+                return super().write(text)
+
+        report = Report()
+        scheduler = DownloadScheduler(max_workers=2)
+        self.assertEqual(run_batch(client, scheduler, ['slow', 'fast'], '720p', self.out, report, chunk_size=1), 0)
+        scheduler.shutdown()
+        self.assertEqual([json.loads(line)['uid'] for line in report.getvalue().splitlines()], ['fast', 'slow'])
+
+    def test_reports_restored_jobs(self):
+        self.cdn.add('left')
+        self.cdn.add('new')
+        client = FakeClient(self.cdn)
+        state_path = os.path.join(self.directory.name, 'queue.json')
+        with open(state_path, 'w') as f:
+            json.dump({'jobs': [{'id': 'j1', 'uid': 'left', 'options': {'resolution': '720p', 'path': self.out}, 'priority': 0,
+                                 'submitter': 'left', 'submitted_at': 0}]}, f)
+
+        report = io.StringIO()
+        scheduler = DownloadScheduler(client, max_workers=1, state_path=state_path)
+        run_batch(client, scheduler, ['new'], '720p', self.out, report)
+        scheduler.shutdown()
+        records = {record['uid']: record for record in map(json.loads, report.getvalue().splitlines())}
+        self.assertEqual({uid: record['status'] for uid, record in records.items()}, {'left': 'ok', 'new': 'ok'})
+        self.assertEqual(records['left']['input'], 'left')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import io
+import json
+import threading
+import time
+import unittest
+import requests
+from requests.adapters import BaseAdapter
+from urllib.parse import parse_qs, urlsplit
+from aparat import AdaptiveLimiter, Aparat
+from aparat.session import AparatSession, ThreadLocalSession
+
+class CommentsAdapter(BaseAdapter):
+    """Serve `pages` pages of one comment each for every video, and record which thread asked."""
+
+    def __init__(self, pages=20):
+        super().__init__()
+        self.pages = pages
+        self.requests = []
+        self.threads = set()
+        self.lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        with self.lock:
+            self.requests.append(request.url)
+            self.threads.add(threading.get_ident())
+        uid = request.url.split('/videohash/')[1].split('?')[0]
+        page = int(parse_qs(urlsplit(request.url).query).get('page', ['0'])[0])
+        more = f'https://www.aparat.com/api/fa/v1/video/comment/list/videohash/{uid}?page={page + 1}' if page + 1 < self.pages else None
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = 200
+        response.raw = io.BytesIO(json.dumps({'data': [{'attributes': {'id': f'{uid}-{page}'}}], 'links': {'more': more}}).encode())
+        return response
+
+    def close(self):
+        pass
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def test_increases_while_healthy(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=10)
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release(0.1)
+        self.assertGreater(limiter.limit, 2)
+
+    def test_backs_off_on_overload(self):
+        limiter = AdaptiveLimiter(initial=8)
+        limiter.acquire()
+        limiter.release(0.1, overloaded=True)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_map_keeps_order_and_counts_connection_errors(self):
+        limiter = AdaptiveLimiter(initial=4)
+
+        def work(item):
+            if item == 3:
+                raise requests.ConnectionError()
+            return item * 2
+
+        results = limiter.map(work, range(3))
+        self.assertEqual(list(results), [0, 2, 4])
+        with self.assertRaises(requests.ConnectionError):
+            list(limiter.map(work, [3]))
+        self.assertEqual(limiter.stats()['overloads'], 1)
+
+    def test_map_bounds_in_flight_items_and_cancels_on_close(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=2)
+        started = []
+
+        def work(item):
+            started.append(item)
+            return item
+
+        def items():
+            for item in range(100):
+                yield item
+
+        results = limiter.map(work, items())
+        self.assertEqual(next(results), 0)
+        self.assertEqual(next(results), 1)
+        results.close()
+        self.assertLessEqual(len(started), 4)
+
+    def test_stream_reads_a_bounded_number_of_pieces_ahead(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=2)
+        produced = []
+
+        def pieces(item):
+            for piece in range(50):
+                produced.append((item, piece))
+                yield (item, piece)
+
+        results = limiter.stream(pieces, ['a', 'b'])
+        self.assertEqual(next(results), ('a', 0))
+        time.sleep(0.3)
+        self.assertLessEqual(len(produced), 8)
+        self.assertEqual(list(results), [('a', piece) for piece in range(1, 50)] + [('b', piece) for piece in range(50)])
+
+    def test_stream_reraises_errors(self):
+        def pieces(item):
+            yield item
+            raise requests.ConnectionError()
+
+        with self.assertRaises(requests.ConnectionError):
+            list(AdaptiveLimiter().stream(pieces, [1, 2]))
+
+class TestCrawlComments(unittest.TestCase):
+    def test_thread_safe_client_streams_pages_concurrently(self):
+        adapter = CommentsAdapter()
+        aparat = Aparat()
+        aparat.session = ThreadLocalSession(lambda: self.mounted(AparatSession(), adapter))
+
+        comments = aparat.crawl_comments(['a', 'b'])
+        self.assertEqual(next(comments).id, 'a-0')
+        time.sleep(0.3)
+        self.assertLessEqual(len(adapter.requests), 10)
+        self.assertEqual([comment.id for comment in comments], [f'a-{page}' for page in range(1, 20)] + [f'b-{page}' for page in range(20)])
+        self.assertGreater(len(adapter.threads), 1)
+
+    def test_plain_session_is_not_shared_across_threads(self):
+        adapter = CommentsAdapter(pages=2)
+        aparat = Aparat()
+        self.mounted(aparat.session, adapter)
+
+        self.assertEqual([comment.id for comment in aparat.crawl_comments(['a', 'b'])], ['a-0', 'a-1', 'b-0', 'b-1'])
+        self.assertEqual(adapter.threads, {threading.get_ident()})
+
+    def mounted(self, session, adapter):
+        session.mount('https://', adapter)
+        return session
+
+if __name__ == '__main__':
+    unittest.main()
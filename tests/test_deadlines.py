@@ -0,0 +1,58 @@
+import time
+import unittest
+import requests
+from requests.adapters import BaseAdapter
+from aparat import AdaptiveLimiter, DeadlineExceededError, deadline
+from aparat.deadlines import clamp_timeout, remaining, with_deadline
+from aparat.session import AparatSession
+
+class RecordingAdapter(BaseAdapter):
+    def __init__(self):
+        super().__init__()
+        self.timeouts = []
+
+    def send(self, request, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        response = requests.Response()
+        response.status_code = 200
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+class TestDeadlines(unittest.TestCase):
+    def test_nested_deadline_never_extends(self):
+        with deadline(1):
+            with deadline(60):
+                self.assertLessEqual(remaining(), 1)
+            self.assertLessEqual(clamp_timeout(10), 1)
+            self.assertEqual(clamp_timeout((0.5, 10))[0], 0.5)
+        self.assertIsNone(remaining())
+        self.assertEqual(clamp_timeout(10), 10)
+
+    def test_session_shrinks_timeouts_and_aborts(self):
+        session = AparatSession()
+        adapter = RecordingAdapter()
+        session.mount('https://', adapter)
+
+        with deadline(2):
+            session.get('https://www.aparat.com/', timeout=10)
+        self.assertLessEqual(adapter.timeouts[0], 2)
+
+        with deadline(0.01):
+            time.sleep(0.02)
+            with self.assertRaises(DeadlineExceededError):
+                session.get('https://www.aparat.com/', timeout=10)
+        self.assertEqual(len(adapter.timeouts), 1)
+
+    def test_deadline_argument_and_threads(self):
+        @with_deadline
+        def operation(timeout=10, deadline=None):
+            return list(AdaptiveLimiter(initial=2).map(lambda _: remaining(), range(3)))
+
+        self.assertTrue(all(left is not None and left <= 5 for left in operation(deadline=5)))
+        self.assertEqual(operation(), [None, None, None])
+
+if __name__ == '__main__':
+    unittest.main()
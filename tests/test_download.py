@@ -0,0 +1,252 @@
+import gzip
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from requests.adapters import BaseAdapter
+from aparat.download import download_file
+
+class FlakyRaw(io.BytesIO):
+    def __init__(self, data, fail_after=None):
+        super().__init__(data)
+        self.fail_after = fail_after
+
+    def readinto(self, buffer):
+        if self.fail_after is not None and self.tell() >= self.fail_after:
+            raise ConnectionResetError('connection reset')
+        return super().readinto(buffer)
+
+class MirrorAdapter(BaseAdapter):
+    """Serve BODY on mirror 'b', fail on mirror 'a', and drop the first 'b' transfer halfway."""
+
+    BODY = bytes(range(256)) * 64
+
+    def __init__(self):
+        super().__init__()
+        self.ranges = []
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        if request.url.startswith('https://a/'):
+            response.status_code = 503
+            response.raw = io.BytesIO(b'')
+            return response
+
+        start = int(request.headers.get('Range', 'bytes=0-')[6:-1])
+        self.ranges.append(start)
+        body = self.BODY[start:]
+        response.status_code = 206 if start else 200
+        response.headers['Content-Length'] = str(len(body))
+        if start:
+            response.headers['Content-Range'] = f'bytes {start}-{len(self.BODY) - 1}/{len(self.BODY)}'
+        response.raw = FlakyRaw(body, fail_after=4096 if len(self.ranges) == 1 else None)
+        return response
+
+    def close(self):
+        pass
+
+class FileHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(MirrorAdapter.BODY)))
+        self.end_headers()
+        self.wfile.write(MirrorAdapter.BODY)
+
+    def log_message(self, *args):
+        pass
+
+class StallingHandler(FileHandler):
+    """Send half of the body from '/stall' and then nothing; serve other paths in full."""
+
+    def do_GET(self):
+        if self.path != '/stall':
+            return super().do_GET()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(MirrorAdapter.BODY)))
+        self.end_headers()
+        self.wfile.write(MirrorAdapter.BODY[:len(MirrorAdapter.BODY) // 2])
+        self.wfile.flush()
+        time.sleep(2)
+
+class GzipHandler(FileHandler):
+    def do_GET(self):
+        body = gzip.compress(MirrorAdapter.BODY)
+        self.send_response(200)
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class ReadOnlyRaw(object):
+    """A raw stream with `read` only, like some non-urllib3 transports."""
+
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self.data.read(size)
+
+    def close(self):
+        pass
+
+class TestDownload(unittest.TestCase):
+    def test_reads_from_socket_into_preallocated_file(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), FileHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'video.mp4')
+                with open(path, 'wb') as f:
+                    f.write(b'stale' * 10000)
+                result = download_file(requests.Session(), [f'http://127.0.0.1:{server.server_port}/video.mp4'], path, chunk_size=4096)
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(), MirrorAdapter.BODY)
+            self.assertEqual(result.bytes_written, len(MirrorAdapter.BODY))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_stalled_mirror_times_out(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StallingHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_port}'
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'video.mp4')
+                start = time.monotonic()
+                result = download_file(requests.Session(), [f'{base}/stall', f'{base}/video.mp4'], path, backoff=0, timeout=(1, 0.2))
+                self.assertLess(time.monotonic() - start, 1.5)
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(), MirrorAdapter.BODY)
+            self.assertEqual((result.retries, result.mirror), (1, f'{base}/video.mp4'))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_content_encoded_body_is_decoded(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), GzipHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'video.mp4')
+                result = download_file(requests.Session(), [f'http://127.0.0.1:{server.server_port}/video.mp4'], path, chunk_size=4096)
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(), MirrorAdapter.BODY)
+            self.assertEqual(result.size, len(MirrorAdapter.BODY))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_raw_stream_without_readinto(self):
+        class ReadOnlyAdapter(MirrorAdapter):
+            def send(self, request, **kwargs):
+                response = super().send(request, **kwargs)
+                response.raw = ReadOnlyRaw(self.BODY)
+                return response
+
+        session = requests.Session()
+        session.mount('https://', ReadOnlyAdapter())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'video.mp4')
+            download_file(session, ['https://b/video.mp4'], path, chunk_size=1000)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), MirrorAdapter.BODY)
+
+    def test_mirror_fallback_and_resume(self):
+        session = requests.Session()
+        adapter = MirrorAdapter()
+        session.mount('https://', adapter)
+        updates = []
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'video.mp4')
+            result = download_file(session, ['https://b/video.mp4', 'https://a/video.mp4'], path, progress=updates.append, backoff=0, chunk_size=1024)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), MirrorAdapter.BODY)
+
+        self.assertEqual(adapter.ranges, [0, 4096])
+        self.assertEqual(result.retries, 2)
+        self.assertEqual(result.resume_offset, 4096)
+        self.assertEqual(result.mirror, 'https://b/video.mp4')
+        self.assertEqual(result.size, len(MirrorAdapter.BODY))
+        self.assertEqual(updates[-1].downloaded, len(MirrorAdapter.BODY))
+        self.assertGreater(result.peak_throughput, 0)
+
+    def test_existing_hardlink_is_replaced_not_rewritten(self):
+        session = requests.Session()
+        session.mount('https://', MirrorAdapter())
+
+        with tempfile.TemporaryDirectory() as directory:
+            stored, path = os.path.join(directory, 'stored.mp4'), os.path.join(directory, 'video.mp4')
+            with open(stored, 'wb') as f:
+                f.write(b'stored video')
+            os.link(stored, path)
+            download_file(session, ['https://b/video.mp4'], path, backoff=0)
+            with open(stored, 'rb') as f:
+                self.assertEqual(f.read(), b'stored video')
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), MirrorAdapter.BODY)
+
+    def test_corrupted_mirror_is_refetched(self):
+        class CorruptingAdapter(MirrorAdapter):
+            def send(self, request, **kwargs):
+                response = super().send(request, **kwargs)
+                response.headers['ETag'] = '"%s"' % hashlib.md5(self.BODY).hexdigest()
+                if request.url.startswith('https://c/'):
+                    response.raw = io.BytesIO(b'\xff' + self.BODY[1:])
+                return response
+
+        session = requests.Session()
+        adapter = CorruptingAdapter()
+        session.mount('https://', adapter)
+        adapter.ranges.append(None)  # disable the dropped transfer
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'video.mp4')
+            result = download_file(session, ['https://c/video.mp4', 'https://b/video.mp4'], path, backoff=0)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), MirrorAdapter.BODY)
+
+        self.assertEqual(result.retries, 1)
+        self.assertTrue(result.verified)
+        self.assertEqual(result.digest, hashlib.md5(MirrorAdapter.BODY).hexdigest())
+
+    def test_truncated_body_is_resumed(self):
+        class TruncatingAdapter(MirrorAdapter):
+            def send(self, request, **kwargs):
+                response = super().send(request, **kwargs)
+                if len(self.ranges) == 2:
+                    response.raw = io.BytesIO(response.raw.read(1000))
+                return response
+
+        session = requests.Session()
+        adapter = TruncatingAdapter()
+        session.mount('https://', adapter)
+        adapter.ranges.append(None)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'video.mp4')
+            result = download_file(session, ['https://b/video.mp4'], path, backoff=0, expected_hash=hashlib.sha1(MirrorAdapter.BODY).hexdigest())
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), MirrorAdapter.BODY)
+
+        self.assertEqual(adapter.ranges[1:], [0, 1000])
+        self.assertEqual(result.resume_offset, 1000)
+        self.assertTrue(result.verified)
+
+    def test_gives_up_after_retries(self):
+        session = requests.Session()
+        session.mount('https://', MirrorAdapter())
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(requests.HTTPError):
+                download_file(session, ['https://a/video.mp4'], os.path.join(directory, 'video.mp4'), retries=1, backoff=0)
+
+if __name__ == '__main__':
+    unittest.main()
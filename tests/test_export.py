@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from aparat.aparat import Video
+from aparat import export_csv, export_jsonl, export_parquet
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+def make_video(i):
+    data = {'data': {'attributes': {'id': i, 'uid': f'v{i}', 'title': f'Video {i}', 'tags_fa': ['a', 'b']}}, 'included': []}
+    return Video(data, False, None)
+
+class TestExport(unittest.TestCase):
+    def test_jsonl_projection(self):
+        out = io.StringIO()
+        count = export_jsonl((make_video(i) for i in range(5)), out, fields=['uid', 'title'], buffer_size=2)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(count, 5)
+        self.assertEqual(json.loads(lines[3]), {'uid': 'v3', 'title': 'Video 3'})
+
+    def test_csv_encodes_nested_values(self):
+        out = io.StringIO()
+        export_csv((make_video(i) for i in range(3)), out, fields=['uid', 'tags_fa'])
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(json.loads(rows[0]['tags_fa']), ['a', 'b'])
+
+    def test_csv_without_rows_writes_the_header(self):
+        out = io.StringIO()
+        self.assertEqual(export_csv([], out, fields=['uid', 'title']), 0)
+        self.assertEqual(out.getvalue(), 'uid,title\r\n')
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet_unifies_types_across_row_groups(self):
+        rows = [{'uid': 'a', 'visit_cnt': 1, 'rating': None}, {'uid': 'b', 'visit_cnt': 2, 'rating': None},
+                {'uid': 'c', 'visit_cnt': 2.5, 'rating': 4}, {'uid': 'd', 'visit_cnt': '1.2K', 'rating': 3}]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'videos.parquet')
+            self.assertEqual(export_parquet(rows, path, row_group_size=2), 4)
+            self.assertEqual(os.listdir(directory), ['videos.parquet'])
+            table = pyarrow.parquet.read_table(path)
+
+            self.assertEqual(table.schema.field('rating').type, pyarrow.int64())
+            self.assertEqual(table.schema.field('visit_cnt').type, pyarrow.string())
+            self.assertEqual(table.column('visit_cnt').to_pylist(), ['1', '2', '2.5', '1.2K'])
+
+            schema = pyarrow.schema([('uid', pyarrow.string()), ('visit_cnt', pyarrow.float64())])
+            export_parquet(rows[:3], path, fields=['uid', 'visit_cnt'], row_group_size=2, schema=schema)
+            self.assertEqual(pyarrow.parquet.read_table(path).column('visit_cnt').to_pylist(), [1.0, 2.0, 2.5])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet_with_consistent_types_is_written_in_one_pass(self):
+        listings = []
+
+        def rows():
+            for index in range(5):
+                yield {'uid': str(index), 'visit_cnt': index, 'rating': None}
+            listings.append(os.listdir(directory))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'videos.parquet')
+            self.assertEqual(export_parquet(rows(), path, row_group_size=2), 5)
+            self.assertEqual(listings, [['videos.parquet']])  # nothing was spooled
+            table = pyarrow.parquet.read_table(path)
+            self.assertEqual(table.num_rows, 5)
+            self.assertEqual(table.schema.field('visit_cnt').type, pyarrow.int64())
+            self.assertEqual(table.schema.field('rating').type, pyarrow.string())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import time
+import unittest
+from aparat import FarmWorker, JobFarm
+from .fakes import FakeCDN, FakeClient
+
+class UploadingClient(FakeClient):
+    """Client whose uploads fail after the connection was reset."""
+
+    def __init__(self, cdn):
+        super().__init__(cdn)
+        self.uploads = 0
+
+    def upload_video(self, **payload):
+        self.uploads += 1
+        raise ConnectionError('connection reset')
+
+class TestJobFarm(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'jobs.db')
+        self.out = self.directory.name + os.sep
+        self.cdn = FakeCDN()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_claim_order_and_dedup(self):
+        farm = JobFarm(self.path)
+        low = farm.add_download('a', '720p')
+        high = farm.add_download('b', '720p', priority=5)
+        self.assertEqual(farm.add_download('a', '720p'), low)
+
+        self.assertEqual(farm.claim('w1').id, high)
+        self.assertEqual(farm.claim('w2').id, low)
+        self.assertIsNone(farm.claim('w3'))
+        self.assertEqual(farm.status()['workers'], {'w1': {'jobs': 1, 'bytes': 0}, 'w2': {'jobs': 1, 'bytes': 0}})
+
+    def test_expired_lease_is_stolen(self):
+        farm = JobFarm(self.path, lease=0.05)
+        farm.add_download('a')
+        stalled = farm.claim('w1')
+        time.sleep(0.1)
+
+        other = JobFarm(self.path, lease=60)
+        stolen = other.claim('w2')
+        self.assertEqual((stolen.id, stolen.attempts), (stalled.id, 2))
+        self.assertFalse(farm.heartbeat(stalled))
+        self.assertFalse(farm.complete(stalled))
+        self.assertTrue(other.complete(stolen, {'ok': True}))
+        self.assertEqual(other.jobs('done')[0]['result'], {'ok': True})
+
+    def test_worker_runs_and_retries(self):
+        farm = JobFarm(self.path, max_attempts=2)
+        farm.add_download('good', '720p', path=self.out)
+        farm.add_download('bad', '720p', path=self.out)
+        self.cdn.add('good')
+        self.cdn.add('bad', fail=True)
+
+        self.assertEqual(FarmWorker(farm, FakeClient(self.cdn), name='w').run(), 3)
+        status = farm.status()
+        self.assertEqual(status['states'], {'done': 1, 'failed': 1})
+        self.assertEqual((status['bytes'], status['total']), (10, 10))
+        done, failed = farm.jobs('done')[0], farm.jobs('failed')[0]
+        self.assertEqual(done['result']['path'], self.out + 'good.mp4')
+        self.assertEqual((failed['attempts'], failed['error']), (2, 'mirror down'))
+
+        self.assertEqual(farm.retry_failed(), 1)
+        self.assertEqual(farm.jobs('queued')[0]['payload']['uid'], 'bad')
+
+    def test_stalled_download_is_given_up(self):
+        farm = JobFarm(self.path, lease=0.3, max_attempts=2)
+        job_id = farm.add_download('stuck', '720p', path=self.out)
+        self.cdn.add('stuck', stall=(5, 0.5))
+
+        worker = FarmWorker(farm, FakeClient(self.cdn), name='w', heartbeat=0.05, stall=0.2)
+        worker.run_job(farm.claim('w'))
+        job = farm.jobs()[0]
+        self.assertEqual((job['id'], job['state'], job['progress']), (job_id, 'queued', 5))
+        self.assertIn('no progress', job['error'])
+
+    def test_stalled_download_is_aborted(self):
+        farm = JobFarm(self.path, lease=0.3, max_attempts=2)
+        farm.add_download('stuck', '720p', path=self.out, retries=5, timeout=0.3)
+        self.cdn.add('stuck', stall=(5, 60))
+
+        worker = FarmWorker(farm, FakeClient(self.cdn), name='w', heartbeat=0.05, stall=0.2)
+        start = time.monotonic()
+        worker.run_job(farm.claim('w'))
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(farm.jobs()[0]['state'], 'queued')
+
+    def test_uploads_are_not_retried(self):
+        farm = JobFarm(self.path, lease=0.05, max_attempts=3)
+        farm.add_upload('a.mp4', 'A', 1, ['x'])
+        client = UploadingClient(self.cdn)
+
+        self.assertEqual(FarmWorker(farm, client, name='w').run(), 1)
+        self.assertEqual((client.uploads, farm.jobs()[0]['state']), (1, 'failed'))
+
+        farm.retry_failed()
+        farm.claim('w1')
+        time.sleep(0.1)
+        self.assertIsNone(farm.claim('w2'))
+        self.assertIn('may have been uploaded', farm.jobs('failed')[0]['error'])
+
+if __name__ == '__main__':
+    unittest.main()
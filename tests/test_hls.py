@@ -0,0 +1,120 @@
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+import requests
+from requests.adapters import BaseAdapter
+from aparat import BandwidthLimiter, ProxyPool
+from aparat.aparat import Video
+from aparat.hls import Playlist, download_clip, parse_time
+from aparat.session import AparatSession, ThreadLocalSession
+
+MASTER = """#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=400000,RESOLUTION=640x360
+360/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=1500000,RESOLUTION=1280x720
+720/index.m3u8
+"""
+
+MEDIA = "#EXTM3U\n#EXT-X-TARGETDURATION:10\n" + ''.join(f"#EXTINF:10.0,\nseg{i}.ts\n" for i in range(6)) + "#EXT-X-ENDLIST\n"
+
+class HLSAdapter(BaseAdapter):
+    """Serve a master playlist, a 720p media playlist and its segments; seg2 fails once."""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+        self.proxies = []
+        self.threads = set()
+        self.failed = False
+
+    def send(self, request, **kwargs):
+        self.requests.append(request.url)
+        self.threads.add(threading.current_thread())
+        self.proxies.append(kwargs.get('proxies', {}).get('https'))
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = 200
+        name = request.url.rsplit('/', 1)[1]
+        if name == 'master.m3u8':
+            body = MASTER.encode()
+        elif request.url.endswith('720/index.m3u8'):
+            body = MEDIA.encode()
+        elif name == 'seg2.ts' and not self.failed:
+            self.failed = True
+            response.status_code = 503
+            body = b''
+        else:
+            body = name.encode() * 100
+        response.raw = io.BytesIO(body)
+        return response
+
+    def close(self):
+        pass
+
+class TestHLS(unittest.TestCase):
+    def test_parse_time(self):
+        self.assertEqual(parse_time(75), 75.0)
+        self.assertEqual(parse_time('01:15'), 75.0)
+        self.assertEqual(parse_time('1:00:05.5'), 3605.5)
+
+    def test_playlist(self):
+        master = Playlist(MASTER, 'https://cdn/v/master.m3u8')
+        self.assertEqual(master.select_variant()['url'], 'https://cdn/v/720/index.m3u8')
+        self.assertEqual(master.select_variant('480p')['height'], 360)
+
+        media = Playlist(MEDIA, 'https://cdn/v/720/index.m3u8')
+        self.assertEqual(media.duration, 60.0)
+        self.assertEqual([segment.url.rsplit('/', 1)[1] for segment in media.segments_between(15, 30)], ['seg1.ts', 'seg2.ts'])
+
+        with self.assertRaises(ValueError):
+            Playlist('#EXTM3U\n#EXT-X-KEY:METHOD=AES-128,URI="k"\n#EXTINF:1,\na.ts\n', 'https://cdn/')
+
+    def test_download_clip(self):
+        session = requests.Session()
+        adapter = HLSAdapter()
+        session.mount('https://', adapter)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'clip.ts')
+            result = download_clip(session, 'https://cdn/v/master.m3u8', 15, 35, path, backoff=0)
+            with open(path, 'rb') as f:
+                data = f.read()
+
+        self.assertEqual(data, b''.join(f'seg{i}.ts'.encode() * 100 for i in (1, 2, 3)))
+        self.assertEqual((result.start, result.end, result.segments), (10.0, 40.0, 3))
+        self.assertEqual(result.bytes_written, len(data))
+        self.assertNotIn('https://cdn/v/720/seg0.ts', adapter.requests)
+        self.assertNotIn('https://cdn/v/360/index.m3u8', adapter.requests)
+        self.assertEqual(adapter.threads, {threading.current_thread()})  # a plain session is not shared by threads
+
+    def test_clip_segments_share_the_pinned_proxy_and_bandwidth(self):
+        pool = ProxyPool(['http://p1:3128', 'http://p2:3128', 'http://p3:3128'])
+        bandwidth = BandwidthLimiter(per_transfer=1500)
+        adapter = HLSAdapter()
+        adapter.failed = True
+
+        def factory():
+            session = AparatSession(proxy_pool=pool, bandwidth=bandwidth)
+            session.mount('https://', adapter)
+            return session
+
+        session = ThreadLocalSession(factory)
+        video = Video({'data': {'attributes': {'uid': 'abc', 'hls_link': 'https://cdn/v/master.m3u8'}}, 'included': []}, False, session)
+
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.monotonic()
+            result = video.download_clip(0, 40, path=directory + os.sep)
+            elapsed = time.monotonic() - start
+            self.assertTrue(os.path.exists(os.path.join(directory, 'abc_0-40.ts')))
+
+        self.assertEqual(result.segments, 4)
+        self.assertEqual(len(set(adapter.proxies)), 1)
+        self.assertEqual(len(adapter.proxies), 6)
+        self.assertGreater(len(adapter.threads), 1)
+        self.assertGreaterEqual(elapsed, 0.5)  # 2800 segment bytes at 1500 B/s, after a 1500 byte burst
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+import requests
+from requests.adapters import BaseAdapter
+from aparat import ImageCache
+from aparat.aparat import User, Video
+from aparat.images import fetch_images, image_urls
+
+class ImageAdapter(BaseAdapter):
+    """Serve 100 bytes per image; URLs containing 'missing' return 404."""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+        self.threads = set()
+
+    def send(self, request, **kwargs):
+        self.requests.append(request.url)
+        self.threads.add(threading.current_thread())
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = 404 if 'missing' in request.url else 200
+        response.raw = io.BytesIO(request.url[-1].encode() * 100)
+        return response
+
+    def close(self):
+        pass
+
+def video(uid, **images):
+    return Video({'data': {'attributes': dict(uid=uid, **images)}, 'included': []}, False, None)
+
+class TestImages(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.session = requests.Session()
+        self.adapter = ImageAdapter()
+        self.session.mount('https://', self.adapter)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_image_urls(self):
+        user = User({'data': {'attributes': {'pic_s': 'https://img/s', 'cover_src': 'https://img/c', 'big_poster': 'x'}}}, False, None)
+        self.assertEqual(image_urls(user), {'pic_s': 'https://img/s', 'cover_src': 'https://img/c'})
+        self.assertEqual(image_urls(user, ['pic_s', 'small_poster']), {'pic_s': 'https://img/s'})
+
+    def test_fetch_deduplicates_and_caches(self):
+        cache = ImageCache(self.directory.name)
+        videos = [
+            video('a', small_poster='https://img/1', big_poster='https://img/2'),
+            video('b', small_poster='https://img/1', big_poster='https://img/missing'),
+        ]
+        results = fetch_images(self.session, videos, cache)
+        self.assertEqual(sorted(self.adapter.requests), ['https://img/1', 'https://img/2', 'https://img/missing'])
+        self.assertEqual(results[0]['small_poster'], results[1]['small_poster'])
+        self.assertIsNone(results[1]['big_poster'])
+        with open(results[0]['big_poster'], 'rb') as f:
+            self.assertEqual(f.read(), b'2' * 100)
+
+        fetch_images(self.session, videos[:1], cache, variants=['small_poster'])
+        self.assertEqual(len(self.adapter.requests), 3)
+        self.assertEqual(self.adapter.threads, {threading.current_thread()})
+
+    def test_lru_eviction(self):
+        cache = ImageCache(self.directory.name, max_size=250)
+        first = cache.put('https://img/1', b'1' * 100)
+        cache.put('https://img/2', b'2' * 100)
+        cache.get('https://img/1')
+        cache.put('https://img/3', b'3' * 100)
+
+        self.assertIn('https://img/1', cache)
+        self.assertNotIn('https://img/2', cache)
+        self.assertEqual(cache.size, 200)
+        self.assertTrue(os.path.exists(first))
+
+        reopened = ImageCache(self.directory.name, max_size=250)
+        self.assertEqual((len(reopened), reopened.size), (2, 200))
+
+if __name__ == '__main__':
+    unittest.main()
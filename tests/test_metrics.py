@@ -0,0 +1,56 @@
+import unittest
+import requests
+from requests.adapters import BaseAdapter
+from aparat import Aparat, Instrumentation, MetricsRegistry
+from aparat.metrics import Histogram
+
+class StaticAdapter(BaseAdapter):
+    def __init__(self, status=200, body=b'{}'):
+        super().__init__()
+        self.status = status
+        self.body = body
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = self.status
+        response._content = self.body
+        response.headers['Content-Length'] = str(len(self.body))
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+class TestMetrics(unittest.TestCase):
+    def test_hooks_and_registry(self):
+        metrics = MetricsRegistry()
+        instrumentation = Instrumentation(metrics)
+        seen = []
+        instrumentation.add_hook('before_request', lambda event: seen.append(('before', event.template)))
+        instrumentation.add_hook('after_request', lambda event: seen.append(('after', event.status)))
+
+        aparat = Aparat(instrumentation=instrumentation)
+        aparat.session.mount('https://', StaticAdapter(body=b'{"data": []}'))
+        aparat.session.get('https://www.aparat.com/api/fa/v1/video/video/show/videohash/abc?pr=1')
+        aparat.session.mount('https://', StaticAdapter(status=503))
+        aparat.session.get('https://www.aparat.com/api/fa/v1/video/video/show/videohash/def?pr=1')
+
+        self.assertEqual(seen[0], ('before', '/api/fa/v1/video/video/show/videohash/{videohash}'))
+        self.assertEqual(seen[-1], ('after', 503))
+        family = metrics.snapshot()['video/video/show']
+        self.assertEqual((family['requests'], family['errors']), (2, 1))
+        self.assertEqual(family['statuses'], {'200': 1, '503': 1})
+        self.assertEqual(family['bytes_received'], len(b'{"data": []}') + 2)
+        self.assertEqual(family['latency']['count'], 2)
+        self.assertIn(('aparat_requests_total', {'family': 'video/video/show'}, 2), list(metrics.samples()))
+
+    def test_histogram_quantile(self):
+        histogram = Histogram((1, 2, 4))
+        for value in (0.5, 1.5, 1.5, 3):
+            histogram.observe(value)
+        self.assertEqual(histogram.quantile(0.5), 1.5)
+        self.assertEqual(histogram.to_dict()['buckets'][-1], (float('inf'), 4))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+from aparat.aparat import Comment, Video
+
+class TestModels(unittest.TestCase):
+    def setUp(self):
+        self.data = {'data': {'attributes': {'id': 1, 'uid': 'abc', 'title': 'Title', '360d': 'no'}}, 'included': []}
+
+    def test_fields_read_from_raw_attributes(self):
+        video = Video(self.data, False, None)
+        self.assertEqual(video.uid, 'abc')
+        self.assertEqual(video._360d, 'no')
+        self.assertIsNone(video.description)
+        self.assertFalse(hasattr(video, '__dict__'))
+
+    def test_assignment_updates_raw_attributes(self):
+        video = Video(self.data, False, None)
+        video.title = 'New title'
+        self.assertEqual(self.data['data']['attributes']['title'], 'New title')
+
+    def test_comment_to_dict(self):
+        comment = Comment({'id': 7, 'body': 'Hello'}, 'abc', False, None)
+        self.assertEqual(comment.to_dict(['id', 'body']), {'id': 7, 'body': 'Hello'})
+        self.assertEqual(comment.uid, 'abc')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import unittest
+import requests
+from aparat import NotificationWatcher
+from aparat.aparat import LoginRequiredError
+
+class FakeResponse(object):
+    def __init__(self, payload, status_code=200):
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode()
+        self.headers = {'ETag': 'abc'}
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+class FakeSession(object):
+    def __init__(self, payloads):
+        self.payloads = payloads
+        self.headers = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.headers.append(headers)
+        payload = self.payloads.pop(0)
+        if isinstance(payload, int):
+            return FakeResponse({}, payload)
+        return FakeResponse(payload)
+
+class FakeClient(object):
+    def __init__(self, payloads):
+        self.session = FakeSession(payloads)
+
+class TestNotificationWatcher(unittest.TestCase):
+    def test_reports_only_new_notifications(self):
+        first = {'data': [{'id': 2}, {'id': 1}]}
+        second = {'data': [{'id': 4}, {'id': 3}, {'id': 2}, {'id': 1}]}
+        client = FakeClient([first, first, second])
+        watcher = NotificationWatcher(client, min_interval=1, max_interval=8, backoff=2)
+
+        self.assertEqual(watcher.poll(), [])
+        self.assertEqual(watcher.poll(), [])
+        self.assertEqual(watcher.interval, 4)
+        self.assertEqual(watcher.poll(), [{'id': 3}, {'id': 4}])
+        self.assertEqual(watcher.interval, 1)
+        self.assertEqual(watcher.last_id, 4)
+        self.assertEqual(client.session.headers[1], {'If-None-Match': 'abc'})
+
+    def test_only_not_modified_means_no_news(self):
+        watcher = NotificationWatcher(FakeClient([{'data': []}, 304, 503, {'data': [{'id': 1}]}, 401]), min_interval=1, max_interval=8, backoff=2)
+        self.assertEqual(watcher.poll(), [])
+        self.assertEqual(watcher.poll(), [])
+        with self.assertRaises(requests.HTTPError):
+            watcher.poll()
+        self.assertEqual(watcher.poll(), [{'id': 1}])
+        with self.assertRaises(LoginRequiredError):
+            watcher.poll()
+
+    def test_watch_backs_off_on_server_errors(self):
+        watcher = NotificationWatcher(FakeClient([{'data': []}, 500, 502]), min_interval=1, max_interval=8, backoff=2)
+        watcher.poll()
+        self.assertEqual(watcher._poll_or_back_off(), [])
+        self.assertEqual(watcher._poll_or_back_off(), [])
+        self.assertEqual(watcher.interval, 8)
+
+    def test_notifications_without_id_are_keyed_by_content(self):
+        first = {'data': [{'text': 'a'}]}
+        second = {'data': [{'text': 'b'}, {'text': 'a'}]}
+        watcher = NotificationWatcher(FakeClient([first, second]))
+        watcher.poll()
+        self.assertEqual(watcher.poll(), [{'text': 'b'}])
+
+if __name__ == '__main__':
+    unittest.main()
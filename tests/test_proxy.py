@@ -0,0 +1,74 @@
+import time
+import unittest
+import requests
+from requests.adapters import BaseAdapter
+from aparat import ProxyPool
+from aparat.deadlines import DeadlineExceededError, deadline
+from aparat.session import AparatSession
+
+class RaisingAdapter(BaseAdapter):
+    """Raise `error` for every request."""
+
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+
+    def send(self, request, **kwargs):
+        raise self.error
+
+    def close(self):
+        pass
+
+class TestProxyPool(unittest.TestCase):
+    def test_rotation_skips_ejected_proxies(self):
+        pool = ProxyPool(['http://a:1', 'http://b:1'], min_requests=1, max_error_rate=0.1, eject_time=60)
+        bad = pool.proxies[0]
+        pool.record(bad, 0.1, ok=False)
+
+        self.assertFalse(bad.healthy)
+        self.assertEqual({pool.select().url for _ in range(4)}, {'http://b:1'})
+
+    def test_probe_restores_proxy(self):
+        pool = ProxyPool(['http://a:1', 'http://b:1'], min_requests=1, max_error_rate=0.1, eject_time=0.01)
+        bad = pool.proxies[0]
+        pool.record(bad, 0.1, ok=False)
+        time.sleep(0.02)
+
+        probe = pool.select()
+        self.assertIs(probe, bad)
+        pool.record(probe, 0.1, ok=True)
+        self.assertTrue(bad.healthy)
+
+    def test_recovered_proxy_starts_from_the_initial_ejection_period(self):
+        pool = ProxyPool(['http://a:1', 'http://b:1'], min_requests=1, max_error_rate=0.1, eject_time=0.01)
+        bad = pool.proxies[0]
+        for _ in range(3):
+            pool.record(bad, 0.1, ok=False)
+            time.sleep(bad.ejected_until - time.monotonic() + 0.01)
+            self.assertIs(pool.select(), bad)
+        pool.record(bad, 0.1, ok=True)
+
+        pool.record(bad, 0.1, ok=False)
+        self.assertLessEqual(bad.ejected_until - time.monotonic(), 0.01)
+
+    def test_probe_ends_when_the_request_fails_for_unrelated_reasons(self):
+        for error, expected in ((ValueError('bad body'), ValueError), (requests.Timeout(), DeadlineExceededError)):
+            pool = ProxyPool(['http://a:1'], min_requests=1, max_error_rate=0.1, eject_time=0.01)
+            bad = pool.proxies[0]
+            pool.record(bad, 0.1, ok=False)
+            time.sleep(0.02)
+
+            session = AparatSession(proxy_pool=pool)
+            session.mount('https://', RaisingAdapter(error))
+            with self.assertRaises(expected), deadline(5):
+                session.get('https://www.aparat.com/', timeout=10)
+            self.assertFalse(bad.probing)
+            self.assertIs(pool.select(), bad)
+
+    def test_pin_keeps_one_proxy(self):
+        pool = ProxyPool(['http://a:1', 'http://b:1'])
+        with pool.pin() as pinned:
+            self.assertEqual({pool.select().url for _ in range(4)}, {pinned.url})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import io
+import time
+import unittest
+import requests
+from requests.adapters import BaseAdapter
+from aparat import deadline
+from aparat.quality import ThroughputHistory, nearest_profile, select_profile
+
+SIZES = {'144p': 1000, '360p': 5000, '720p': 20000}
+LINKS = [{'profile': profile, 'urls': [f'https://cdn/{profile}.mp4']} for profile in SIZES]
+
+class SizeAdapter(BaseAdapter):
+    """Answer Range requests for the profiles in SIZES with a matching Content-Range."""
+
+    def __init__(self, delay=0):
+        super().__init__()
+        self.requests = []
+        self.delay = delay
+
+    def send(self, request, **kwargs):
+        self.requests.append((request.url, request.headers.get('Range')))
+        time.sleep(self.delay)
+        profile = request.url.rsplit('/', 1)[1][:-4]
+        first, _, last = request.headers['Range'][6:].partition('-')
+        last = min(int(last), SIZES[profile] - 1)
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = 206
+        response.headers['Content-Range'] = f'bytes {first}-{last}/{SIZES[profile]}'
+        response.raw = io.BytesIO(b'\0' * (last - int(first) + 1))
+        return response
+
+    def close(self):
+        pass
+
+class TestQuality(unittest.TestCase):
+    def setUp(self):
+        self.session = requests.Session()
+        self.adapter = SizeAdapter()
+        self.session.mount('https://', self.adapter)
+
+    def test_history_estimate(self):
+        history = ThroughputHistory()
+        self.assertIsNone(history.estimate('https://cdn/a'))
+        for rate in (100, 300, 200):
+            history.record('https://cdn/a', rate, 1)
+        history.record('https://other/a', 5, 1)
+        self.assertEqual(history.estimate('https://cdn/b'), 200)
+        self.assertEqual(history.estimate('https://unknown/'), 200)
+
+    def test_nearest_profile(self):
+        self.assertEqual(nearest_profile(LINKS, '480p')['profile'], '360p')
+        self.assertEqual(nearest_profile(LINKS, '1080p')['profile'], '720p')
+
+    def test_select_within_deadline(self):
+        history = ThroughputHistory()
+        history.record('https://cdn/x', 1000, 1)
+        with deadline(10):
+            self.assertEqual(select_profile(self.session, LINKS, history=history)['profile'], '360p')
+        with deadline(100):
+            self.assertEqual(select_profile(self.session, LINKS, history=history)['profile'], '720p')
+            self.assertEqual(select_profile(self.session, LINKS, max_size=2000, history=history)['profile'], '144p')
+        with deadline(0.5):
+            self.assertEqual(select_profile(self.session, LINKS, history=history)['profile'], '144p')
+
+    def test_duration_and_probe(self):
+        self.assertEqual(select_profile(self.session, LINKS)['profile'], '720p')
+        self.assertEqual(self.adapter.requests, [])
+
+        history = ThroughputHistory()
+        select_profile(self.session, LINKS, duration='00:30', history=history)
+        self.assertEqual(self.adapter.requests[0], ('https://cdn/144p.mp4', 'bytes=0-524287'))
+        self.assertIsNotNone(history.estimate('https://cdn/'))
+
+    def test_selection_keeps_to_its_share_of_the_deadline(self):
+        with deadline(1):
+            self.assertEqual(select_profile(self.session, LINKS)['profile'], '144p')
+        self.assertEqual(self.adapter.requests, [])
+
+        self.adapter.delay = 0.2
+        history = ThroughputHistory()
+        history.record('https://cdn/x', 1000, 1)
+        with deadline(3):
+            self.assertEqual(select_profile(self.session, LINKS, history=history)['profile'], '144p')
+        self.assertEqual([url for url, _ in self.adapter.requests], ['https://cdn/720p.mp4', 'https://cdn/360p.mp4'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from aparat import DownloadCancelledError, DownloadScheduler
+from .fakes import FakeCDN, FakeClient
+
+class TestDownloadScheduler(unittest.TestCase):
+    def setUp(self):
+        self.cdn = FakeCDN()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name + os.sep
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_priority_fairness_and_host_cap(self):
+        release = threading.Event()
+        scheduler = DownloadScheduler(max_workers=1, per_host=1)
+        blocker = scheduler.submit(self.cdn.add('blocker', release=release), '720p', self.path)
+        while not self.cdn.started:
+            time.sleep(0.001)
+
+        jobs = [scheduler.submit(self.cdn.add(uid, release=release), '720p', self.path, submitter=submitter, priority=priority)
+                for uid, submitter, priority in [('a1', 'a', 0), ('a2', 'a', 0), ('b1', 'b', 0), ('urgent', 'b', 5)]]
+        release.set()
+        for job in [blocker] + jobs:
+            job.wait(5)
+        scheduler.shutdown()
+        self.assertEqual(self.cdn.started, ['blocker', 'urgent', 'a1', 'b1', 'a2'])
+
+    def test_per_host_cap_uses_idle_hosts(self):
+        release = threading.Event()
+        scheduler = DownloadScheduler(max_workers=3, per_host=1)
+        for uid, host in [('x1', 'cdn1'), ('x2', 'cdn1'), ('y1', 'cdn2')]:
+            scheduler.submit(self.cdn.add(uid, host, release=release), '720p', self.path)
+        while len(self.cdn.started) < 2:
+            time.sleep(0.001)
+        self.assertEqual(sorted(self.cdn.started), ['x1', 'y1'])
+        self.assertEqual(scheduler.stats()['hosts'], {'cdn1': 1, 'cdn2': 1})
+        release.set()
+        scheduler.shutdown()
+        self.assertEqual(scheduler.stats()['states'], {'done': 3})
+
+    def test_cancel(self):
+        release = threading.Event()
+        scheduler = DownloadScheduler(max_workers=1)
+        running = scheduler.submit(self.cdn.add('running', release=release), '720p', self.path)
+        queued = scheduler.submit(self.cdn.add('queued', release=release), '720p', self.path)
+        while not self.cdn.started:
+            time.sleep(0.001)
+        self.assertTrue(queued.cancel())
+        self.assertTrue(running.cancel())
+        for job in (running, queued):
+            with self.assertRaises(DownloadCancelledError):
+                job.wait(5)
+        scheduler.shutdown()
+        self.assertEqual(self.cdn.started, ['running'])
+
+    def test_persistence(self):
+        state_path = os.path.join(self.directory.name, 'queue.json')
+        releases = [threading.Event(), threading.Event()]
+        for uid, release in zip(['v1', 'v2'], releases):
+            self.cdn.add(uid, release=release)
+        client = FakeClient(self.cdn)
+
+        scheduler = DownloadScheduler(client, max_workers=1, state_path=state_path, save_interval=0.01)
+        first = scheduler.submit('v1', '720p', path=self.path)
+        scheduler.submit('v2', '720p', path=self.path)
+        releases[0].set()
+        first.wait(5)
+        saved = []
+        while [job['uid'] for job in saved] != ['v2']:
+            time.sleep(0.01)
+            with open(state_path) as f:
+                saved = json.load(f)['jobs']
+
+        # The process dies with v2 unfinished: keep the saved queue and throw the scheduler away
+        crashed_path = os.path.join(self.directory.name, 'crashed.json')
+        shutil.copy(state_path, crashed_path)
+        scheduler.shutdown(cancel=True)
+
+        restored = DownloadScheduler(client, max_workers=1, state_path=crashed_path)
+        self.assertEqual([job.uid for job in restored.jobs()], ['v2'])
+        self.assertIs(restored.submit('v2', '720p', path=self.path), restored.jobs()[0])
+        releases[1].set()
+        self.assertEqual(restored.jobs()[0].wait(5).path, self.path + 'v2.mp4')
+        restored.shutdown()
+
+    def test_shared_job_is_cancelled_by_its_last_submitter(self):
+        scheduler = DownloadScheduler(max_workers=1)
+        video = self.cdn.add('v', release=threading.Event())
+        first_updates, second_updates = [], []
+        first = scheduler.submit(video, '720p', self.path, progress=first_updates.append)
+        second = scheduler.submit(video, '720p', self.path, progress=second_updates.append, submitter='other')
+        self.assertIs(first, second)
+        while not second_updates:
+            time.sleep(0.001)
+
+        self.assertFalse(first.withdraw())
+        self.assertFalse(first.finished)
+        self.assertTrue(second.withdraw())
+        with self.assertRaises(DownloadCancelledError):
+            first.wait(5)
+        self.assertTrue(first_updates)
+        scheduler.shutdown()
+
+    def test_plain_session_runs_one_job_at_a_time(self):
+        cdn = FakeCDN(thread_safe=False)
+        release = threading.Event()
+        scheduler = DownloadScheduler(max_workers=2, per_host=None)
+        for uid in ('a', 'b'):
+            scheduler.submit(cdn.add(uid, release=release), '720p', self.path)
+        while not cdn.started:
+            time.sleep(0.001)
+        time.sleep(0.05)
+        self.assertEqual(cdn.started, ['a'])
+        release.set()
+        scheduler.shutdown()
+        self.assertEqual(cdn.started, ['a', 'b'])
+
+    def test_shutdown_without_wait_runs_the_queue(self):
+        release = threading.Event()
+        scheduler = DownloadScheduler(max_workers=1)
+        jobs = [scheduler.submit(self.cdn.add(uid, release=release), '720p', self.path) for uid in ('a', 'b')]
+        scheduler.shutdown(wait=False)
+        with self.assertRaises(RuntimeError):
+            scheduler.submit(self.cdn.add('c'), '720p', self.path)
+        release.set()
+        self.assertEqual([job.wait(5).path for job in jobs], [self.path + 'a.mp4', self.path + 'b.mp4'])
+
+    def test_finished_jobs_are_dropped(self):
+        scheduler = DownloadScheduler(max_workers=2)
+        video = self.cdn.add('v')
+        first = scheduler.submit(video, '720p', self.path)
+        first.wait(5)
+        self.assertEqual(scheduler.jobs(), [])
+        second = scheduler.submit(video, '720p', self.path)
+        self.assertIsNot(second, first)
+        second.wait(5)
+        scheduler.shutdown()
+        self.assertEqual(scheduler.stats()['states'], {'done': 2})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+import gc
+import io
+import os
+import pickle
+import tempfile
+import threading
+import time
+import unittest
+import requests
+from requests.adapters import BaseAdapter
+from aparat import AccountPool, Aparat
+from aparat.aparat import NoAccountAvailableError, Video, VideoNotFoundError
+from aparat.session import AparatSession, LockingCookieJar, ThreadLocalSession
+
+class CookieAdapter(BaseAdapter):
+    """Record the Cookie header of every request."""
+
+    def __init__(self):
+        super().__init__()
+        self.cookies = []
+
+    def send(self, request, **kwargs):
+        self.cookies.append(request.headers.get('Cookie'))
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = 200
+        response.raw = io.BytesIO(b'{}')
+        return response
+
+    def close(self):
+        pass
+
+class ClosingSession(AparatSession):
+    closed = 0
+
+    def close(self):
+        ClosingSession.closed += 1
+        super().close()
+
+class TestSessionPersistence(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'user.session')
+
+    def save(self, expires=None):
+        aparat = Aparat()
+        aparat.is_logged_in = True
+        aparat.username = 'user'
+        aparat.session.cookies.set('AuthV1', 'token', domain='.aparat.com', path='/', expires=expires)
+        aparat.save_session(self.path)
+
+    def test_round_trip_without_network(self):
+        self.save()
+        aparat = Aparat()
+        self.assertTrue(aparat.load_session('user', path=self.path))
+        self.assertTrue(aparat.is_logged_in)
+        self.assertEqual(aparat.session.cookies.get('AuthV1'), 'token')
+
+    def test_expired_session_is_rejected(self):
+        self.save(expires=1)
+        aparat = Aparat()
+        self.assertFalse(aparat.load_session('user', path=self.path))
+        self.assertFalse(aparat.is_logged_in)
+
+    @unittest.skipUnless(os.name == 'posix', 'file modes are POSIX')
+    def test_session_file_is_private(self):
+        with open(self.path, 'w') as f:
+            f.write('{}')
+        os.chmod(self.path, 0o644)
+        self.save()
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_pickled_session_is_refused(self):
+        with open(self.path, 'wb') as f:
+            f.write(pickle.dumps(requests.Session()))
+        aparat = Aparat()
+        with self.assertRaises(ValueError):
+            aparat.load_session('user', path=self.path)
+        self.assertFalse(aparat.is_logged_in)
+
+class TestThreadSafety(unittest.TestCase):
+    def test_threads_share_one_cookie_jar(self):
+        adapter = CookieAdapter()
+        session = ThreadLocalSession(lambda: self.mounted(AparatSession(), adapter))
+        sessions = []
+        barrier = threading.Barrier(4)
+
+        def work(index):
+            sessions.append(session._session())
+            session.cookies.set(f'c{index}', 'v', domain='www.aparat.com', path='/')
+            barrier.wait()
+            session.get('https://www.aparat.com/')
+
+        threads = [threading.Thread(target=work, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIsInstance(session.cookies, LockingCookieJar)
+        self.assertEqual(len({id(each) for each in sessions}), 4)
+        for header in adapter.cookies:
+            self.assertEqual(sorted(part.split('=')[0] for part in header.split('; ')), ['c0', 'c1', 'c2', 'c3'])
+
+    def test_sessions_of_exited_threads_are_closed(self):
+        ClosingSession.closed = 0
+        session = ThreadLocalSession(ClosingSession)
+        threads = [threading.Thread(target=session._session) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        del threads, thread
+        gc.collect()
+
+        self.assertEqual(len(session._sessions), 0)
+        self.assertEqual(ClosingSession.closed, 3)
+
+    def test_logout_waits_for_a_running_login(self):
+        aparat = Aparat(thread_safe=True)
+        aparat._set_logged_in('user')
+        with aparat._lock:
+            thread = threading.Thread(target=aparat.logout)
+            thread.start()
+            time.sleep(0.05)
+            self.assertTrue(aparat.is_logged_in)
+            aparat._set_logged_in('other')
+        thread.join()
+        self.assertFalse(aparat.is_logged_in)
+        self.assertEqual(aparat.username, 'other')
+
+    def test_logout_clears_cookies_in_place(self):
+        aparat = Aparat(thread_safe=True)
+        jar = aparat.session.cookies
+        aparat.session.cookies.set('AuthV1', 'token', domain='.aparat.com', path='/')
+        video = Video({'data': {'attributes': {'uid': 'abc'}}, 'included': []}, True, aparat.session)
+
+        aparat.logout()
+        self.assertIs(aparat.session.cookies, jar)
+        self.assertIsNone(video.session.cookies.get('AuthV1'))
+        self.assertEqual(len(jar), 0)
+
+    def mounted(self, session, adapter):
+        session.mount('https://', adapter)
+        return session
+
+class TestAccountPool(unittest.TestCase):
+    def make_client(self, username):
+        client = Aparat()
+        client.is_logged_in = True
+        client.username = username
+        return client
+
+    def test_least_loaded_distribution(self):
+        pool = AccountPool()
+        pool.add_client(self.make_client('a'))
+        pool.add_client(self.make_client('b'))
+        with pool.client() as first, pool.client() as second:
+            self.assertNotEqual(first.username, second.username)
+
+    def test_only_account_errors_count_as_failures(self):
+        pool = AccountPool()
+        pool.add_client(self.make_client('a'))
+        with self.assertRaises(VideoNotFoundError):
+            with pool.client():
+                raise VideoNotFoundError()
+        self.assertEqual(pool.stats()[0]['failures'], 0)
+        with self.assertRaises(requests.ConnectionError):
+            with pool.client():
+                raise requests.ConnectionError()
+        self.assertEqual(pool.stats()[0]['failures'], 1)
+
+    def test_empty_pool(self):
+        with self.assertRaises(NoAccountAvailableError):
+            AccountPool().acquire(timeout=0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from aparat import DownloadStore
+from aparat.download import DownloadResult
+
+class TestDownloadStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.directory.name, 'store')
+        self.downloads = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def download(self, data):
+        def fetch(path):
+            self.downloads.append(path)
+            with open(path, 'wb') as f:
+                f.write(data)
+            return DownloadResult(path, 'https://cdn/video.mp4', len(data), len(data), 0.1, 0.01, 0.0, 0, 0)
+        return fetch
+
+    def test_repeat_download_is_served_from_store(self):
+        store = DownloadStore(self.root)
+        first = os.path.join(self.directory.name, 'a', 'video.mp4')
+        second = os.path.join(self.directory.name, 'b', 'video.mp4')
+
+        result = store.fetch('abc', '720p', first, self.download(b'video'))
+        self.assertFalse(result.cached)
+        result = store.fetch('abc', '720p', second, self.download(b'other'))
+        self.assertTrue(result.cached)
+
+        self.assertEqual(len(self.downloads), 1)
+        with open(second, 'rb') as f:
+            self.assertEqual(f.read(), b'video')
+        self.assertEqual(len(DownloadStore(self.root)), 1)  # the index survives a restart
+
+    def test_eviction_by_size(self):
+        store = DownloadStore(self.root, max_size=10)
+        for uid in ('a', 'b', 'c'):
+            store.fetch(uid, '480p', os.path.join(self.directory.name, uid), self.download(b'12345'))
+
+        self.assertEqual(store.size, 10)
+        self.assertNotIn(DownloadStore.key('a', '480p'), store)
+        self.assertIn(DownloadStore.key('c', '480p'), store)
+
+    def test_stores_sharing_a_directory_merge_their_index(self):
+        first, second = DownloadStore(self.root), DownloadStore(self.root)
+        first.fetch('a', '720p', os.path.join(self.directory.name, 'a'), self.download(b'a'))
+        second.fetch('b', '720p', os.path.join(self.directory.name, 'b'), self.download(b'b'))
+        first.fetch('c', '720p', os.path.join(self.directory.name, 'c'), self.download(b'c'))
+
+        self.assertEqual(len(DownloadStore(self.root)), 3)
+        second.evict()
+        first.clear()
+        self.assertEqual(len(DownloadStore(self.root)), 0)
+
+    def test_key_locks_are_dropped_and_protect_files_in_use(self):
+        store = DownloadStore(self.root, max_size=0)
+        store.fetch('a', '480p', os.path.join(self.directory.name, 'a'), self.download(b'12345'))
+        self.assertEqual(store._key_locks, {})
+
+        key = DownloadStore.key('a', '480p')
+        with store._key_lock(key):
+            self.assertEqual(store.evict(), [])
+        self.assertEqual(store.evict(), [key])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import io
+import unittest
+import requests
+from requests.adapters import BaseAdapter
+from aparat import VideoStream
+
+BODY = bytes(range(256)) * 64
+
+class RangeAdapter(BaseAdapter):
+    """Serve BODY with Range support on mirror 'b'; mirror 'a' always fails."""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+        self.timeouts = []
+
+    def send(self, request, **kwargs):
+        self.requests.append((request.url, request.headers.get('Range')))
+        self.timeouts.append(kwargs.get('timeout'))
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        if request.url.startswith('https://a/'):
+            response.status_code = 503
+            response.raw = io.BytesIO(b'')
+            return response
+
+        first, last = 0, len(BODY) - 1
+        if 'Range' in request.headers:
+            first, _, last = request.headers['Range'][6:].partition('-')
+            first, last = int(first), int(last) if last else len(BODY) - 1
+            response.status_code = 206
+            response.headers['Content-Range'] = f'bytes {first}-{last}/{len(BODY)}'
+        else:
+            response.status_code = 200
+        body = BODY[first:last + 1]
+        response.headers['Content-Length'] = str(len(body))
+        response.raw = io.BytesIO(body)
+        return response
+
+    def close(self):
+        pass
+
+class TestVideoStream(unittest.TestCase):
+    def setUp(self):
+        self.session = requests.Session()
+        self.adapter = RangeAdapter()
+        self.session.mount('https://', self.adapter)
+
+    def test_iterates_chunks_after_mirror_failure(self):
+        with VideoStream(self.session, ['https://a/v.mp4', 'https://b/v.mp4'], backoff=0, chunk_size=4096) as stream:
+            chunks = list(stream)
+            self.assertEqual(stream.retries, 1)
+        self.assertEqual(b''.join(chunks), BODY)
+        self.assertTrue(all(len(chunk) <= 4096 for chunk in chunks))
+        self.assertEqual(self.adapter.timeouts, [(10, 30), (10, 30)])
+
+    def test_seek_and_ranges(self):
+        stream = VideoStream(self.session, ['https://b/v.mp4'], start=100, end=200)
+        self.assertEqual(stream.read(), BODY[100:200])
+        self.assertEqual(stream.size, len(BODY))
+
+        stream.seek(150)
+        buffer = bytearray(10)
+        self.assertEqual(stream.readinto(buffer), 10)
+        self.assertEqual(bytes(buffer), BODY[150:160])
+        self.assertEqual(self.adapter.requests[-1], ('https://b/v.mp4', 'bytes=150-199'))
+
+        whole = io.BufferedReader(VideoStream(self.session, ['https://b/v.mp4']))
+        whole.seek(-16, io.SEEK_END)
+        self.assertEqual(whole.read(), BODY[-16:])
+
+if __name__ == '__main__':
+    unittest.main()
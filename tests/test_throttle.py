@@ -0,0 +1,70 @@
+import email
+import io
+import tempfile
+import time
+import unittest
+import requests
+from aparat import BandwidthLimiter
+from aparat.cli import parse_rate
+
+class TestBandwidthLimiter(unittest.TestCase):
+    def test_transfers_share_the_budget(self):
+        bandwidth = BandwidthLimiter(rate=100 * 1024)
+        first, second = bandwidth.transfer(), bandwidth.transfer()
+
+        start = time.monotonic()
+        first.consume(100 * 1024)  # the initial burst
+        second.consume(20 * 1024)
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_per_transfer_limit(self):
+        bandwidth = BandwidthLimiter(per_transfer=64 * 1024)
+        reader = bandwidth.transfer().wrap(b'x' * 96 * 1024)
+        self.assertEqual(reader.len, 96 * 1024)
+
+        start = time.monotonic()
+        data = b''.join(iter(lambda: reader.read(8192), b''))
+        self.assertEqual(len(data), 96 * 1024)
+        self.assertGreaterEqual(time.monotonic() - start, 0.4)
+
+    def test_multipart_body_streams_file(self):
+        with tempfile.TemporaryFile() as file:
+            file.write(b'v' * 200 * 1024)
+            file.seek(0)
+            body = BandwidthLimiter(per_transfer=1024 ** 3).transfer().multipart({'qqchunksize': (None, 5), 'qqfile': ('a.mp4', file, 'application/octet-stream')})
+
+            prepared = requests.Request('POST', 'https://upload/', data=body, headers={'Content-Type': body.content_type}).prepare()
+            self.assertIs(prepared.body, body)
+            self.assertEqual(prepared.headers['Content-Length'], str(body.len))
+
+            blocks = list(iter(lambda: body.read(1024 ** 2), b''))
+            self.assertLessEqual(max(map(len, blocks)), 64 * 1024)
+
+        data = b''.join(blocks)
+        self.assertEqual(len(data), body.len)
+        message = email.message_from_bytes(b'Content-Type: ' + body.content_type.encode() + b'\r\n\r\n' + data)
+        parts = {part.get_param('name', header='content-disposition'): part for part in message.get_payload()}
+        self.assertEqual(parts['qqchunksize'].get_payload(), '5')
+        self.assertEqual(parts['qqfile'].get_filename(), 'a.mp4')
+        self.assertEqual(parts['qqfile'].get_payload(decode=True), b'v' * 200 * 1024)
+
+    def test_read_without_size_returns_the_whole_body(self):
+        transfer = BandwidthLimiter(per_transfer=1024 ** 3).transfer()
+        with tempfile.TemporaryFile() as file:
+            file.write(b'v' * 200 * 1024)
+            file.seek(0)
+            body = transfer.multipart({'qqfile': ('a.mp4', file)})
+            head = body.read(10)
+            self.assertEqual(len(head + body.read()), body.len)
+            self.assertEqual(body.read(), b'')
+
+        reader = transfer.wrap(b'x' * 200 * 1024)
+        self.assertEqual(len(reader.read(-1)), 200 * 1024)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('500K'), 500 * 1024)
+        self.assertEqual(parse_rate('2MB'), 2 * 1024 ** 2)
+        self.assertEqual(parse_rate('1000'), 1000)
+
+if __name__ == '__main__':
+    unittest.main()